@@ -0,0 +1,381 @@
+"""
+Benchmark Suite
+Times every public inventory function on seeded synthetic catalogs and writes
+ops/sec and peak memory to a JSON report that can be compared between runs.
+
+Usage:
+    python benchmark_suite.py --sizes 1000 10000 100000 --output bench.json
+    python benchmark_suite.py --compare old.json new.json
+    python benchmark_suite.py --verify --sizes 1000
+"""
+
+import argparse
+import json
+import math
+import platform
+import random
+import sys
+import time
+import tracemalloc
+from collections.abc import Mapping
+
+import online_store_management_system as store
+from inventory_index import IndexedInventory
+
+DEFAULT_SIZES = (1000, 10000, 100000, 1000000)
+
+# Operations that an indexed inventory must answer faster than a dictionary scan
+INDEXED_OPERATIONS = ("filter_by_category", "filter_by_feature", "find_products_with_keyword")
+
+# Share of the catalog in each category
+CATEGORY_WEIGHTS = {
+    "electronics": 0.30,
+    "clothing": 0.25,
+    "groceries": 0.20,
+    "footwear": 0.15,
+    "health": 0.10
+}
+
+# Feature vocabulary per category, most common first
+CATEGORY_FEATURES = {
+    "electronics": ["5G", "Bluetooth", "Wireless Charging", "Water Resistant", "128GB Storage",
+                    "Noise Cancelling", "Dual Camera", "GPS", "OLED Display", "Fast Charging"],
+    "clothing": ["Slim Fit", "Cotton", "Stretch Denim", "Machine Washable", "Organic Cotton",
+                 "Wrinkle Free", "Dark Wash", "Regular Fit"],
+    "groceries": ["Organic", "Fair Trade", "Gluten-Free", "Whole Bean", "Vegan", "Sugar-Free",
+                  "Medium Roast", "Non-GMO"],
+    "footwear": ["Breathable", "Cushioned", "Lightweight", "Waterproof", "Non-Slip", "Memory Foam"],
+    "health": ["Plant-Based", "Sugar-Free", "20g Protein", "Vegan", "Gluten-Free", "Keto Friendly"]
+}
+
+# Median price per category; prices are log-normally spread around it
+CATEGORY_PRICES = {
+    "electronics": 15000,
+    "clothing": 2500,
+    "groceries": 600,
+    "footwear": 4000,
+    "health": 1800
+}
+
+NAME_WORDS = ["Smart", "Classic", "Pro", "Ultra", "Eco", "Max", "Mini", "Premium", "Sport", "Home"]
+NAME_NOUNS = {
+    "electronics": ["Phone", "Headphones", "Watch", "Speaker", "Tablet", "Camera"],
+    "clothing": ["Jeans", "Shirt", "Jacket", "Dress", "Hoodie"],
+    "groceries": ["Coffee Beans", "Tea", "Oats", "Honey", "Olive Oil"],
+    "footwear": ["Running Shoes", "Sneakers", "Boots", "Sandals"],
+    "health": ["Protein Powder", "Vitamins", "Yoga Mat", "Supplements"]
+}
+
+
+def generate_catalog(size, seed=42):
+    """
+    Generate a synthetic product catalog.
+
+    Categories follow CATEGORY_WEIGHTS, features are drawn with Zipf-like
+    weights from each category's vocabulary, prices are log-normal around each
+    category's median, and ratings cluster around 4.
+
+    Args:
+        size (int): Number of products
+        seed (int): Random seed, so the same arguments give the same catalog
+
+    Returns:
+        dict: Products by product ID
+    """
+    generator = random.Random(seed)
+    categories = list(CATEGORY_WEIGHTS)
+    weights = list(CATEGORY_WEIGHTS.values())
+    feature_weights = {category: [1 / (rank + 1) for rank in range(len(features))]
+                       for category, features in CATEGORY_FEATURES.items()}
+
+    catalog = {}
+    for number in range(size):
+        category = generator.choices(categories, weights)[0]
+        features = set(generator.choices(CATEGORY_FEATURES[category], feature_weights[category],
+                                         k=generator.randint(1, 4)))
+        catalog[f"S{number:07d}"] = {
+            "name": f"{generator.choice(NAME_WORDS)} {generator.choice(NAME_NOUNS[category])} {number % 1000}",
+            "category": category,
+            "price": round(CATEGORY_PRICES[category] * generator.lognormvariate(0, 0.6), 2),
+            "stock": int(generator.expovariate(1 / 40)),
+            "rating": round(min(5.0, max(1.0, generator.gauss(4.0, 0.5))), 1),
+            "features": sorted(features)
+        }
+    return catalog
+
+
+def _operations(catalog):
+    """
+    Return the benchmarked operations for one catalog.
+
+    Args:
+        catalog (dict): Products by product ID
+
+    Returns:
+        list: (name, callable, chains) tuples; each callable takes the inventory
+            under test, and chains is True for updates that return a new inventory
+    """
+    product_ids = list(catalog)
+    middle = product_ids[len(product_ids) // 2]
+    new_products = {f"B{number:07d}": product for number, product in
+                    enumerate(generate_catalog(100, seed=7).values())}
+    changes = [("stock", pid, 1) for pid in product_ids[:100]]
+    return [
+        ("filter_by_category", lambda inventory: store.filter_by_category(inventory, "footwear"), False),
+        ("filter_by_price_range", lambda inventory: store.filter_by_price_range(inventory, 1000, 1500), False),
+        ("filter_by_availability", lambda inventory: store.filter_by_availability(inventory, 150), False),
+        ("filter_by_feature", lambda inventory: store.filter_by_feature(inventory, "Waterproof"), False),
+        ("find_products_with_keyword",
+         lambda inventory: store.find_products_with_keyword(inventory, "headphones"), False),
+        ("query", lambda inventory: store.query(inventory, category="electronics", price=(5000, 20000),
+                                                min_stock=10, features=["GPS"]), False),
+        ("update_product_price", lambda inventory: store.update_product_price(inventory, middle, 999.99), True),
+        ("update_stock_level", lambda inventory: store.update_stock_level(inventory, middle, 1), True),
+        ("add_product_feature", lambda inventory: store.add_product_feature(inventory, middle, "Benchmark"), True),
+        ("apply_updates", lambda inventory: store.apply_updates(inventory, changes)[0], True),
+        ("merge_inventories", lambda inventory: store.merge_inventories(inventory, new_products), True),
+        ("calculate_category_counts", store.calculate_category_counts, False),
+        ("calculate_total_inventory_value", store.calculate_total_inventory_value, False),
+        ("find_highest_rated_product", store.find_highest_rated_product, False),
+        ("top_k", lambda inventory: store.top_k(inventory, 20, category="electronics"), False),
+        ("create_price_brackets", store.create_price_brackets, False),
+        ("create_price_histogram", lambda inventory: store.create_price_histogram(
+            inventory, list(range(500, 50001, 1000)), "counts"), False)
+    ]
+
+
+def _time_operation(operation, inventory, chains, min_seconds):
+    """
+    Run an operation repeatedly for at least min_seconds after one untimed warm-up call.
+
+    Chained operations run on the inventory returned by the previous call, the
+    way callers use the update functions.
+
+    Returns:
+        tuple: (seconds per call, inventory the last call ran on)
+    """
+    result = operation(inventory)
+    current = result if chains else inventory
+    calls = 0
+    elapsed = 0.0
+    while elapsed < min_seconds or calls < 3:
+        start = time.perf_counter()
+        result = operation(current)
+        elapsed += time.perf_counter() - start
+        calls += 1
+        if chains:
+            current = result
+    return elapsed / calls, current
+
+
+def _build_inventory(catalog, backend):
+    """Build the inventory under test for a backend name."""
+    return IndexedInventory(catalog) if backend == "indexed" else dict(catalog)
+
+
+def _same_result(left, right):
+    """
+    Compare two operation results, including the order of mapping entries.
+
+    Floats are compared with a relative tolerance, since backends may sum in a
+    different order.
+    """
+    if isinstance(left, Mapping) and isinstance(right, Mapping):
+        return list(left.keys()) == list(right.keys()) and all(
+            _same_result(left[key], right[key]) for key in left)
+    if isinstance(left, (list, tuple)) and isinstance(right, (list, tuple)):
+        return len(left) == len(right) and all(_same_result(a, b) for a, b in zip(left, right))
+    if isinstance(left, float) or isinstance(right, float):
+        return math.isclose(left, right, rel_tol=1e-9)
+    return left == right
+
+
+def verify_backends(size=1000, backends=("dict", "indexed"), seed=42):
+    """
+    Check that every benchmarked operation gives the same result on every backend.
+
+    Each operation runs once per backend, and chained updates run a second
+    time on the inventory they returned. Results are compared with the first
+    backend's, in order, so a benchmark never times a backend that is fast
+    because it does different work.
+
+    Args:
+        size (int): Catalog size to generate
+        backends (list): Backend names, the reference first
+        seed (int): Catalog random seed
+
+    Returns:
+        list: (function, backend) pairs whose results differ from the reference
+    """
+    catalog = generate_catalog(size, seed)
+    inventories = {backend: _build_inventory(catalog, backend) for backend in backends}
+    mismatches = []
+    for name, operation, chains in _operations(catalog):
+        results = {}
+        for backend, inventory in inventories.items():
+            result = operation(inventory)
+            results[backend] = [result, operation(result)] if chains else result
+        reference = results[backends[0]]
+        mismatches.extend((name, backend) for backend in backends[1:]
+                          if not _same_result(results[backend], reference))
+    return mismatches
+
+
+def indexed_speedups(size=100000, seed=42, min_seconds=0.2, functions=INDEXED_OPERATIONS):
+    """
+    Time indexed operations against a scan of a plain dictionary holding the same catalog.
+
+    Args:
+        size (int): Catalog size to generate
+        seed (int): Catalog random seed
+        min_seconds (float): Minimum timing duration per operation and backend
+        functions (list): Names of the operations to time
+
+    Returns:
+        dict: Dictionary seconds per call divided by indexed seconds per call,
+            by function name; above 1 where the indexed inventory is faster
+    """
+    catalog = generate_catalog(size, seed)
+    inventories = {backend: _build_inventory(catalog, backend) for backend in ("dict", "indexed")}
+    speedups = {}
+    for name, operation, chains in _operations(catalog):
+        if name in functions:
+            seconds = {backend: _time_operation(operation, inventory, chains, min_seconds)[0]
+                       for backend, inventory in inventories.items()}
+            speedups[name] = seconds["dict"] / seconds["indexed"]
+    return speedups
+
+
+def _peak_memory(operation, inventory):
+    """Return the peak bytes allocated during one call of an operation."""
+    tracemalloc.start()
+    try:
+        operation(inventory)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak
+
+
+def run_benchmarks(sizes=DEFAULT_SIZES, backends=("dict", "indexed"), seed=42, min_seconds=0.2,
+                   progress=None):
+    """
+    Benchmark every operation on every catalog size and inventory backend.
+
+    Args:
+        sizes (list): Catalog sizes to generate
+        backends (list): "dict" for plain dictionaries, "indexed" for IndexedInventory
+        seed (int): Catalog random seed
+        min_seconds (float): Minimum timing duration per operation
+        progress (callable): Optional function called with a message after each result
+
+    Returns:
+        dict: Report with "meta" and a list of "results"
+    """
+    results = []
+    for size in sizes:
+        catalog = generate_catalog(size, seed)
+        for backend in backends:
+            start = time.perf_counter()
+            inventory = _build_inventory(catalog, backend)
+            build_seconds = time.perf_counter() - start
+            for name, operation, chains in _operations(catalog):
+                seconds, current = _time_operation(operation, inventory, chains, min_seconds)
+                result = {
+                    "function": name,
+                    "backend": backend,
+                    "size": size,
+                    "seconds_per_op": seconds,
+                    "ops_per_sec": 1 / seconds if seconds else float("inf"),
+                    "peak_bytes": _peak_memory(operation, current),
+                    "build_seconds": build_seconds
+                }
+                results.append(result)
+                if progress is not None:
+                    progress(f"{backend:8} {size:>8} {name:32} {result['ops_per_sec']:>14,.1f} ops/sec")
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "seed": seed,
+            "sizes": list(sizes),
+            "backends": list(backends),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S")
+        },
+        "results": results
+    }
+
+
+def compare_reports(baseline, candidate):
+    """
+    Compare two benchmark reports.
+
+    Args:
+        baseline (dict): Earlier report
+        candidate (dict): Later report
+
+    Returns:
+        list: (function, backend, size, speedup) tuples for results present in both,
+            where speedup is candidate ops/sec divided by baseline ops/sec
+    """
+    baseline_results = {(result["function"], result["backend"], result["size"]): result
+                        for result in baseline["results"]}
+    comparison = []
+    for result in candidate["results"]:
+        key = (result["function"], result["backend"], result["size"])
+        if key in baseline_results:
+            comparison.append((*key, result["ops_per_sec"] / baseline_results[key]["ops_per_sec"]))
+    return comparison
+
+
+def main(arguments=None):
+    """Command-line entry point."""
+    parser = argparse.ArgumentParser(description="Benchmark the online store inventory functions.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES))
+    parser.add_argument("--backends", nargs="+", default=["dict", "indexed"], choices=["dict", "indexed"])
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--min-seconds", type=float, default=0.2)
+    parser.add_argument("--output", default="bench.json")
+    parser.add_argument("--compare", nargs=2, metavar=("BASELINE", "CANDIDATE"))
+    parser.add_argument("--verify", action="store_true",
+                        help="check that every backend gives the same results instead of timing them")
+    parser.add_argument("--check-speedups", action="store_true",
+                        help="check that the indexed operations beat a dictionary scan instead of timing everything")
+    options = parser.parse_args(arguments)
+
+    if options.verify:
+        agree = True
+        for size in options.sizes:
+            mismatches = verify_backends(size, options.backends, options.seed)
+            for function, backend in mismatches:
+                print(f"{backend:8} {size:>8} {function:32} differs from {options.backends[0]}")
+            agree = agree and not mismatches
+        print("All backends agree" if agree else "Backends disagree")
+        sys.exit(0 if agree else 1)
+
+    if options.check_speedups:
+        faster = True
+        for size in options.sizes:
+            for function, speedup in indexed_speedups(size, options.seed, options.min_seconds).items():
+                print(f"indexed  {size:>8} {function:32} {speedup:>7.2f}x")
+                faster = faster and speedup > 1
+        print("Indexed operations are faster" if faster else "Indexed operations are not faster")
+        sys.exit(0 if faster else 1)
+
+    if options.compare:
+        with open(options.compare[0], encoding="utf-8") as baseline_file:
+            baseline = json.load(baseline_file)
+        with open(options.compare[1], encoding="utf-8") as candidate_file:
+            candidate = json.load(candidate_file)
+        for function, backend, size, speedup in compare_reports(baseline, candidate):
+            print(f"{backend:8} {size:>8} {function:32} {speedup:>7.2f}x")
+        return
+
+    report = run_benchmarks(options.sizes, options.backends, options.seed, options.min_seconds, print)
+    with open(options.output, "w", encoding="utf-8") as output_file:
+        json.dump(report, output_file, indent=2)
+    print(f"Wrote {len(report['results'])} results to {options.output}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,208 @@
+"""
+Catalog Loader
+Streams product records from CSV or JSONL files in fixed-size batches, validating
+each record against the product constraints of the online store.
+"""
+
+import csv
+import json
+import math
+import os
+import time
+
+# Categories a product may belong to
+PRODUCT_CATEGORIES = ("electronics", "clothing", "groceries", "footwear", "health")
+
+# Column order of CSV catalogs; features are separated by FEATURE_SEPARATOR
+CSV_FIELDS = ("id", "name", "category", "price", "stock", "rating", "features")
+FEATURE_SEPARATOR = "|"
+
+
+def check_number(value, field):
+    """
+    Check that a value is a finite number, as a product's numeric fields must be.
+
+    Booleans are rejected although Python counts them as integers, and so are
+    NaN and infinities, which would break the sorted order of a price index.
+
+    Args:
+        value: Value to check
+        field (str): Field name for the error message
+
+    Returns:
+        The value, unchanged
+    """
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise ValueError(f"{field} must be a number")
+    if isinstance(value, float) and not math.isfinite(value):
+        raise ValueError(f"{field} must be a finite number")
+    return value
+
+
+def _parse_number(value, field):
+    """
+    Convert a raw numeric field to a finite float.
+
+    Numbers and numeric strings (as read from CSV) are accepted, under the
+    rules of check_number.
+
+    Args:
+        value: Raw field value
+        field (str): Field name for the error message
+
+    Returns:
+        float: The parsed value
+    """
+    if isinstance(value, str):
+        try:
+            value = float(value)
+        except ValueError:
+            raise ValueError(f"{field} must be a number")
+    return float(check_number(value, field))
+
+
+def validate_product(record):
+    """
+    Validate a raw catalog record and convert it to a product entry.
+
+    Args:
+        record (dict): Raw record with an "id" field and the product fields
+
+    Returns:
+        tuple: (product_id, product_data)
+    """
+    if not isinstance(record, dict):
+        raise ValueError("Record must be a dictionary")
+    missing = [field for field in CSV_FIELDS if field not in record]
+    if missing:
+        raise ValueError(f"Missing fields: {', '.join(missing)}")
+
+    pid = str(record["id"]).strip()
+    name = str(record["name"]).strip()
+    if not pid:
+        raise ValueError("Product ID cannot be empty")
+    if not name:
+        raise ValueError("Name cannot be empty")
+    if record["category"] not in PRODUCT_CATEGORIES:
+        raise ValueError(f"Category must be one of: {', '.join(PRODUCT_CATEGORIES)}")
+
+    price = _parse_number(record["price"], "Price")
+    stock = _parse_number(record["stock"], "Stock")
+    rating = _parse_number(record["rating"], "Rating")
+    if not stock.is_integer():
+        raise ValueError("Stock must be a whole number")
+    stock = int(record["stock"]) if isinstance(record["stock"], int) else int(stock)
+    if price < 0:
+        raise ValueError("Price cannot be negative")
+    if stock < 0:
+        raise ValueError("Stock cannot be negative")
+    if not 1.0 <= rating <= 5.0:
+        raise ValueError("Rating must be between 1.0 and 5.0")
+
+    features = record["features"]
+    if isinstance(features, str):
+        features = [feature.strip() for feature in features.split(FEATURE_SEPARATOR) if feature.strip()]
+    if not isinstance(features, list) or not all(isinstance(feature, str) for feature in features):
+        raise ValueError("Features must be a list of strings")
+
+    return pid, {
+        "name": name,
+        "category": record["category"],
+        "price": price,
+        "stock": stock,
+        "rating": rating,
+        "features": features
+    }
+
+
+def _read_records(path):
+    """Yield (line_number, raw_record) pairs from a CSV or JSONL catalog file."""
+    extension = os.path.splitext(path)[1].lower()
+    with open(path, newline="", encoding="utf-8") as catalog_file:
+        if extension == ".csv":
+            reader = csv.DictReader(catalog_file)
+            for record in reader:
+                yield reader.line_num, record
+        elif extension in (".jsonl", ".ndjson"):
+            for line_number, line in enumerate(catalog_file, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError as e:
+                    raise ValueError(f"Line {line_number}: Invalid JSON: {e.msg}")
+                yield line_number, record
+        else:
+            raise ValueError(f"Unsupported catalog format: {extension or path}")
+
+
+def stream_catalog(path, batch_size=10000, errors=None, stats=None):
+    """
+    Stream validated products from a catalog file in batches.
+
+    Args:
+        path (str): Path to a .csv or .jsonl catalog
+        batch_size (int): Maximum number of products per batch
+        errors (list): If given, invalid records are skipped and
+            (line_number, message) pairs are appended here instead of raising
+        stats (dict): If given, updated with "rows", "rejected", "seconds"
+            and "rows_per_second" as the stream is consumed
+
+    Yields:
+        dict: Batches of products by product ID, ready for merge_inventories
+    """
+    if path is None:
+        raise ValueError("Catalog path cannot be None")
+    if batch_size is None or batch_size < 1:
+        raise ValueError("Batch size must be at least 1")
+    if stats is None:
+        stats = {}
+    stats.update({"rows": 0, "rejected": 0, "seconds": 0.0, "rows_per_second": 0.0})
+
+    start = time.perf_counter()
+
+    def record_progress():
+        stats["seconds"] = time.perf_counter() - start
+        if stats["seconds"] > 0:
+            stats["rows_per_second"] = stats["rows"] / stats["seconds"]
+
+    batch = {}
+    for line_number, record in _read_records(path):
+        try:
+            pid, product = validate_product(record)
+        except ValueError as e:
+            if errors is None:
+                raise ValueError(f"Line {line_number}: {e}")
+            errors.append((line_number, str(e)))
+            stats["rejected"] += 1
+            continue
+        batch[pid] = product
+        stats["rows"] += 1
+        if len(batch) >= batch_size:
+            record_progress()
+            yield batch
+            batch = {}
+    record_progress()
+    if batch:
+        yield batch
+
+
+def load_catalog(path, inventory=None, batch_size=10000, errors=None):
+    """
+    Load a catalog file into an inventory, one batch at a time.
+
+    Args:
+        path (str): Path to a .csv or .jsonl catalog
+        inventory (dict): Inventory to load into; it is copied, not modified
+        batch_size (int): Number of products read per batch
+        errors (list): If given, collects invalid records instead of raising
+
+    Returns:
+        tuple: (loaded_inventory, stats) where stats has "rows", "rejected",
+            "seconds" and "rows_per_second"
+    """
+    loaded_inventory = inventory.copy() if inventory is not None else {}
+    stats = {}
+    for batch in stream_catalog(path, batch_size, errors, stats):
+        loaded_inventory.update(batch)
+    return loaded_inventory, stats
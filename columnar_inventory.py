@@ -0,0 +1,280 @@
+"""
+Columnar Inventory
+Optional NumPy-backed inventory that stores each product field as a column, so
+the numeric filters and statistics run as vectorized array operations.
+"""
+
+from collections.abc import MutableMapping
+from math import fsum
+
+from inventory_index import next_version
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; plain and indexed inventories do not need it
+    np = None
+
+# Product fields stored as dedicated columns; any other field is kept per row
+COLUMN_FIELDS = ("name", "category", "price", "stock", "rating", "features")
+
+
+class ColumnarInventory(MutableMapping):
+    """
+    Product inventory stored as NumPy columns.
+
+    Price, stock and rating are numeric arrays, category is an integer code
+    array into a list of category names, and names, features and any extra
+    fields (such as ``new_arrival``) are kept in row-aligned lists. Reading a
+    product builds its dictionary on demand, so the store converts to and from
+    the plain inventory format without losing fields. ``version`` is stamped
+    on every write, as for IndexedInventory.
+    """
+
+    def __init__(self, products=None):
+        """
+        Args:
+            products (dict): Initial products by product ID
+        """
+        if np is None:
+            raise ImportError("ColumnarInventory requires NumPy")
+        products = products if products is not None else {}
+
+        self.categories = []
+        category_codes = {}
+        codes = []
+        for product in products.values():
+            category = product["category"]
+            if category not in category_codes:
+                category_codes[category] = len(self.categories)
+                self.categories.append(category)
+            codes.append(category_codes[category])
+
+        self.ids = np.array(list(products.keys()), dtype=object)
+        self.category_codes = np.array(codes, dtype=np.int32)
+        self.price = np.array([product["price"] for product in products.values()], dtype=np.float64)
+        self.stock = np.array([product["stock"] for product in products.values()], dtype=np.int64)
+        self.rating = np.array([product["rating"] for product in products.values()], dtype=np.float64)
+        self.names = [product["name"] for product in products.values()]
+        self.features = [product["features"] for product in products.values()]
+        self.extras = [{key: value for key, value in product.items() if key not in COLUMN_FIELDS}
+                       for product in products.values()]
+        self._rows = {pid: row for row, pid in enumerate(products.keys())}
+        self.version = next_version()
+
+    @classmethod
+    def from_dict(cls, inventory):
+        """
+        Build a columnar store from a product inventory.
+
+        Args:
+            inventory (dict): The product inventory
+
+        Returns:
+            ColumnarInventory: Columnar copy of the inventory
+        """
+        return cls(inventory)
+
+    def to_dict(self):
+        """
+        Convert the store back to a plain product inventory.
+
+        Returns:
+            dict: Products by product ID
+        """
+        return {pid: self._product(row) for pid, row in self._rows.items()}
+
+    def _product(self, row):
+        """Build the product dictionary stored at a row."""
+        return {
+            "name": self.names[row],
+            "category": self.categories[self.category_codes[row]],
+            "price": float(self.price[row]),
+            "stock": int(self.stock[row]),
+            "rating": float(self.rating[row]),
+            "features": self.features[row],
+            **self.extras[row]
+        }
+
+    def _select(self, mask):
+        """Return the products selected by a boolean row mask."""
+        return {self.ids[row]: self._product(row) for row in np.flatnonzero(mask)}
+
+    def _category_code(self, category):
+        """Return the code of a category name, adding it if it is new."""
+        if category not in self.categories:
+            self.categories.append(category)
+        return self.categories.index(category)
+
+    def __getitem__(self, pid):
+        return self._product(self._rows[pid])
+
+    def _write_row(self, row, product):
+        """Overwrite the columns of an existing row with a product."""
+        self.category_codes[row] = self._category_code(product["category"])
+        self.price[row] = product["price"]
+        self.stock[row] = product["stock"]
+        self.rating[row] = product["rating"]
+        self.names[row] = product["name"]
+        self.features[row] = product["features"]
+        self.extras[row] = {key: value for key, value in product.items() if key not in COLUMN_FIELDS}
+
+    def _append_rows(self, products):
+        """Add new products as rows at the end, growing each column once."""
+        start = len(self.ids)
+        self.ids = np.concatenate([self.ids, np.array(list(products), dtype=object)])
+        self.category_codes = np.concatenate([self.category_codes, np.array(
+            [self._category_code(product["category"]) for product in products.values()], dtype=np.int32)])
+        self.price = np.concatenate([self.price, np.array(
+            [product["price"] for product in products.values()], dtype=np.float64)])
+        self.stock = np.concatenate([self.stock, np.array(
+            [product["stock"] for product in products.values()], dtype=np.int64)])
+        self.rating = np.concatenate([self.rating, np.array(
+            [product["rating"] for product in products.values()], dtype=np.float64)])
+        self.names.extend(product["name"] for product in products.values())
+        self.features.extend(product["features"] for product in products.values())
+        self.extras.extend({key: value for key, value in product.items() if key not in COLUMN_FIELDS}
+                           for product in products.values())
+        self._rows.update((pid, start + offset) for offset, pid in enumerate(products))
+
+    def __setitem__(self, pid, product):
+        self.version = next_version()
+        row = self._rows.get(pid)
+        if row is None:
+            self._append_rows({pid: product})
+        else:
+            self._write_row(row, product)
+
+    def update(self, other=(), **kwargs):
+        """
+        Write many products at once.
+
+        Existing rows are overwritten in place and new products are appended
+        with one concatenation per column, so merging k products into n costs
+        O(n + k) instead of O(n * k) for one insert at a time.
+
+        Args:
+            other: Mapping or iterable of (pid, product) pairs
+            **kwargs: More products by product ID
+        """
+        products = dict(other, **kwargs)
+        if not products:
+            return
+        self.version = next_version()
+        new_products = {}
+        for pid, product in products.items():
+            row = self._rows.get(pid)
+            if row is None:
+                new_products[pid] = product
+            else:
+                self._write_row(row, product)
+        if new_products:
+            self._append_rows(new_products)
+
+    def __delitem__(self, pid):
+        row = self._rows.pop(pid)
+        self.version = next_version()
+        self.ids = np.delete(self.ids, row)
+        self.category_codes = np.delete(self.category_codes, row)
+        self.price = np.delete(self.price, row)
+        self.stock = np.delete(self.stock, row)
+        self.rating = np.delete(self.rating, row)
+        del self.names[row]
+        del self.features[row]
+        del self.extras[row]
+        self._rows = {pid: row for row, pid in enumerate(self.ids)}
+
+    def __iter__(self):
+        return iter(self._rows)
+
+    def items_from(self, position):
+        """Yield (product_id, product_data) pairs in inventory order, starting at a row."""
+        for row in range(position, len(self.ids)):
+            yield self.ids[row], self._product(row)
+
+    def __len__(self):
+        return len(self._rows)
+
+    def __contains__(self, pid):
+        return pid in self._rows
+
+    def __repr__(self):
+        return f"ColumnarInventory({self.to_dict()!r})"
+
+    def copy(self):
+        """
+        Create an independent copy of the store.
+
+        Returns:
+            ColumnarInventory: Copy with its own columns
+        """
+        new_inventory = ColumnarInventory.__new__(ColumnarInventory)
+        new_inventory.categories = self.categories.copy()
+        new_inventory.ids = self.ids.copy()
+        new_inventory.category_codes = self.category_codes.copy()
+        new_inventory.price = self.price.copy()
+        new_inventory.stock = self.stock.copy()
+        new_inventory.rating = self.rating.copy()
+        new_inventory.names = self.names.copy()
+        new_inventory.features = self.features.copy()
+        new_inventory.extras = self.extras.copy()
+        new_inventory._rows = self._rows.copy()
+        new_inventory.version = self.version
+        return new_inventory
+
+    def filter_by_category(self, category):
+        """Return the products in a category."""
+        if category not in self.categories:
+            return {}
+        return self._select(self.category_codes == self.categories.index(category))
+
+    def filter_by_price_range(self, min_price, max_price):
+        """Return the products priced from min_price to max_price inclusive."""
+        return self._select((self.price >= min_price) & (self.price <= max_price))
+
+    def filter_by_availability(self, min_stock):
+        """Return the products with at least min_stock units in stock."""
+        return self._select(self.stock >= min_stock)
+
+    def category_counts(self):
+        """Return the number of products in each category."""
+        counts = np.bincount(self.category_codes, minlength=len(self.categories))
+        # Categories appear in the order a scan first meets them, as for a plain dictionary
+        first_rows = np.full(len(self.categories), len(self.ids))
+        np.minimum.at(first_rows, self.category_codes, np.arange(len(self.ids)))
+        return {self.categories[code]: int(counts[code]) for code in np.argsort(first_rows, kind="stable")
+                if counts[code]}
+
+    def total_value(self):
+        """
+        Return the total value of the inventory (price * stock).
+
+        The products are multiplied as arrays but summed with math.fsum, as
+        calculate_total_inventory_value sums a dictionary, so both give the
+        same float; np.dot rounds differently.
+        """
+        return fsum((self.price * self.stock).tolist())
+
+    def highest_rated(self):
+        """Return (product_id, product_data) of the first product with the highest rating."""
+        row = int(np.argmax(self.rating))
+        return self.ids[row], self._product(row)
+
+    def price_histogram(self, edges, summary):
+        """
+        Group products into price buckets between ascending edges.
+
+        Args:
+            edges (list): Ascending bucket boundaries
+            summary (str): "ids", "counts" or "values"
+
+        Returns:
+            list: One entry per bucket, len(edges) + 1 in total
+        """
+        buckets = np.searchsorted(np.asarray(edges, dtype=np.float64), self.price, side="right")
+        if summary == "counts":
+            return np.bincount(buckets, minlength=len(edges) + 1).tolist()
+        if summary == "values":
+            return np.bincount(buckets, weights=self.price * self.stock, minlength=len(edges) + 1).tolist()
+        order = np.argsort(buckets, kind="stable")
+        splits = np.cumsum(np.bincount(buckets, minlength=len(edges) + 1))[:-1]
+        return [ids.tolist() for ids in np.split(self.ids[order], splits)]
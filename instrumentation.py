@@ -0,0 +1,240 @@
+"""
+Instrumentation
+Opt-in profiling of the public inventory functions: call counts, errors,
+latency percentiles and input sizes per function. While disabled the original
+functions are left in place, so there is no overhead at all.
+"""
+
+import functools
+import importlib
+from collections.abc import Sized
+from threading import Lock
+from time import perf_counter_ns
+
+# Public functions of online_store_management_system that are wrapped when profiling is enabled
+INSTRUMENTED_FUNCTIONS = (
+    "filter_by_category",
+    "filter_by_price_range",
+    "filter_by_availability",
+    "filter_by_feature",
+    "find_products_with_keyword",
+    "query",
+    "update_product_price",
+    "update_stock_level",
+    "add_product_feature",
+    "merge_inventories",
+    "apply_updates",
+    "calculate_category_counts",
+    "calculate_total_inventory_value",
+    "find_highest_rated_product",
+    "top_k",
+    "create_price_histogram",
+    "create_price_brackets",
+    "display_data"
+)
+
+# Latency buckets per power of two; 8 keeps percentiles within 12.5% of the true value
+SUB_BUCKETS = 8
+
+
+def _bucket(nanoseconds):
+    """Return the histogram bucket of a latency."""
+    if nanoseconds < SUB_BUCKETS:
+        return nanoseconds
+    shift = nanoseconds.bit_length() - 4
+    return shift * SUB_BUCKETS + (nanoseconds >> shift)
+
+
+def _bucket_limit(bucket):
+    """Return the largest latency that falls in a bucket."""
+    if bucket < 2 * SUB_BUCKETS:
+        return bucket
+    shift, mantissa = divmod(bucket, SUB_BUCKETS)
+    return ((mantissa + SUB_BUCKETS + 1) << (shift - 1)) - 1
+
+
+class LatencyHistogram:
+    """Log-linear latency histogram with constant memory per function."""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0
+        self.maximum = 0
+        self._buckets = {}
+
+    def record(self, nanoseconds):
+        """Add one latency measurement in nanoseconds."""
+        self.count += 1
+        self.total += nanoseconds
+        if nanoseconds > self.maximum:
+            self.maximum = nanoseconds
+        bucket = _bucket(nanoseconds)
+        self._buckets[bucket] = self._buckets.get(bucket, 0) + 1
+
+    def percentile(self, fraction):
+        """
+        Return an upper bound on the given percentile.
+
+        Args:
+            fraction (float): Percentile as a fraction, e.g. 0.95
+
+        Returns:
+            int: Latency in nanoseconds, or 0 if nothing was recorded
+        """
+        if not self.count:
+            return 0
+        rank = max(1, round(fraction * self.count))
+        seen = 0
+        for bucket in sorted(self._buckets):
+            seen += self._buckets[bucket]
+            if seen >= rank:
+                return min(_bucket_limit(bucket), self.maximum)
+        return self.maximum
+
+
+class _OperationStats:
+    """Counters for one instrumented function."""
+
+    def __init__(self):
+        self.errors = 0
+        self.latency = LatencyHistogram()
+        self.sized_calls = 0
+        self.total_size = 0
+        self.max_size = 0
+
+
+class Profiler:
+    """
+    Records call counts, latency percentiles and input sizes of instrumented functions.
+
+    ``enable()`` replaces the public functions of the store module with
+    measuring wrappers and ``disable()`` puts the originals back. Only code
+    that looks functions up on the module, such as ``main()`` or
+    ``store.filter_by_category(...)``, is measured; names imported with
+    ``from ... import`` before enabling keep calling the originals.
+    """
+
+    def __init__(self):
+        self._stats = {}
+        self._originals = {}
+        self._module = None
+        self._lock = Lock()
+
+    @property
+    def enabled(self):
+        """Whether wrappers are currently installed."""
+        return self._module is not None
+
+    def enable(self, module=None, names=INSTRUMENTED_FUNCTIONS):
+        """
+        Start profiling by wrapping functions in a module.
+
+        Args:
+            module (module): Module to instrument; online_store_management_system by default
+            names (tuple): Names of the functions to wrap
+        """
+        if self.enabled:
+            return
+        if module is None:
+            module = importlib.import_module("online_store_management_system")
+        for name in names:
+            function = getattr(module, name, None)
+            if callable(function):
+                self._originals[name] = function
+                setattr(module, name, self._wrap(name, function))
+        self._module = module
+
+    def disable(self):
+        """Stop profiling and restore the original functions. Recorded data is kept."""
+        if not self.enabled:
+            return
+        for name, function in self._originals.items():
+            setattr(self._module, name, function)
+        self._originals.clear()
+        self._module = None
+
+    def _wrap(self, name, function):
+        """Return a wrapper that measures every call of a function."""
+        record = self._record
+
+        @functools.wraps(function)
+        def instrumented(*args, **kwargs):
+            failed = False
+            start = perf_counter_ns()
+            try:
+                return function(*args, **kwargs)
+            except Exception:
+                failed = True
+                raise
+            finally:
+                record(name, perf_counter_ns() - start, args[0] if args else None, failed)
+        return instrumented
+
+    def _record(self, name, nanoseconds, data, failed):
+        """Add one call to the statistics of a function."""
+        size = len(data) if isinstance(data, Sized) and not isinstance(data, str) else None
+        with self._lock:
+            stats = self._stats.get(name)
+            if stats is None:
+                stats = self._stats[name] = _OperationStats()
+            stats.latency.record(nanoseconds)
+            if failed:
+                stats.errors += 1
+            if size is not None:
+                stats.sized_calls += 1
+                stats.total_size += size
+                if size > stats.max_size:
+                    stats.max_size = size
+
+    def reset(self):
+        """Discard all recorded data."""
+        with self._lock:
+            self._stats.clear()
+
+    def stats(self):
+        """
+        Return the recorded data per function.
+
+        Returns:
+            dict: For each called function, calls, errors, mean, p50, p95, p99 and
+                max latency in seconds, and mean and max input size
+        """
+        report = {}
+        with self._lock:
+            for name, stats in self._stats.items():
+                latency = stats.latency
+                report[name] = {
+                    "calls": latency.count,
+                    "errors": stats.errors,
+                    "mean_seconds": latency.total / latency.count / 1e9,
+                    "p50_seconds": latency.percentile(0.50) / 1e9,
+                    "p95_seconds": latency.percentile(0.95) / 1e9,
+                    "p99_seconds": latency.percentile(0.99) / 1e9,
+                    "max_seconds": latency.maximum / 1e9,
+                    "mean_input_size": stats.total_size / stats.sized_calls if stats.sized_calls else None,
+                    "max_input_size": stats.max_size if stats.sized_calls else None
+                }
+        return report
+
+    def report(self):
+        """
+        Format the recorded data as a table, slowest total time first.
+
+        Returns:
+            str: Printable report
+        """
+        stats = self.stats()
+        if not stats:
+            return "No calls recorded."
+        lines = [f"{'Function':32} {'Calls':>7} {'Errors':>6} {'p50 ms':>9} {'p95 ms':>9} "
+                 f"{'p99 ms':>9} {'Max ms':>9} {'Avg size':>10}"]
+        for name, entry in sorted(stats.items(), key=lambda item: -item[1]["mean_seconds"] * item[1]["calls"]):
+            size = f"{entry['mean_input_size']:,.0f}" if entry["mean_input_size"] is not None else "-"
+            lines.append(f"{name:32} {entry['calls']:>7} {entry['errors']:>6} "
+                         f"{entry['p50_seconds'] * 1000:>9.3f} {entry['p95_seconds'] * 1000:>9.3f} "
+                         f"{entry['p99_seconds'] * 1000:>9.3f} {entry['max_seconds'] * 1000:>9.3f} {size:>10}")
+        return "\n".join(lines)
+
+
+# Shared profiler used by main()
+profiler = Profiler()
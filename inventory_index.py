@@ -0,0 +1,859 @@
+"""
+Inventory Indexes
+Secondary indexes that let the online store dictionary operations answer
+filters without scanning every product in the inventory.
+"""
+
+import copy
+from collections.abc import MutableMapping
+from itertools import count, islice
+
+from catalog_loader import check_number
+from persistent_map import REBUILD_RATIO, HashMap, PersistentMap, SortedMap
+
+
+# Source of inventory version stamps, shared by every inventory type
+_versions = count(1)
+
+
+def next_version():
+    """
+    Return a new inventory version stamp.
+
+    Stamps increase monotonically and are never reused, so two inventories
+    with the same version hold the same products.
+
+    Returns:
+        int: Version stamp
+    """
+    return next(_versions)
+
+
+def _category_values(product):
+    """Return the category index values of a product."""
+    return (product["category"],)
+
+
+def _feature_values(product):
+    """Return the feature index values of a product."""
+    return product["features"]
+
+
+def _price_value(product):
+    """Return the price index value of a product."""
+    return product["price"]
+
+
+def _check_prices(products):
+    """
+    Reject products whose price the price index could not keep in order.
+
+    Checked on every write rather than when the price index is built, since
+    it is built lazily and must not find a NaN price in products already
+    accepted.
+
+    Args:
+        products: Iterable of (pid, product) pairs
+    """
+    for pid, product in products:
+        check_number(product["price"], f"Price of product {pid}")
+
+
+def _value_source(product):
+    """Return the fields that the inventory value depends on."""
+    return (product["price"], product["stock"])
+
+
+def _keyword_source(product):
+    """Return the searchable fields of a product."""
+    return (product["name"], tuple(product["features"]))
+
+
+def _keyword_texts(product):
+    """Return the lowercased name and features that keyword search matches against."""
+    return (product["name"].lower(),) + tuple(feature.lower() for feature in product["features"])
+
+
+# Length of the character n-grams in the keyword index
+GRAM_SIZE = 3
+
+# Map shared by every missing bucket
+_EMPTY = SortedMap()
+
+
+def _grams(texts):
+    """Return the set of n-grams that occur in any of the given texts."""
+    return {text[i:i + GRAM_SIZE] for text in texts for i in range(len(text) - GRAM_SIZE + 1)}
+
+
+def _apply_buckets(buckets, removed, added):
+    """
+    Apply a batch of changes to a map of buckets, each a sorted map.
+
+    Args:
+        buckets (SortedMap): Buckets by value
+        removed (dict): Sets of bucket keys to remove, by value
+        added (dict): Dictionaries of bucket entries to set, by value
+
+    Returns:
+        SortedMap: Updated buckets, without any bucket left empty
+    """
+    emptied = []
+    changed = []
+    for value in removed.keys() | added.keys():
+        bucket = buckets.get(value, _EMPTY).apply(removed.get(value, ()), added.get(value, {}).items())
+        if bucket:
+            changed.append((value, bucket))
+        else:
+            emptied.append(value)
+    return buckets.apply(emptied, changed)
+
+
+class SecondaryIndex:
+    """
+    Base class for indexes that are maintained incrementally on every write.
+
+    Subclasses set ``_extract`` and implement ``replace_many``. Products are
+    indexed under their insertion rank in the inventory, so lookups return
+    product IDs in inventory order. An index holds only persistent maps and
+    replaces them on every change, so ``copy()`` is shallow: writes to the
+    copy leave the original index, and every inventory sharing it, unchanged.
+    """
+
+    def copy(self):
+        """Return an index that shares this one's maps."""
+        return copy.copy(self)
+
+    def replace(self, pid, rank, old_product, new_product):
+        """
+        Move a product from its old indexed value to its new one.
+
+        Args:
+            pid (str): Product ID
+            rank (int): Insertion rank of the product in the inventory
+            old_product (dict): Previous product data, or None for an insert
+            new_product (dict): New product data, or None for a delete
+        """
+        self.replace_many([(pid, rank, old_product, new_product)])
+
+    def add_many(self, entries):
+        """
+        Index many products.
+
+        Args:
+            entries: Iterable of (pid, rank, product) tuples not yet in the index
+        """
+        self.replace_many([(pid, rank, None, product) for pid, rank, product in entries])
+
+    def _changes(self, changes):
+        """Yield the changes of a batch that alter the indexed fields of a product."""
+        for pid, rank, old_product, new_product in changes:
+            if old_product is not None and new_product is not None:
+                if self._extract(old_product) == self._extract(new_product):
+                    continue
+            yield pid, rank, old_product, new_product
+
+
+class AttributeIndex(SecondaryIndex):
+    """
+    Hash index from an attribute value to the products that carry it.
+
+    Each bucket maps insertion ranks to (product ID, product data) pairs, so
+    lookups return products in inventory order without reading the product
+    map, and bucket sizes are O(1). Every write of a product refreshes its
+    entries, not only writes that change its indexed values.
+    """
+
+    def __init__(self, extract):
+        """
+        Args:
+            extract (callable): Returns the indexed values of a product
+        """
+        self._extract = extract
+        self._buckets = _EMPTY
+
+    def replace_many(self, changes):
+        """
+        Apply many replacements with one pass over the changed buckets.
+
+        A product keeps its rank when it is replaced, so it leaves only the
+        buckets of the values it loses.
+
+        Args:
+            changes (list): (pid, rank, old_product, new_product) tuples, as for replace()
+        """
+        removed = {}
+        added = {}
+        for pid, rank, old_product, new_product in changes:
+            if old_product is new_product:
+                continue
+            old_values = set(self._extract(old_product)) if old_product is not None else set()
+            new_values = set(self._extract(new_product)) if new_product is not None else set()
+            for value in old_values - new_values:
+                removed.setdefault(value, set()).add(rank)
+            for value in new_values:
+                added.setdefault(value, {})[rank] = (pid, new_product)
+        if removed or added:
+            self._buckets = _apply_buckets(self._buckets, removed, added)
+
+    def lookup(self, value):
+        """Return the IDs of the products indexed under a value."""
+        return [pid for pid, _ in self._buckets.get(value, _EMPTY).values()]
+
+    def products(self, value):
+        """Return the products indexed under a value, by product ID in inventory order."""
+        return dict(self._buckets.get(value, _EMPTY).values())
+
+    def count(self, value):
+        """Return the number of products indexed under a value."""
+        return len(self._buckets.get(value, _EMPTY))
+
+    def counts(self):
+        """Return the number of products under each value, in order of each value's first product."""
+        ordered = sorted(self._buckets.items(), key=lambda item: next(iter(item[1])))
+        return {value: len(bucket) for value, bucket in ordered}
+
+
+class PriceIndex(SecondaryIndex):
+    """
+    Sorted index of products by price.
+
+    Entries map ``(price, rank)`` keys to ``(pid, product)`` pairs in a sorted
+    map whose nodes record their sizes, so a price range is found with two
+    position lookups, O(log n), and read in O(k log k). Matches are sorted by
+    rank, so products come back in inventory order, as a scan would return
+    them. Every write of a product refreshes its entry.
+    """
+
+    def __init__(self):
+        self._extract = _price_value
+        self._entries = _EMPTY
+
+    def replace_many(self, changes):
+        """
+        Apply many replacements with one batch edit of the sorted entries.
+
+        Args:
+            changes (list): (pid, rank, old_product, new_product) tuples, as for replace()
+        """
+        removed = []
+        added = []
+        for pid, rank, old_product, new_product in changes:
+            if old_product is new_product:
+                continue
+            if old_product is not None and (new_product is None or old_product["price"] != new_product["price"]):
+                removed.append((old_product["price"], rank))
+            if new_product is not None:
+                added.append(((new_product["price"], rank), (pid, new_product)))
+        if removed or added:
+            self._entries = self._entries.apply(removed, added)
+
+    def _in_range(self, min_price, max_price):
+        """Return (rank, (pid, product)) pairs priced from min_price to max_price inclusive, in inventory order."""
+        start = self._entries.position((min_price,))
+        stop = self._entries.position((max_price, float("inf")))
+        matches = [(rank, entry) for (_, rank), entry in islice(self._entries.items_from(position=start),
+                                                                max(stop - start, 0))]
+        # Ranks are unique, so the sort never compares the entries
+        matches.sort()
+        return matches
+
+    def ids_in_range(self, min_price, max_price):
+        """Return the IDs of the products priced from min_price to max_price inclusive."""
+        return [pid for _, (pid, _) in self._in_range(min_price, max_price)]
+
+    def products_in_range(self, min_price, max_price):
+        """Return the products priced from min_price to max_price inclusive, by product ID in inventory order."""
+        return dict(entry for _, entry in self._in_range(min_price, max_price))
+
+    def count_in_range(self, min_price, max_price):
+        """Return the number of products priced from min_price to max_price inclusive."""
+        return max(self._entries.position((max_price, float("inf"))) - self._entries.position((min_price,)), 0)
+
+    def count_in_band(self, lower=None, upper=None):
+        """Return the number of products priced from lower up to, but not including, upper."""
+        start = 0 if lower is None else self._entries.position((lower,))
+        stop = len(self._entries) if upper is None else self._entries.position((upper,))
+        return max(stop - start, 0)
+
+
+class _Posting:
+    """
+    Set of the IDs of the products whose texts contain one n-gram.
+
+    The IDs are a shared frozenset base plus small frozensets of the IDs added
+    and removed since, so a write copies only the small sets. They are folded
+    into a new base once they outgrow a fraction of it, which keeps writes
+    amortized O(1) per ID while searches still intersect sets in C.
+    """
+
+    __slots__ = ("base", "added", "removed")
+
+    def __init__(self, base, added=frozenset(), removed=frozenset()):
+        self.base = base
+        self.added = added
+        self.removed = removed
+
+    def __len__(self):
+        return len(self.base) - len(self.removed) + len(self.added)
+
+    def ids(self):
+        """Return every ID in the posting as a set."""
+        return (self.base - self.removed) | self.added
+
+    def restrict(self, ids):
+        """Return the IDs of a set that are also in the posting."""
+        return ((ids & self.base) - self.removed) | (ids & self.added)
+
+    def changed(self, removed, added):
+        """
+        Return a posting with some IDs removed and others added.
+
+        Args:
+            removed (set): IDs to remove
+            added (set): IDs to add
+
+        Returns:
+            _Posting: Updated posting, sharing the base with this one
+        """
+        base = self.base
+        added_ids = (self.added - removed) | (added - base)
+        removed_ids = ((self.removed | (removed & base)) - added)
+        if len(added_ids) + len(removed_ids) > len(base) // POSTING_SLACK:
+            return _Posting(frozenset((base - removed_ids) | added_ids))
+        return _Posting(base, frozenset(added_ids), frozenset(removed_ids))
+
+
+# Pending changes a posting holds, as a fraction of its base, before they are folded in
+POSTING_SLACK = 8
+
+# Posting of every n-gram that no product contains
+_NO_POSTING = _Posting(frozenset())
+
+# Joins the texts of a product into one string, so a keyword without it is matched with one test
+_TEXT_SEPARATOR = "\x00"
+
+
+def _matching(entries, keyword):
+    """Return the keyword index entries whose texts contain a lowercased keyword."""
+    if _TEXT_SEPARATOR in keyword:
+        return [entry for entry in entries if any(keyword in text for text in entry[3])]
+    # A match in the joined text cannot span two texts, because the keyword has no separator
+    return [entry for entry in entries if keyword in entry[4]]
+
+
+class KeywordIndex(SecondaryIndex):
+    """
+    Inverted n-gram index over the lowercased names and features of products.
+
+    Any keyword of at least ``GRAM_SIZE`` characters can only be a substring of
+    a text that contains all of its n-grams, so intersecting their postings,
+    smallest first, gives a small candidate set. Candidates are then checked
+    with the same substring test as a full scan, against texts lowercased once
+    at index time. Each product ID maps to a ``(rank, pid, product, texts,
+    joined_texts)`` entry, so matches come back in inventory order without
+    reading the product map, and every write of a product refreshes its entry.
+    """
+
+    def __init__(self):
+        self._extract = _keyword_source
+        self._entries = HashMap()
+        self._postings = HashMap()
+
+    def add_many(self, entries):
+        """
+        Index many products with one pass that builds every posting as a plain set.
+
+        Args:
+            entries: Iterable of (pid, rank, product) tuples not yet in the index
+        """
+        if self._entries:
+            super().add_many(entries)
+            return
+        indexed = {}
+        postings = {}
+        for pid, rank, product in entries:
+            texts = _keyword_texts(product)
+            indexed[pid] = (rank, pid, product, texts, _TEXT_SEPARATOR.join(texts))
+            for gram in _grams(texts):
+                posting = postings.get(gram)
+                if posting is None:
+                    postings[gram] = {pid}
+                else:
+                    posting.add(pid)
+        self._entries = HashMap(indexed)
+        self._postings = HashMap((gram, _Posting(frozenset(ids))) for gram, ids in postings.items())
+
+    def replace_many(self, changes):
+        """
+        Apply many replacements, touching only the postings of n-grams a product gains or loses.
+
+        Args:
+            changes (list): (pid, rank, old_product, new_product) tuples, as for replace()
+        """
+        removed_entries = []
+        added_entries = []
+        removed = {}
+        added = {}
+        for pid, rank, old_product, new_product in changes:
+            if old_product is new_product:
+                continue
+            old_entry = self._entries[pid] if old_product is not None else None
+            old_texts = old_entry[3] if old_entry is not None else ()
+            new_texts = ()
+            if new_product is None:
+                removed_entries.append(pid)
+            elif old_entry is not None and self._extract(old_product) == self._extract(new_product):
+                added_entries.append((pid, (rank, pid, new_product, *old_entry[3:])))
+                continue
+            else:
+                new_texts = _keyword_texts(new_product)
+                added_entries.append((pid, (rank, pid, new_product, new_texts, _TEXT_SEPARATOR.join(new_texts))))
+            old_grams = _grams(old_texts)
+            new_grams = _grams(new_texts)
+            for gram in old_grams - new_grams:
+                removed.setdefault(gram, set()).add(pid)
+            for gram in new_grams - old_grams:
+                added.setdefault(gram, set()).add(pid)
+        if not (removed_entries or added_entries):
+            return
+        emptied = []
+        changed = []
+        for gram in removed.keys() | added.keys():
+            posting = self._postings.get(gram, _NO_POSTING).changed(removed.get(gram, set()), added.get(gram, set()))
+            if posting:
+                changed.append((gram, posting))
+            else:
+                emptied.append(gram)
+        self._entries = self._entries.apply(removed_entries, added_entries)
+        if emptied or changed:
+            self._postings = self._postings.apply(emptied, changed)
+
+    def estimate(self, keyword):
+        """
+        Return an upper bound on the number of products matching a keyword.
+
+        Args:
+            keyword (str): Keyword to search for
+
+        Returns:
+            int: Size of the smallest n-gram posting, or the product count for short keywords
+        """
+        keyword = keyword.lower()
+        if len(keyword) < GRAM_SIZE:
+            return len(self._entries)
+        return min(len(self._postings.get(gram, _NO_POSTING)) for gram in _grams((keyword,)))
+
+    def _matches(self, keyword):
+        """Return the entries of the products whose texts contain a keyword, in inventory order."""
+        keyword = keyword.lower()
+        entries = self._entries
+        if len(keyword) < GRAM_SIZE:
+            matches = _matching(entries.values(), keyword)
+        else:
+            postings = sorted((self._postings.get(gram, _NO_POSTING) for gram in _grams((keyword,))), key=len)
+            ids = postings[0].ids()
+            for posting in postings[1:]:
+                if not ids:
+                    break
+                ids = posting.restrict(ids)
+            matches = [entries[pid] for pid in ids]
+            if len(keyword) > GRAM_SIZE:
+                # The posting of a single n-gram is exact, but longer keywords need their n-grams in sequence
+                matches = _matching(matches, keyword)
+        # Ranks are unique, so the sort never compares the rest of an entry
+        matches.sort()
+        return matches
+
+    def search(self, keyword):
+        """
+        Find the products whose name or features contain a keyword.
+
+        Args:
+            keyword (str): Keyword to search for, matched case-insensitively
+
+        Returns:
+            list: IDs of the matching products, in inventory order
+        """
+        return [entry[1] for entry in self._matches(keyword)]
+
+    def products(self, keyword):
+        """Return the products whose name or features contain a keyword, by product ID in inventory order."""
+        return {entry[1]: entry[2] for entry in self._matches(keyword)}
+
+
+class AggregateIndex(SecondaryIndex):
+    """
+    Running total inventory value.
+
+    The total is kept with Neumaier compensated summation so that long runs of
+    price and stock updates do not accumulate floating-point drift. Category
+    counts are the bucket sizes of the category index.
+    """
+
+    def __init__(self):
+        self._extract = _value_source
+        self._value = 0.0
+        self._value_error = 0.0
+
+    def _add_value(self, amount):
+        """Add an amount to the running total value."""
+        total = self._value + amount
+        if abs(self._value) >= abs(amount):
+            self._value_error += (self._value - total) + amount
+        else:
+            self._value_error += (amount - total) + self._value
+        self._value = total
+
+    def replace_many(self, changes):
+        """
+        Subtract the old value and add the new value of each changed product.
+
+        Args:
+            changes (list): (pid, rank, old_product, new_product) tuples, as for replace()
+        """
+        for pid, rank, old_product, new_product in self._changes(changes):
+            if old_product is not None:
+                self._add_value(-(old_product["price"] * old_product["stock"]))
+            if new_product is not None:
+                self._add_value(new_product["price"] * new_product["stock"])
+
+    def total_value(self):
+        """Return the total value of the inventory (price * stock)."""
+        return self._value + self._value_error
+
+
+# Product fields that top-k queries can rank by
+RANKING_KEYS = ("rating", "price", "stock")
+
+
+class RankIndex(SecondaryIndex):
+    """
+    Products ordered by a numeric field, highest first, overall and per category.
+
+    Entries are ``(-value, pid)`` keys in sorted maps, so ties are broken by
+    ascending product ID and the top k products are the first k entries.
+    """
+
+    def __init__(self, field):
+        """
+        Args:
+            field (str): Product field to rank by
+        """
+        self._field = field
+        self._ranked = _EMPTY
+        self._ranked_by_category = _EMPTY
+
+    def _extract(self, product):
+        return (product["category"], product[self._field])
+
+    def replace_many(self, changes):
+        """
+        Apply many replacements with one batch edit of each changed ranking.
+
+        Args:
+            changes (list): (pid, rank, old_product, new_product) tuples, as for replace()
+        """
+        field = self._field
+        removed = {}
+        added = {}
+        for pid, rank, old_product, new_product in self._changes(changes):
+            if old_product is not None:
+                removed.setdefault(old_product["category"], set()).add((-old_product[field], pid))
+            if new_product is not None:
+                added.setdefault(new_product["category"], {})[(-new_product[field], pid)] = rank
+        if removed or added:
+            self._ranked = self._ranked.apply(set().union(*removed.values()),
+                                              [item for entries in added.values() for item in entries.items()])
+            self._ranked_by_category = _apply_buckets(self._ranked_by_category, removed, added)
+
+    def top(self, k, category=None):
+        """
+        Return the IDs of the k highest ranked products.
+
+        Args:
+            k (int): Number of products to return
+            category (str): Only rank products in this category, or None for all
+
+        Returns:
+            list: Product IDs, highest value first
+        """
+        ranked = self._ranked if category is None else self._ranked_by_category.get(category, _EMPTY)
+        return [pid for _, pid in islice(ranked, k)]
+
+    def first(self):
+        """
+        Return the ID of the highest ranked product that comes first in the inventory.
+
+        Ties at the top value are broken by inventory order instead of product
+        ID, matching a ``max()`` scan of a plain dictionary.
+
+        Returns:
+            str: Product ID, or None if the index is empty
+        """
+        best = None
+        for (value, pid), rank in self._ranked.items():
+            if best is not None and value != best[0]:
+                break
+            if best is None or rank < best[1]:
+                best = (value, rank, pid)
+        return best[2] if best is not None else None
+
+
+# Constructors of the secondary indexes by index name
+_INDEX_TYPES = {
+    "category": lambda: AttributeIndex(_category_values),
+    "feature": lambda: AttributeIndex(_feature_values),
+    "price": PriceIndex,
+    "keyword": KeywordIndex,
+    "aggregate": AggregateIndex,
+    **{f"rank_{key}": lambda key=key: RankIndex(key) for key in RANKING_KEYS}
+}
+
+
+def _build_index(name, products):
+    """
+    Build one secondary index over a product map.
+
+    Args:
+        name (str): Index name, a key of _INDEX_TYPES
+        products (PersistentMap): Products by product ID
+
+    Returns:
+        SecondaryIndex: The new index
+    """
+    index = _INDEX_TYPES[name]()
+    index.add_many([(pid, rank, product) for rank, pid, product in products.ranked_items()])
+    return index
+
+
+class IndexedInventory(MutableMapping):
+    """
+    Product inventory that keeps secondary indexes current on every write.
+
+    It behaves like the plain inventory dictionary, so the update functions keep
+    their copy-then-assign pattern. Products live in a ``PersistentMap``, which
+    makes reads O(1) and each assignment O(sqrt n), and iterate in insertion
+    order like a dictionary. Each index is built the first time a query needs
+    it and from then on kept current. The indexes are persistent too: a write
+    builds new versions of them that share structure with the old ones, so
+    ``copy()`` is O(1) and every earlier version stays indexed. A write whose
+    product data cannot be indexed raises before anything is changed. Product
+    records are treated as immutable values and must be replaced, not edited
+    in place.
+
+    ``version`` is stamped on every write and kept by ``copy()``, so it
+    identifies the inventory's contents for result caching.
+    """
+
+    def __init__(self, products=None):
+        """
+        Args:
+            products (dict): Initial products by product ID
+        """
+        self._products = PersistentMap(products if products is not None else ())
+        _check_prices(self._products.items())
+        # Built indexes by name, shared by every copy with the same products
+        self._indexes = {}
+        self.version = next_version()
+
+    def _index(self, name):
+        """Return an index, building it over the current products if no query has needed it yet."""
+        index = self._indexes.get(name)
+        if index is None:
+            index = _build_index(name, self._products)
+            self._indexes[name] = index
+        return index
+
+    def _commit(self, products, changes):
+        """
+        Switch to a new product map, indexing the changes that produced it.
+
+        Args:
+            products (PersistentMap): New product map
+            changes (list): (pid, rank, old_product, new_product) tuples, or None
+                to drop the indexes and rebuild each the next time a query needs it
+        """
+        indexes = {}
+        # A copy that shares the indexes may build another one meanwhile
+        for name, index in list(self._indexes.items()) if changes is not None else ():
+            indexes[name] = index.copy()
+            indexes[name].replace_many(changes)
+        self._products = products
+        self._indexes = indexes
+        self.version = next_version()
+
+    def __getitem__(self, pid):
+        return self._products[pid]
+
+    def __setitem__(self, pid, product):
+        _check_prices(((pid, product),))
+        products = self._products.set(pid, product)
+        self._commit(products, [(pid, products.rank(pid), self._products.get(pid), product)])
+
+    def __delitem__(self, pid):
+        rank = self._products.rank(pid)
+        self._commit(self._products.delete(pid), [(pid, rank, self._products[pid], None)])
+
+    def update(self, other=(), **kwargs):
+        """
+        Write many products at once.
+
+        Each index applies the whole batch together, so a large batch rebuilds
+        the maps it changes once instead of path-copying them for every product.
+        A batch that writes at least one product in ``REBUILD_RATIO`` drops
+        the built indexes instead, to be rebuilt as queries need them.
+
+        Args:
+            other: Mapping or iterable of (pid, product) pairs
+            **kwargs: More products by product ID
+        """
+        products = dict(other, **kwargs)
+        if not products:
+            return
+        _check_prices(products.items())
+        updated = self._products.set_many(products)
+        if len(products) * REBUILD_RATIO >= len(updated):
+            # Rebuilding an index from scratch costs about as much as applying a
+            # batch this large to it, and an index no query needs is never rebuilt
+            self._commit(updated, None)
+            return
+        self._commit(updated, [(pid, updated.rank(pid), self._products.get(pid), product)
+                               for pid, product in products.items()])
+
+    def __iter__(self):
+        return iter(self._products)
+
+    def __len__(self):
+        return len(self._products)
+
+    def __contains__(self, pid):
+        return pid in self._products
+
+    def __repr__(self):
+        return f"IndexedInventory({dict(self._products.items())!r})"
+
+    def get(self, pid, default=None):
+        return self._products.get(pid, default)
+
+    def keys(self):
+        return self._products.keys()
+
+    def values(self):
+        return self._products.values()
+
+    def items(self):
+        return self._products.items()
+
+    def items_from(self, position):
+        """Yield (product_id, product_data) pairs in inventory order, skipping the first products in O(log n)."""
+        return self._products.items_from(position)
+
+    def copy(self):
+        """
+        Create a new inventory version that shares this one's products and indexes.
+
+        Until either is written to, an index that one of them builds is shared
+        by both.
+
+        Returns:
+            IndexedInventory: Copy of this inventory
+        """
+        new_inventory = IndexedInventory.__new__(IndexedInventory)
+        new_inventory._products = self._products
+        new_inventory._indexes = self._indexes
+        new_inventory.version = self.version
+        return new_inventory
+
+    def filter_by_category(self, category):
+        """Return the products in a category."""
+        return self._index("category").products(category)
+
+    def filter_by_feature(self, feature):
+        """Return the products that list a feature."""
+        return self._index("feature").products(feature)
+
+    def ids_with_category(self, category):
+        """Return the IDs of the products in a category."""
+        return self._index("category").lookup(category)
+
+    def ids_with_feature(self, feature):
+        """Return the IDs of the products that list a feature."""
+        return self._index("feature").lookup(feature)
+
+    def ids_in_price_range(self, min_price, max_price):
+        """Return the IDs of the products priced from min_price to max_price inclusive."""
+        return self._index("price").ids_in_range(min_price, max_price)
+
+    def filter_by_price_range(self, min_price, max_price):
+        """Return the products priced from min_price to max_price inclusive."""
+        return self._index("price").products_in_range(min_price, max_price)
+
+    def count_in_price_band(self, lower=None, upper=None):
+        """Return the number of products priced from lower up to, but not including, upper."""
+        return self._index("price").count_in_band(lower, upper)
+
+    def ids_with_keyword(self, keyword):
+        """Return the IDs of the products whose name or features contain a keyword."""
+        return self._index("keyword").search(keyword)
+
+    def find_products_with_keyword(self, keyword):
+        """Return the products whose name or features contain a keyword."""
+        return self._index("keyword").products(keyword)
+
+    def category_counts(self):
+        """Return the number of products in each category."""
+        return self._index("category").counts()
+
+    def categories(self):
+        """Return the categories that have at least one product."""
+        return self.category_counts().keys()
+
+    def total_value(self):
+        """Return the total value of the inventory (price * stock)."""
+        return self._index("aggregate").total_value()
+
+    def top_ids(self, k, key="rating", category=None):
+        """Return the IDs of the k products with the highest value of a ranking key."""
+        return self._index(f"rank_{key}").top(k, category)
+
+    def highest_rated(self):
+        """Return (product_id, product_data) of the first product with the highest rating."""
+        pid = self._index("rank_rating").first()
+        return pid, self._products[pid]
+
+    def query_candidates(self, category=None, price=None, features=(), keyword=None):
+        """
+        Choose the most selective index for a composite query.
+
+        Each indexed criterion is costed by the size of the candidate set its
+        index would return: a bucket size, a price range count from two
+        position lookups, or the rarest keyword n-gram posting. Only the
+        cheapest candidate set is materialized.
+
+        Args:
+            category (str): Category criterion, or None
+            price (tuple): (min_price, max_price) criterion, or None
+            features (list): Feature criteria
+            keyword (str): Keyword criterion, or None
+
+        Returns:
+            list: Candidate product IDs, or None if no criterion can use an index
+        """
+        plans = []
+        if category is not None:
+            category_index = self._index("category")
+            plans.append((category_index.count(category), lambda: category_index.lookup(category)))
+        feature_index = self._index("feature") if features else None
+        for feature in features:
+            plans.append((feature_index.count(feature), lambda feature=feature: feature_index.lookup(feature)))
+        if price is not None:
+            price_index = self._index("price")
+            plans.append((price_index.count_in_range(*price), lambda: price_index.ids_in_range(*price)))
+        if keyword is not None:
+            keyword_index = self._index("keyword")
+            plans.append((keyword_index.estimate(keyword), lambda: self.ids_with_keyword(keyword)))
+        if not plans:
+            return None
+        _, candidates = min(plans, key=lambda plan: plan[0])
+        return list(candidates())
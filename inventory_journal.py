@@ -0,0 +1,463 @@
+"""
+Inventory Journal
+Durable inventory updates: every price, stock, feature, batch and merge change
+is appended to a JSONL write-ahead journal before it is acknowledged, and the
+inventory is rebuilt on startup from the latest snapshot plus the journal.
+
+Concurrent writers share fsyncs (group commit): whichever writer finds the
+journal idle writes every pending record with one fsync while the others wait
+for it. Compaction writes a snapshot named after the last journal sequence
+number and then empties the journal.
+
+Directory layout:
+    snapshot.<sequence>.snap   inventory snapshot covering records up to <sequence>
+    journal.jsonl              one {"seq": n, "op": ...} record per line
+"""
+
+import json
+import os
+import re
+import sys
+import threading
+import time
+
+import online_store_management_system as store
+from inventory_index import IndexedInventory
+from inventory_snapshot import open_snapshot, sync_directory, write_snapshot
+
+JOURNAL_NAME = "journal.jsonl"
+SNAPSHOT_PATTERN = re.compile(r"snapshot\.(\d+)\.snap")
+
+# Records written between automatic compactions
+DEFAULT_COMPACT_EVERY = 100000
+
+# Record operations and the change type apply_updates uses for each single-product one
+CHANGE_OPERATIONS = {"price": "price", "stock": "stock", "feature": "feature"}
+
+
+class Journal:
+    """
+    Append-only JSONL journal with group commit.
+
+    ``append()`` assigns the next sequence number and queues a record;
+    ``wait()`` returns once that record is on disk. Records are written in
+    sequence order.
+
+    A failed write or fsync leaves the journal unusable: the file is cut back
+    to the last committed record, ``error`` is set, and every later
+    ``append()`` and ``wait()`` raises OSError. The records queued behind the
+    failure could only be written out of order, so they are dropped.
+    """
+
+    def __init__(self, path, last_sequence=0):
+        """
+        Args:
+            path (str): Journal file path; records are appended to an existing file
+            last_sequence (int): Sequence number of the last record already in the file
+        """
+        self.path = path
+        _drop_torn_record(path)
+        created = not os.path.exists(path)
+        # Unbuffered, so a failed write leaves nothing behind to be flushed later
+        self._file = open(path, "ab", buffering=0)
+        if created:
+            sync_directory(os.path.dirname(os.path.abspath(path)))
+        self._condition = threading.Condition()
+        self._pending = []
+        self.sequence = last_sequence
+        self._durable = last_sequence
+        # File size up to the end of the last committed record
+        self._durable_offset = self._file.seek(0, os.SEEK_END)
+        self._flushing = False
+        self.error = None
+        self.commits = 0
+        self.records = 0
+
+    def append(self, record):
+        """
+        Queue a record.
+
+        Args:
+            record (dict): JSON-serializable record with an "op" field
+
+        Returns:
+            int: Sequence number of the record
+        """
+        with self._condition:
+            self._check_usable()
+            self.sequence += 1
+            line = json.dumps({"seq": self.sequence, **record}, separators=(",", ":"))
+            self._pending.append(line.encode("utf-8") + b"\n")
+            return self.sequence
+
+    def wait(self, sequence):
+        """
+        Block until the record with a sequence number, and every earlier one, is on disk.
+
+        Raises:
+            OSError: The record could not be written; the journal is now unusable
+        """
+        with self._condition:
+            while self._durable < sequence:
+                self._check_usable()
+                if self._flushing:
+                    self._condition.wait()
+                    continue
+                # Lead a commit: write everything queued so far with one fsync
+                batch, self._pending = self._pending, []
+                last = self.sequence
+                data = b"".join(batch)
+                self._flushing = True
+                self._condition.release()
+                try:
+                    written = memoryview(data)
+                    while written:
+                        written = written[self._file.write(written):]
+                    os.fsync(self._file.fileno())
+                except BaseException as e:
+                    self._discard_uncommitted()
+                    self._condition.acquire()
+                    self.error = e
+                    self._pending = []
+                    self._flushing = False
+                    self._condition.notify_all()
+                    raise
+                self._condition.acquire()
+                self._flushing = False
+                self._durable = last
+                self._durable_offset += len(data)
+                self.commits += 1
+                self.records += len(batch)
+                self._condition.notify_all()
+
+    def _check_usable(self):
+        """Raise OSError if an earlier write failed."""
+        if self.error is not None:
+            raise OSError(f"Journal {self.path} is unusable after a failed write: {self.error!r}")
+
+    def _discard_uncommitted(self):
+        """Cut the file back to the last committed record after a failed write, as far as the disk allows."""
+        try:
+            os.ftruncate(self._file.fileno(), self._durable_offset)
+            os.fsync(self._file.fileno())
+        except OSError:
+            pass
+
+    def sync(self):
+        """Block until every queued record is on disk."""
+        self.wait(self.sequence)
+
+    def reset(self):
+        """Replace the journal with an empty file; sequence numbers continue. Call after sync()."""
+        with self._condition:
+            self._file.close()
+            temporary_path = self.path + ".tmp"
+            with open(temporary_path, "wb") as empty_file:
+                os.fsync(empty_file.fileno())
+            os.replace(temporary_path, self.path)
+            sync_directory(os.path.dirname(os.path.abspath(self.path)))
+            self._file = open(self.path, "ab", buffering=0)
+            self._durable_offset = 0
+
+    def close(self):
+        """Write any queued records and close the file; a failed journal is closed as it is."""
+        try:
+            if self.error is None:
+                self.sync()
+        finally:
+            self._file.close()
+
+
+def _drop_torn_record(path, chunk_size=65536):
+    """Truncate a journal file after its last complete line, so new records do not follow a torn one."""
+    if not os.path.exists(path):
+        return
+    with open(path, "r+b") as journal_file:
+        end = journal_file.seek(0, os.SEEK_END)
+        position = end
+        while position > 0:
+            start = max(0, position - chunk_size)
+            journal_file.seek(start)
+            newline = journal_file.read(position - start).rfind(b"\n")
+            if newline >= 0:
+                position = start + newline + 1
+                break
+            position = start
+        if position < end:
+            journal_file.truncate(position)
+            os.fsync(journal_file.fileno())
+
+
+def read_journal(path):
+    """
+    Read the records of a journal file.
+
+    A final line without a newline is the remains of a write cut short by a
+    crash, and is ignored.
+
+    Args:
+        path (str): Journal file path
+
+    Yields:
+        dict: Records in sequence order
+    """
+    if not os.path.exists(path):
+        return
+    with open(path, "rb") as journal_file:
+        for line_number, line in enumerate(journal_file, start=1):
+            if not line.endswith(b"\n"):
+                return
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"{path} line {line_number}: Corrupt journal record: {e.msg}")
+
+
+def replay(inventory, records, after=0):
+    """
+    Apply journal records to an inventory.
+
+    Consecutive price, stock and feature changes are applied as one
+    apply_updates batch, so a long journal costs one inventory copy per run of
+    changes rather than one per record.
+
+    Args:
+        inventory (dict): Inventory the records were written against
+        records: Iterable of journal records
+        after (int): Skip records with this sequence number or lower
+
+    Returns:
+        tuple: (updated_inventory, sequence number of the last record, records applied)
+    """
+    changes = []
+    last_sequence = after
+    applied = 0
+    for record in records:
+        if record["seq"] <= after:
+            continue
+        operation = record["op"]
+        if operation in CHANGE_OPERATIONS:
+            changes.append((CHANGE_OPERATIONS[operation], record["id"], record["value"]))
+        elif operation == "batch":
+            changes.extend(tuple(change) for change in record["changes"])
+        elif operation == "merge":
+            if changes:
+                inventory, _ = store.apply_updates(inventory, changes)
+                changes = []
+            inventory = store.merge_inventories(inventory, record["products"])
+        else:
+            raise ValueError(f"Unknown journal operation {operation}")
+        last_sequence = record["seq"]
+        applied += 1
+    if changes:
+        inventory, _ = store.apply_updates(inventory, changes)
+    return inventory, last_sequence, applied
+
+
+def _snapshots(directory):
+    """Return (sequence, path) of each snapshot in a directory, oldest first."""
+    found = []
+    for name in os.listdir(directory):
+        match = SNAPSHOT_PATTERN.fullmatch(name)
+        if match:
+            found.append((int(match.group(1)), os.path.join(directory, name)))
+    return sorted(found)
+
+
+def _snapshot_path(directory, sequence):
+    """Return the path of the snapshot covering records up to a sequence number."""
+    return os.path.join(directory, f"snapshot.{sequence:012d}.snap")
+
+
+class JournaledInventory:
+    """
+    Inventory whose updates survive restarts.
+
+    The update methods mirror the module functions without the inventory
+    argument. Each change is validated by the module function first, so
+    rejected changes are never journaled. Writers build on the newest
+    inventory, including changes still waiting for their fsync, but a change
+    is published to ``inventory`` only once it is on disk, so readers never
+    see a change that a crash could still lose. If the journal fails, the
+    change is not published, the newest inventory goes back to the published
+    one, and every later update raises OSError.
+    """
+
+    def __init__(self, directory, initial_inventory=None, compact_every=DEFAULT_COMPACT_EVERY):
+        """
+        Args:
+            directory (str): Directory holding the journal and snapshots; created if needed
+            initial_inventory (dict): Starting products for a new directory; ignored once it has a snapshot
+            compact_every (int): Compact after this many records, or None to compact only on request
+        """
+        if directory is None:
+            raise ValueError("Journal directory cannot be None")
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.compact_every = compact_every
+        self._lock = threading.Lock()
+
+        snapshots = _snapshots(directory)
+        if not snapshots:
+            write_snapshot(initial_inventory if initial_inventory is not None else {}, _snapshot_path(directory, 0))
+            snapshots = _snapshots(directory)
+        snapshot_sequence, snapshot_path = snapshots[-1]
+
+        start = time.perf_counter()
+        with open_snapshot(snapshot_path) as snapshot:
+            products = dict(snapshot.items())
+        journal_path = os.path.join(directory, JOURNAL_NAME)
+        products, last_sequence, applied = replay(products, read_journal(journal_path), snapshot_sequence)
+        self.inventory = IndexedInventory(products)
+        # Newest inventory, including journaled changes that may not be on disk yet
+        self._head = self.inventory
+        self._published_sequence = last_sequence
+        self.recovery = {"snapshot_sequence": snapshot_sequence, "records_replayed": applied,
+                         "seconds": time.perf_counter() - start}
+
+        self.journal = Journal(journal_path, last_sequence)
+        self._since_compaction = last_sequence - snapshot_sequence
+
+    def close(self):
+        """Write any queued records and close the journal."""
+        self.journal.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _write(self, record, update):
+        """
+        Validate, journal and publish one change.
+
+        Args:
+            record (dict): Journal record describing the change
+            update (callable): Takes the inventory and returns the updated inventory
+
+        Returns:
+            dict: The updated inventory
+        """
+        with self._lock:
+            updated_inventory = update(self._head)
+            sequence = self.journal.append(record)
+            self._head = updated_inventory
+            self._since_compaction += 1
+            compact_due = self.compact_every is not None and self._since_compaction >= self.compact_every
+        try:
+            self.journal.wait(sequence)
+        except BaseException:
+            # Changes built on the failed records will never be on disk
+            with self._lock:
+                self._head = self.inventory
+            raise
+        self._publish(sequence, updated_inventory)
+        if compact_due:
+            self.compact()
+        return updated_inventory
+
+    def _publish(self, sequence, inventory):
+        """Publish the inventory as of a durable sequence number, unless a later one is already published."""
+        with self._lock:
+            if sequence > self._published_sequence:
+                self._published_sequence = sequence
+                self.inventory = inventory
+
+    def update_product_price(self, product_id, new_price):
+        """Durably update a product's price; returns the updated inventory."""
+        return self._write({"op": "price", "id": product_id, "value": new_price},
+                           lambda inventory: store.update_product_price(inventory, product_id, new_price))
+
+    def update_stock_level(self, product_id, quantity_change):
+        """Durably change a product's stock level; returns the updated inventory."""
+        return self._write({"op": "stock", "id": product_id, "value": quantity_change},
+                           lambda inventory: store.update_stock_level(inventory, product_id, quantity_change))
+
+    def add_product_feature(self, product_id, new_feature):
+        """Durably add a feature to a product; returns the updated inventory."""
+        return self._write({"op": "feature", "id": product_id, "value": new_feature},
+                           lambda inventory: store.add_product_feature(inventory, product_id, new_feature))
+
+    def merge_inventories(self, new_products):
+        """Durably merge new products; returns the updated inventory."""
+        if new_products is None:
+            raise ValueError("Inventories cannot be None")
+        new_products = dict(new_products)
+        return self._write({"op": "merge", "products": new_products},
+                           lambda inventory: store.merge_inventories(inventory, new_products))
+
+    def apply_updates(self, changes, atomic=True):
+        """
+        Durably apply a batch of changes, as apply_updates does.
+
+        Only the changes that were applied are journaled.
+
+        Returns:
+            tuple: (updated_inventory, failures)
+        """
+        if changes is None:
+            raise ValueError("Changes cannot be None")
+        changes = list(changes)
+        applied = []
+        failures = []
+
+        def update(inventory):
+            updated_inventory, batch_failures = store.apply_updates(inventory, changes, atomic)
+            failures.extend(batch_failures)
+            failed = {position for position, _, _ in batch_failures}
+            applied.extend(list(change) for position, change in enumerate(changes) if position not in failed)
+            return updated_inventory
+        # update() fills in applied before the record is encoded
+        return self._write({"op": "batch", "changes": applied}, update), failures
+
+    def compact(self):
+        """
+        Snapshot the newest inventory and empty the journal.
+
+        The snapshot is written before the journal is emptied and is named
+        after the last record it covers, so a crash at any point recovers
+        without losing or repeating a change. Older snapshots are removed only
+        once the new one and the empty journal are on disk.
+        """
+        with self._lock:
+            self.journal.sync()
+            sequence = self.journal.sequence
+            # Every record is on disk, so the newest inventory can be published too
+            self._published_sequence = sequence
+            self.inventory = self._head
+            write_snapshot(self._head, _snapshot_path(self.directory, sequence))
+            self.journal.reset()
+            self._since_compaction = 0
+            for old_sequence, path in _snapshots(self.directory):
+                if old_sequence < sequence:
+                    os.remove(path)
+            sync_directory(self.directory)
+
+
+if __name__ == "__main__":
+    # Measure group commit throughput: inventory_journal.py DIRECTORY [THREADS]
+    if len(sys.argv) < 2:
+        print("Usage: python inventory_journal.py DIRECTORY [THREADS]")
+        sys.exit(1)
+    thread_count = int(sys.argv[2]) if len(sys.argv) > 2 else 16
+    sample, _ = store.initialize_data()
+    journaled = JournaledInventory(sys.argv[1], sample, compact_every=None)
+    print(f"Recovered {journaled.recovery['records_replayed']} records in {journaled.recovery['seconds']:.3f}s")
+    updates_per_thread = 500
+
+    def writer():
+        for _ in range(updates_per_thread):
+            journaled.update_stock_level("P001", 1)
+
+    started = time.perf_counter()
+    writers = [threading.Thread(target=writer) for _ in range(thread_count)]
+    for thread in writers:
+        thread.start()
+    for thread in writers:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    print(f"{thread_count * updates_per_thread} durable updates in {elapsed:.2f}s "
+          f"({thread_count * updates_per_thread / elapsed:.0f}/sec, "
+          f"{journaled.journal.records / max(journaled.journal.commits, 1):.1f} records per fsync)")
+    journaled.close()
@@ -0,0 +1,124 @@
+"""
+Inventory Load Test
+Load-test client for inventory_server: keeps many keep-alive connections busy
+and reports requests per second and latency percentiles.
+
+Usage:
+    python inventory_load_test.py --port 8080 --concurrency 32 --duration 10
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from itertools import cycle
+
+from instrumentation import LatencyHistogram
+from inventory_server import DEFAULT_HOST, DEFAULT_PORT
+
+# Requests cycled through by each connection: a mix of filters, lookups and statistics
+DEFAULT_PATHS = (
+    "/products?category=electronics&page_size=20",
+    "/products?min_price=1000&max_price=5000&page_size=20",
+    "/products?keyword=pro&page_size=20",
+    "/stats/categories",
+    "/stats/value",
+    "/stats/top?k=10",
+    "/stats/price-brackets"
+)
+
+
+async def _read_response(reader):
+    """Read one HTTP response and return its status code."""
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError("Server closed the connection")
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        if name.strip().lower() == "content-length":
+            length = int(value)
+    await reader.readexactly(length)
+    return int(status_line.split()[1])
+
+
+async def _client(host, port, paths, deadline, latency, failures):
+    """Send requests over one connection until the deadline."""
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        for path in cycle(paths):
+            if time.perf_counter() >= deadline:
+                break
+            start = time.perf_counter_ns()
+            writer.write(f"GET {path} HTTP/1.1\r\nHost: {host}\r\n\r\n".encode("latin-1"))
+            await writer.drain()
+            status = await _read_response(reader)
+            latency.record(time.perf_counter_ns() - start)
+            if status != 200:
+                failures[status] = failures.get(status, 0) + 1
+    finally:
+        writer.close()
+
+
+async def run_load_test(host=DEFAULT_HOST, port=DEFAULT_PORT, paths=DEFAULT_PATHS, concurrency=32, duration=5.0):
+    """
+    Load-test a running inventory server.
+
+    Args:
+        host (str): Server address
+        port (int): Server port
+        paths (tuple): Request paths, cycled through by every connection
+        concurrency (int): Number of simultaneous connections
+        duration (float): Seconds to keep sending requests
+
+    Returns:
+        dict: requests, failures by status, seconds, requests_per_second, and
+            p50_ms, p95_ms, p99_ms and max_ms latency
+    """
+    if concurrency is None or concurrency < 1:
+        raise ValueError("Concurrency must be at least 1")
+    if not paths:
+        raise ValueError("At least one request path is needed")
+    latency = LatencyHistogram()
+    failures = {}
+    start = time.perf_counter()
+    deadline = start + duration
+    await asyncio.gather(*(_client(host, port, paths, deadline, latency, failures) for _ in range(concurrency)))
+    seconds = time.perf_counter() - start
+    return {
+        "requests": latency.count,
+        "failures": failures,
+        "seconds": seconds,
+        "requests_per_second": latency.count / seconds if seconds else 0.0,
+        "p50_ms": latency.percentile(0.50) / 1e6,
+        "p95_ms": latency.percentile(0.95) / 1e6,
+        "p99_ms": latency.percentile(0.99) / 1e6,
+        "max_ms": latency.maximum / 1e6
+    }
+
+
+def main(arguments=None):
+    """Command-line entry point."""
+    parser = argparse.ArgumentParser(description="Load-test a running inventory server.")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--path", action="append", dest="paths",
+                        help="Request path to send; may be repeated. A mixed workload by default")
+    options = parser.parse_args(arguments)
+    report = asyncio.run(run_load_test(options.host, options.port, tuple(options.paths or DEFAULT_PATHS),
+                                       options.concurrency, options.duration))
+    print(f"Requests:      {report['requests']} in {report['seconds']:.1f}s")
+    print(f"Throughput:    {report['requests_per_second']:.0f} requests/sec")
+    print(f"Latency (ms):  p50 {report['p50_ms']:.2f}  p95 {report['p95_ms']:.2f}  "
+          f"p99 {report['p99_ms']:.2f}  max {report['max_ms']:.2f}")
+    if report["failures"]:
+        print(f"Failures:      {report['failures']}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,467 @@
+"""
+Inventory Server
+Local HTTP/JSON service over the inventory functions, built on asyncio.
+
+Queries run in a thread pool so that a slow one does not stall the event
+loop, and any number of them can be in flight at once. Updates are applied
+one at a time, while no query is running, and replace the served inventory
+with the updated version.
+
+Usage:
+    python inventory_server.py [CATALOG] --port 8080
+
+Endpoints:
+    GET  /products?category=&min_price=&max_price=&min_stock=&features=&keyword=&page=&page_size=
+    GET  /products/{id}
+    GET  /stats/categories | /stats/value | /stats/highest-rated | /stats/price-brackets?ids=1
+    GET  /stats/top?k=&key=&category=
+    POST /products/{id}/price     {"price": 999.99}
+    POST /products/{id}/stock     {"change": -2}
+    POST /products/{id}/features  {"feature": "GPS"}
+    POST /products                {"products": {...}, "policy": "overwrite"}
+    POST /updates                 {"changes": [["stock", "P001", -1], ...], "atomic": true}
+"""
+
+import argparse
+import asyncio
+import json
+import re
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from itertools import islice
+from urllib.parse import parse_qs, unquote, urlsplit
+
+import online_store_management_system as store
+from catalog_loader import check_number, load_catalog, validate_product
+from inventory_index import IndexedInventory
+from inventory_snapshot import SNAPSHOT_EXTENSION, SnapshotInventory, open_snapshot
+from query_cache import QueryCache
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8080
+
+# Products per page of /products results, unless the request asks for another size
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 1000
+
+# Largest request body accepted, in bytes
+MAX_BODY_BYTES = 10 * 1024 * 1024
+
+
+class HTTPError(Exception):
+    """Error that is reported to the client with an HTTP status."""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class _ReadWriteLock:
+    """Asyncio lock that admits many readers or one writer."""
+
+    def __init__(self):
+        self._condition = asyncio.Condition()
+        self._readers = 0
+        self._writer = False
+
+    async def acquire_read(self):
+        async with self._condition:
+            await self._condition.wait_for(lambda: not self._writer)
+            self._readers += 1
+
+    async def release_read(self):
+        async with self._condition:
+            self._readers -= 1
+            self._condition.notify_all()
+
+    async def acquire_write(self):
+        async with self._condition:
+            await self._condition.wait_for(lambda: not self._writer and not self._readers)
+            self._writer = True
+
+    async def release_write(self):
+        async with self._condition:
+            self._writer = False
+            self._condition.notify_all()
+
+
+class InventoryService:
+    """
+    Serves one inventory to concurrent requests.
+
+    Queries go through a QueryCache and run in the executor under a shared
+    lock. Updates take the lock exclusively, so each one starts from the
+    result of the last, and then swap in the new inventory. A SQLite
+    inventory is updated in place instead, which is safe for the same reason:
+    no query runs while an update holds the lock.
+    """
+
+    def __init__(self, inventory, workers=8, cache_entries=256):
+        """
+        Args:
+            inventory (dict): The product inventory to serve
+            workers (int): Threads that run queries and updates
+            cache_entries (int): Size of the query result cache
+        """
+        if inventory is None:
+            raise ValueError("Inventory cannot be None")
+        self.inventory = inventory
+        self.cache = QueryCache(cache_entries)
+        self._executor = ThreadPoolExecutor(max_workers=workers)
+        self._lock = _ReadWriteLock()
+
+    def close(self):
+        """Stop the worker threads."""
+        self._executor.shutdown()
+
+    async def read(self, function, *args, **kwargs):
+        """Run a read-only query function on the current inventory in the executor."""
+        await self._lock.acquire_read()
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                self._executor, lambda: self.cache.call(function, self.inventory, *args, **kwargs))
+        finally:
+            await self._lock.release_read()
+
+    async def write(self, change):
+        """
+        Apply an update in the executor and serve its result.
+
+        Args:
+            change (callable): Takes the inventory and returns (updated_inventory, response)
+
+        Returns:
+            The response part of change's result
+        """
+        await self._lock.acquire_write()
+        try:
+            loop = asyncio.get_running_loop()
+            updated_inventory, response = await loop.run_in_executor(self._executor, change, self.inventory)
+            self.inventory = updated_inventory
+            return response
+        finally:
+            await self._lock.release_write()
+
+    async def handle(self, method, path, params, body):
+        """
+        Answer one request.
+
+        Args:
+            method (str): HTTP method
+            path (str): URL path
+            params (dict): Query string values by name, as lists
+            body: Decoded JSON body, or None
+
+        Returns:
+            JSON-serializable response payload, or bytes of already encoded JSON
+        """
+        for route_method, pattern, handler in _ROUTES:
+            match = pattern.fullmatch(path)
+            if match:
+                if method != route_method:
+                    continue
+                return await handler(self, *map(unquote, match.groups()), params=params, body=body)
+        if any(pattern.fullmatch(path) for _, pattern, _ in _ROUTES):
+            raise HTTPError(HTTPStatus.METHOD_NOT_ALLOWED, f"{method} is not supported on {path}")
+        raise HTTPError(HTTPStatus.NOT_FOUND, f"No such endpoint: {path}")
+
+    async def list_products(self, params, body):
+        price = None
+        if "min_price" in params or "max_price" in params:
+            price = (_number(params, "min_price", 0.0), _number(params, "max_price", float("inf")))
+        features = [feature for value in params.get("features", []) for feature in value.split(",") if feature]
+        results = await self.read(store.query,
+                                  category=_text(params, "category"),
+                                  price=price,
+                                  min_stock=_number(params, "min_stock", None, int),
+                                  features=features or None,
+                                  keyword=_text(params, "keyword"))
+        page = _number(params, "page", 1, int)
+        page_size = _number(params, "page_size", DEFAULT_PAGE_SIZE, int)
+        if page < 1 or not 1 <= page_size <= MAX_PAGE_SIZE:
+            raise ValueError(f"Page must be at least 1 and page size between 1 and {MAX_PAGE_SIZE}")
+        start = (page - 1) * page_size
+        return {
+            "total": len(results),
+            "page": page,
+            "page_size": page_size,
+            "products": dict(islice(results.items(), start, start + page_size))
+        }
+
+    async def get_product(self, pid, params, body):
+        product = self.inventory.get(pid)
+        if product is None:
+            raise HTTPError(HTTPStatus.NOT_FOUND, f"Product ID {pid} not found")
+        return {pid: dict(product)}
+
+    async def category_counts(self, params, body):
+        return await self.read(store.calculate_category_counts)
+
+    async def total_value(self, params, body):
+        return {"total_value": await self.read(store.calculate_total_inventory_value)}
+
+    async def highest_rated(self, params, body):
+        pid, product = await self.read(store.find_highest_rated_product)
+        return {pid: dict(product)}
+
+    async def price_brackets(self, params, body):
+        brackets = await self.read(store.create_price_brackets)
+        if _text(params, "ids") not in ("1", "true"):
+            return {bracket: len(product_ids) for bracket, product_ids in brackets.items()}
+        # Every product ID is listed, so encode the response off the event loop
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, lambda: json.dumps(brackets).encode("utf-8"))
+
+    async def top(self, params, body):
+        ranked = await self.read(store.top_k, _number(params, "k", 10, int),
+                                 key=_text(params, "key") or "rating", category=_text(params, "category"))
+        return [[pid, dict(product)] for pid, product in ranked]
+
+    async def update_price(self, pid, params, body):
+        price = _field(body, "price")
+        if check_number(price, "Price") < 0:
+            raise ValueError("Price cannot be negative")
+        return await self.write(lambda inventory: _updated_product(
+            store.update_product_price(inventory, pid, price), pid))
+
+    async def update_stock(self, pid, params, body):
+        change = _field(body, "change")
+        return await self.write(lambda inventory: _updated_product(
+            store.update_stock_level(inventory, pid, change), pid))
+
+    async def add_feature(self, pid, params, body):
+        feature = _field(body, "feature")
+        return await self.write(lambda inventory: _updated_product(
+            store.add_product_feature(inventory, pid, feature), pid))
+
+    async def merge_products(self, params, body):
+        products = _products(_field(body, "products"))
+        policy = body.get("policy", "overwrite")
+        return await self.write(lambda inventory: store.bulk_merge(inventory, products, policy))
+
+    async def apply_updates(self, params, body):
+        changes = _field(body, "changes")
+        atomic = body.get("atomic", True)
+
+        def change(inventory):
+            updated_inventory, failures = store.apply_updates(inventory, changes, atomic)
+            return updated_inventory, {"failures": [{"position": position, "error": message}
+                                                    for position, _, message in failures]}
+        return await self.write(change)
+
+
+_ROUTES = [
+    ("GET", re.compile(r"/products"), InventoryService.list_products),
+    ("POST", re.compile(r"/products"), InventoryService.merge_products),
+    ("GET", re.compile(r"/products/([^/]+)"), InventoryService.get_product),
+    ("POST", re.compile(r"/products/([^/]+)/price"), InventoryService.update_price),
+    ("POST", re.compile(r"/products/([^/]+)/stock"), InventoryService.update_stock),
+    ("POST", re.compile(r"/products/([^/]+)/features"), InventoryService.add_feature),
+    ("POST", re.compile(r"/updates"), InventoryService.apply_updates),
+    ("GET", re.compile(r"/stats/categories"), InventoryService.category_counts),
+    ("GET", re.compile(r"/stats/value"), InventoryService.total_value),
+    ("GET", re.compile(r"/stats/highest-rated"), InventoryService.highest_rated),
+    ("GET", re.compile(r"/stats/price-brackets"), InventoryService.price_brackets),
+    ("GET", re.compile(r"/stats/top"), InventoryService.top)
+]
+
+
+def _updated_product(updated_inventory, pid):
+    """Return (updated_inventory, response) for an update to a single product."""
+    return updated_inventory, {pid: dict(updated_inventory[pid])}
+
+
+def _text(params, name):
+    """Return a query string value, or None if it is absent or empty."""
+    values = params.get(name)
+    return values[0] if values and values[0] else None
+
+
+def _number(params, name, default, kind=float):
+    """Return a numeric query string value, or default if it is absent."""
+    value = _text(params, name)
+    if value is None:
+        return default
+    try:
+        return kind(value)
+    except ValueError:
+        raise ValueError(f"{name} must be a number")
+
+
+def _field(body, name):
+    """Return a required field of a JSON object body."""
+    if not isinstance(body, dict) or name not in body:
+        raise ValueError(f"Request body must be a JSON object with a {name} field")
+    return body[name]
+
+
+def _products(products):
+    """
+    Validate the products of a merge request with the catalog rules.
+
+    Extra fields such as "updated_at" are kept; the product fields are
+    replaced by their validated values.
+
+    Args:
+        products: The "products" field of the request body
+
+    Returns:
+        dict: Validated products by ID
+    """
+    if not isinstance(products, dict):
+        raise ValueError("products must be a JSON object of products by ID")
+    validated = {}
+    for pid, product in products.items():
+        if not isinstance(product, dict):
+            raise ValueError(f"Product {pid} must be a JSON object")
+        try:
+            _, fields = validate_product({**product, "id": pid})
+        except ValueError as e:
+            raise ValueError(f"Product {pid}: {e}")
+        validated[pid] = {**product, **fields}
+    return validated
+
+
+async def _read_request(reader):
+    """
+    Read one HTTP request.
+
+    Returns:
+        tuple: (method, target, headers, body), or None when the client has closed the connection
+    """
+    request_line = await reader.readline()
+    if not request_line.strip():
+        return None
+    parts = request_line.decode("latin-1").split()
+    if len(parts) != 3:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, "Malformed request line")
+    method, target, _ = parts
+
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+    try:
+        length = int(headers.get("content-length", 0))
+    except ValueError:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, "Invalid Content-Length")
+    if length > MAX_BODY_BYTES:
+        raise HTTPError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "Request body is too large")
+    body = await reader.readexactly(length) if length > 0 else b""
+    return method.upper(), target, headers, body
+
+
+def _response(status, payload, keep_alive):
+    """Encode an HTTP response with a JSON body; bytes payloads are already encoded JSON."""
+    body = payload if isinstance(payload, bytes) else json.dumps(payload).encode("utf-8")
+    head = (f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+            f"Content-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+    return head.encode("latin-1") + body
+
+
+async def handle_connection(service, reader, writer):
+    """Serve requests on one client connection until it closes."""
+    try:
+        while True:
+            keep_alive = False
+            try:
+                request = await _read_request(reader)
+                if request is None:
+                    break
+                method, target, headers, body = request
+                keep_alive = headers.get("connection", "").lower() != "close"
+                url = urlsplit(target)
+                payload = json.loads(body) if body else None
+                status, result = HTTPStatus.OK, await service.handle(method, url.path, parse_qs(url.query), payload)
+            except HTTPError as e:
+                status, result = e.status, {"error": str(e)}
+            except json.JSONDecodeError as e:
+                status, result = HTTPStatus.BAD_REQUEST, {"error": f"Invalid JSON: {e.msg}"}
+            except (ValueError, TypeError, KeyError) as e:
+                status, result = HTTPStatus.BAD_REQUEST, {"error": str(e)}
+            except Exception as e:
+                status, result = HTTPStatus.INTERNAL_SERVER_ERROR, {"error": f"{type(e).__name__}: {e}"}
+            writer.write(_response(status, result, keep_alive))
+            await writer.drain()
+            if not keep_alive:
+                break
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        writer.close()
+
+
+async def start_server(service, host=DEFAULT_HOST, port=DEFAULT_PORT):
+    """
+    Start serving an InventoryService.
+
+    Args:
+        service (InventoryService): Service to expose
+        host (str): Address to listen on
+        port (int): Port to listen on, or 0 for any free port
+
+    Returns:
+        asyncio.Server: The listening server
+    """
+    return await asyncio.start_server(lambda reader, writer: handle_connection(service, reader, writer),
+                                      host, port)
+
+
+def load_inventory(catalog_path=None):
+    """
+    Load the inventory to serve, as main() does.
+
+    Args:
+        catalog_path (str): Optional CSV, JSONL or snapshot file; the sample inventory otherwise
+
+    Returns:
+        dict: Indexed inventory, or a snapshot inventory for snapshot files
+    """
+    if catalog_path is not None and catalog_path.endswith(SNAPSHOT_EXTENSION):
+        return open_snapshot(catalog_path)
+    if catalog_path is not None:
+        inventory, _ = load_catalog(catalog_path)
+    else:
+        inventory, _ = store.initialize_data()
+    return IndexedInventory(inventory)
+
+
+async def serve(inventory, host=DEFAULT_HOST, port=DEFAULT_PORT):
+    """Serve an inventory until cancelled."""
+    service = InventoryService(inventory)
+    server = await start_server(service, host, port)
+    print(f"Serving {len(inventory)} products on http://{host}:{server.sockets[0].getsockname()[1]}")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        service.close()
+
+
+def main(arguments=None):
+    """Command-line entry point."""
+    parser = argparse.ArgumentParser(description="Serve the online store inventory over HTTP.")
+    parser.add_argument("catalog", nargs="?", help="CSV, JSONL or snapshot file; the sample inventory by default")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    options = parser.parse_args(arguments)
+    inventory = load_inventory(options.catalog)
+    try:
+        asyncio.run(serve(inventory, options.host, options.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if isinstance(inventory, SnapshotInventory):
+            inventory.close()
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,362 @@
+"""
+Inventory Snapshot
+Binary inventory snapshots that are opened through mmap and decoded one product
+at a time, so startup cost does not grow with the size of the catalog.
+
+Layout (little-endian):
+    header          magic, version, product and category counts, section offsets
+    records         one fixed-width record per product, in inventory order
+    ID index        row numbers of the records, sorted by product ID
+    feature table   (offset, length) string references, one run per product
+    category table  (offset, length, product count) per category
+    string heap     UTF-8 bytes of IDs, names, features, categories and extras
+"""
+
+import json
+import mmap
+import os
+import struct
+import sys
+import tempfile
+from collections.abc import ItemsView, Mapping, ValuesView
+
+from catalog_loader import check_number
+from inventory_index import IndexedInventory, next_version
+
+SNAPSHOT_MAGIC = b"OSMSNAP1"
+SNAPSHOT_VERSION = 1
+SNAPSHOT_EXTENSION = ".snap"
+
+# Product fields stored in fixed-width record columns; any others go to the extras JSON
+RECORD_FIELDS = ("name", "category", "price", "stock", "rating", "features")
+
+_HEADER = struct.Struct("<8sHHIIQQQQQ")
+_ROW = struct.Struct("<I")
+_RECORD = struct.Struct("<QIQIIdqdIIQI")
+_STRING_REF = struct.Struct("<QI")
+_CATEGORY = struct.Struct("<QII")
+
+
+class _StringHeap:
+    """Append-only UTF-8 string heap that stores repeated strings once."""
+
+    def __init__(self):
+        self.data = bytearray()
+        self._seen = {}
+
+    def add(self, text, shared=False):
+        """
+        Store a string and return its (offset, length) reference.
+
+        Args:
+            text (str): String to store
+            shared (bool): Reuse an existing copy of the same string
+        """
+        if shared and text in self._seen:
+            return self._seen[text]
+        encoded = text.encode("utf-8")
+        reference = (len(self.data), len(encoded))
+        self.data += encoded
+        if shared:
+            self._seen[text] = reference
+        return reference
+
+
+def sync_directory(directory):
+    """
+    Flush a directory's entries to disk, so a file created, renamed or removed in it stays that way after a crash.
+
+    Windows cannot open a directory for fsync, and commits renames itself, so
+    this does nothing there.
+
+    Args:
+        directory (str): Directory path
+    """
+    if os.name == "nt":
+        return
+    descriptor = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(descriptor)
+    finally:
+        os.close(descriptor)
+
+
+def write_snapshot(inventory, path):
+    """
+    Write an inventory to a snapshot file atomically.
+
+    The snapshot is written to a temporary file in the same directory, synced
+    to disk and then renamed over the target, so readers never see a partial
+    file. The directory is synced after the rename, so the new file is durable
+    when this returns. Stock is stored as an integer, so a fractional or
+    boolean stock level is rejected rather than truncated.
+
+    Args:
+        inventory (dict): The product inventory
+        path (str): Snapshot file path
+    """
+    if inventory is None:
+        raise ValueError("Inventory cannot be None")
+    if path is None:
+        raise ValueError("Snapshot path cannot be None")
+
+    heap = _StringHeap()
+    categories = {}
+    records = bytearray()
+    feature_table = bytearray()
+    feature_count = 0
+
+    for pid, product in inventory.items():
+        category = product["category"]
+        if category not in categories:
+            categories[category] = [heap.add(category, shared=True), 0, len(categories)]
+        categories[category][1] += 1
+
+        features_start = feature_count
+        for feature in product["features"]:
+            feature_table += _STRING_REF.pack(*heap.add(feature, shared=True))
+            feature_count += 1
+
+        extras = {key: value for key, value in product.items() if key not in RECORD_FIELDS}
+        extras_reference = heap.add(json.dumps(extras)) if extras else (0, 0)
+        stock = check_number(product["stock"], f"Stock of product {pid}")
+        if stock != int(stock):
+            raise ValueError(f"Stock of product {pid} must be a whole number")
+
+        records += _RECORD.pack(
+            *heap.add(pid),
+            *heap.add(product["name"]),
+            categories[category][2],
+            float(product["price"]),
+            int(stock),
+            float(product["rating"]),
+            features_start,
+            feature_count - features_start,
+            *extras_reference
+        )
+
+    id_index = bytearray()
+    for row, _ in sorted(enumerate(inventory.keys()), key=lambda entry: entry[1]):
+        id_index += _ROW.pack(row)
+
+    category_table = bytearray()
+    for (offset, length), count, _ in categories.values():
+        category_table += _CATEGORY.pack(offset, length, count)
+
+    records_offset = _HEADER.size
+    id_index_offset = records_offset + len(records)
+    feature_table_offset = id_index_offset + len(id_index)
+    category_table_offset = feature_table_offset + len(feature_table)
+    heap_offset = category_table_offset + len(category_table)
+    header = _HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, 0, len(inventory), len(categories),
+                          records_offset, feature_table_offset, category_table_offset, heap_offset,
+                          id_index_offset)
+
+    directory = os.path.dirname(os.path.abspath(path))
+    descriptor, temporary_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(descriptor, "wb") as snapshot_file:
+            for section in (header, records, id_index, feature_table, category_table, heap.data):
+                snapshot_file.write(section)
+            snapshot_file.flush()
+            os.fsync(snapshot_file.fileno())
+        os.replace(temporary_path, path)
+    except BaseException:
+        os.unlink(temporary_path)
+        raise
+    sync_directory(directory)
+
+
+class _SnapshotItemsView(ItemsView):
+    """Items view that decodes records in order instead of searching for each ID."""
+
+    def __iter__(self):
+        snapshot = self._mapping
+        for row in range(len(snapshot)):
+            yield snapshot._product_at(row)
+
+
+class _SnapshotValuesView(ValuesView):
+    """Values view that decodes records in order instead of searching for each ID."""
+
+    def __iter__(self):
+        snapshot = self._mapping
+        for row in range(len(snapshot)):
+            yield snapshot._product_at(row)[1]
+
+
+class SnapshotInventory(Mapping):
+    """
+    Read-only inventory backed by a memory-mapped snapshot file.
+
+    Opening only reads the header; products are decoded when they are accessed.
+    Records keep the inventory order of the written inventory, and lookups
+    binary-search the ID index that lists them by product ID. ``copy()`` materializes an
+    IndexedInventory, so the update functions work on a snapshot and the first
+    update pays the one-off cost of loading it.
+    """
+
+    def __init__(self, path):
+        """
+        Args:
+            path (str): Snapshot file path
+        """
+        self._file = open(path, "rb")
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            (magic, version, _, self._count, self._category_count, self._records_offset,
+             self._feature_table_offset, self._category_table_offset, self._heap_offset,
+             self._id_index_offset) = _HEADER.unpack_from(self._map, 0)
+        except (ValueError, struct.error):
+            self._file.close()
+            raise ValueError(f"{path} is not an inventory snapshot")
+        if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+            self.close()
+            raise ValueError(f"{path} is not a version {SNAPSHOT_VERSION} inventory snapshot")
+        self._categories = None
+        self.version = next_version()
+
+    def close(self):
+        """Unmap and close the snapshot file."""
+        self._map.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _string(self, offset, length):
+        """Decode a string from the heap."""
+        start = self._heap_offset + offset
+        return self._map[start:start + length].decode("utf-8")
+
+    def _record(self, row):
+        """Unpack the fixed-width record of a row."""
+        return _RECORD.unpack_from(self._map, self._records_offset + row * _RECORD.size)
+
+    def _pid_at(self, row):
+        """Decode the product ID of a row."""
+        id_offset, id_length = _STRING_REF.unpack_from(self._map, self._records_offset + row * _RECORD.size)
+        return self._string(id_offset, id_length)
+
+    def _row_by_id(self, position):
+        """Return the row of the product at a position in product ID order."""
+        return _ROW.unpack_from(self._map, self._id_index_offset + position * _ROW.size)[0]
+
+    def _category_table(self):
+        """Return the (category, product count) pairs, decoding them on first use."""
+        if self._categories is None:
+            self._categories = []
+            for position in range(self._category_count):
+                offset, length, count = _CATEGORY.unpack_from(
+                    self._map, self._category_table_offset + position * _CATEGORY.size)
+                self._categories.append((self._string(offset, length), count))
+        return self._categories
+
+    def _product_at(self, row):
+        """Decode the (product_id, product_data) pair of a row."""
+        (id_offset, id_length, name_offset, name_length, category_code, price, stock, rating,
+         features_start, features_count, extras_offset, extras_length) = self._record(row)
+        features = []
+        for position in range(features_start, features_start + features_count):
+            features.append(self._string(*_STRING_REF.unpack_from(
+                self._map, self._feature_table_offset + position * _STRING_REF.size)))
+        product = {
+            "name": self._string(name_offset, name_length),
+            "category": self._category_table()[category_code][0],
+            "price": price,
+            "stock": stock,
+            "rating": rating,
+            "features": features
+        }
+        if extras_length:
+            product.update(json.loads(self._string(extras_offset, extras_length)))
+        return self._string(id_offset, id_length), product
+
+    def _find_row(self, pid):
+        """Return the row of a product ID, or None if it is not in the snapshot."""
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            if self._pid_at(self._row_by_id(middle)) < pid:
+                low = middle + 1
+            else:
+                high = middle
+        if low < self._count:
+            row = self._row_by_id(low)
+            if self._pid_at(row) == pid:
+                return row
+        return None
+
+    def __getitem__(self, pid):
+        row = self._find_row(pid) if isinstance(pid, str) else None
+        if row is None:
+            raise KeyError(pid)
+        return self._product_at(row)[1]
+
+    def __contains__(self, pid):
+        return isinstance(pid, str) and self._find_row(pid) is not None
+
+    def __iter__(self):
+        for row in range(self._count):
+            yield self._pid_at(row)
+
+    def __len__(self):
+        return self._count
+
+    def items(self):
+        return _SnapshotItemsView(self)
+
+    def values(self):
+        return _SnapshotValuesView(self)
+
+    def items_from(self, position):
+        """Yield (product_id, product_data) pairs in inventory order, starting at a record."""
+        for row in range(position, self._count):
+            yield self._product_at(row)
+
+    def category_counts(self):
+        """Return the number of products in each category, as recorded in the snapshot."""
+        return dict(self._category_table())
+
+    def copy(self):
+        """
+        Load the snapshot into an updatable inventory.
+
+        The copy holds every product in memory and does not depend on the
+        snapshot file, which stays open until ``close()`` is called; callers
+        that copy a snapshot to update it should still close the snapshot.
+
+        Returns:
+            IndexedInventory: Inventory holding every product in the snapshot
+        """
+        return IndexedInventory(dict(self.items()))
+
+
+def open_snapshot(path):
+    """
+    Open a snapshot file for lazy reading.
+
+    Args:
+        path (str): Snapshot file path
+
+    Returns:
+        SnapshotInventory: Read-only inventory view of the snapshot
+    """
+    if path is None:
+        raise ValueError("Snapshot path cannot be None")
+    return SnapshotInventory(path)
+
+
+if __name__ == "__main__":
+    # Convert a CSV or JSONL catalog into a snapshot: inventory_snapshot.py CATALOG SNAPSHOT
+    from catalog_loader import load_catalog
+
+    if len(sys.argv) != 3:
+        print("Usage: python inventory_snapshot.py CATALOG SNAPSHOT")
+        sys.exit(1)
+    catalog, stats = load_catalog(sys.argv[1])
+    write_snapshot(catalog, sys.argv[2])
+    print(f"Wrote {stats['rows']} products to {sys.argv[2]}.")
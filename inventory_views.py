@@ -0,0 +1,179 @@
+"""
+Inventory Views
+Lazy, chainable, read-only filter views over an inventory. A view stores its
+criteria and only visits products when it is iterated, counted or paged.
+"""
+
+from collections.abc import ItemsView, Mapping, ValuesView
+from itertools import islice
+
+from inventory_index import IndexedInventory
+from online_store_management_system import query_predicates
+
+# Criteria a view can filter by; the same ones query() accepts
+VIEW_CRITERIA = ("category", "price", "min_stock", "features", "keyword")
+
+
+class _ViewItemsView(ItemsView):
+    """Items view that yields matches directly instead of re-checking each key."""
+
+    def __iter__(self):
+        return self._mapping._matches()
+
+
+class _ViewValuesView(ValuesView):
+    """Values view that yields matches directly instead of re-checking each key."""
+
+    def __iter__(self):
+        return (product for _, product in self._mapping._matches())
+
+
+class InventoryView(Mapping):
+    """
+    Read-only mapping of the products in an inventory that match some criteria.
+
+    Nothing is evaluated when a view is created or refined with ``where()``.
+    Iteration walks the inventory, or for an IndexedInventory the most
+    selective index, and yields matches as it finds them. ``bool()``,
+    ``count(limit)`` and ``page()`` stop as soon as they have their answer.
+    """
+
+    def __init__(self, inventory, criteria=(), predicates=()):
+        """
+        Args:
+            inventory (dict): The product inventory to view
+            criteria (tuple): (name, value) pairs of query criteria
+            predicates (tuple): Extra functions that take a product and return whether it matches
+        """
+        if inventory is None:
+            raise ValueError("Inventory cannot be None")
+        self._inventory = inventory
+        self._criteria = tuple(criteria)
+        self._extra_predicates = tuple(predicates)
+        self._predicates = []
+        for name, value in self._criteria:
+            self._predicates.extend(query_predicates(**{name: value}))
+        self._predicates.extend(self._extra_predicates)
+
+    def where(self, predicate=None, **criteria):
+        """
+        Return a narrower view; this view is left unchanged.
+
+        Args:
+            predicate (callable): Optional function that takes a product and returns whether it matches
+            **criteria: category, price, min_stock, features or keyword, as for query()
+
+        Returns:
+            InventoryView: View of the products matching both this view and the new criteria
+        """
+        unknown = set(criteria) - set(VIEW_CRITERIA)
+        if unknown:
+            raise ValueError(f"Unknown criteria: {', '.join(sorted(unknown))}")
+        new_criteria = tuple((name, value) for name, value in criteria.items() if value is not None)
+        new_predicates = (predicate,) if predicate is not None else ()
+        return InventoryView(self._inventory, self._criteria + new_criteria,
+                             self._extra_predicates + new_predicates)
+
+    def _candidates(self):
+        """Yield (pid, product) pairs that may match, using an index when one applies."""
+        if isinstance(self._inventory, IndexedInventory) and self._criteria:
+            indexed = {}
+            for name, value in self._criteria:
+                if name == "features":
+                    indexed.setdefault("features", []).extend(value)
+                elif name != "min_stock":
+                    indexed.setdefault(name, value)
+            if indexed:
+                candidate_ids = self._inventory.query_candidates(**indexed)
+                if candidate_ids is not None:
+                    return ((pid, self._inventory[pid]) for pid in candidate_ids)
+        return iter(self._inventory.items())
+
+    def _matches(self):
+        """Yield the (pid, product) pairs that satisfy every criterion."""
+        predicates = self._predicates
+        for pid, product in self._candidates():
+            if all(predicate(product) for predicate in predicates):
+                yield pid, product
+
+    def __getitem__(self, pid):
+        product = self._inventory[pid]
+        if not all(predicate(product) for predicate in self._predicates):
+            raise KeyError(pid)
+        return product
+
+    def __contains__(self, pid):
+        try:
+            self[pid]
+        except KeyError:
+            return False
+        return True
+
+    def __iter__(self):
+        return (pid for pid, _ in self._matches())
+
+    def __len__(self):
+        if not self._predicates:
+            return len(self._inventory)
+        return self.count()
+
+    def __bool__(self):
+        return self.count(limit=1) > 0
+
+    def __repr__(self):
+        return f"InventoryView({dict(self._criteria)!r})"
+
+    def items(self):
+        return _ViewItemsView(self)
+
+    def values(self):
+        return _ViewValuesView(self)
+
+    def count(self, limit=None):
+        """
+        Count matching products, stopping early once limit is reached.
+
+        Args:
+            limit (int): Stop counting at this many matches, or None to count all
+
+        Returns:
+            int: Number of matches, at most limit
+        """
+        if not self._predicates and limit is None:
+            return len(self._inventory)
+        return sum(1 for _ in islice(self._matches(), limit))
+
+    def page(self, number, size):
+        """
+        Return one page of matching products.
+
+        Args:
+            number (int): Page number, starting at 1
+            size (int): Products per page
+
+        Returns:
+            list: (product_id, product_data) tuples on the page
+        """
+        if number is None or number < 1:
+            raise ValueError("Page number must be at least 1")
+        if size is None or size < 1:
+            raise ValueError("Page size must be at least 1")
+        return list(islice(self._matches(), (number - 1) * size, number * size))
+
+    def to_dict(self):
+        """Evaluate the view into a plain dictionary of products."""
+        return dict(self._matches())
+
+
+def filter_view(inventory, **criteria):
+    """
+    Create a lazy view of the products matching some criteria.
+
+    Args:
+        inventory (dict): The product inventory
+        **criteria: category, price, min_stock, features or keyword, as for query()
+
+    Returns:
+        InventoryView: Unevaluated view of the matching products
+    """
+    return InventoryView(inventory).where(**criteria)
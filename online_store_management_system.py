@@ -3,6 +3,51 @@ Online Store Management System
 This program demonstrates dictionary operations through an online store inventory management system.
 """
 
+import argparse
+import heapq
+import json
+import sys
+import time
+from bisect import bisect_right
+from collections.abc import Mapping
+from itertools import filterfalse, islice
+from math import fsum, isfinite
+
+from catalog_loader import check_number, load_catalog, validate_product
+from columnar_inventory import ColumnarInventory
+from inventory_index import RANKING_KEYS, IndexedInventory
+from instrumentation import profiler
+from inventory_snapshot import SNAPSHOT_EXTENSION, SnapshotInventory, open_snapshot
+from sqlite_inventory import SQLITE_EXTENSIONS, SqliteInventory
+
+# Ways create_price_histogram can summarize each price bucket
+HISTOGRAM_SUMMARIES = ("ids", "counts", "values")
+
+# Ways bulk_merge can resolve a product ID that is in both inventories
+MERGE_POLICIES = ("overwrite", "keep_existing", "sum_stock", "newer")
+
+# Product field compared by the "newer" merge policy
+MERGE_TIMESTAMP_FIELD = "updated_at"
+
+# Products shown on each page of inventory and filter results
+DISPLAY_PAGE_SIZE = 20
+
+# Operations run_batch accepts, and the statistics its "stats" operation reports
+BATCH_OPERATIONS = ("filter", "update", "merge", "stats")
+BATCH_STATISTICS = ("categories", "value", "highest_rated", "brackets", "top")
+
+# Formatted product lines kept for reuse, by product ID
+FORMATTED_LINE_CACHE_SIZE = 50000
+
+# (inventory version, product ID) -> formatted line. Version stamps are unique
+# across inventories and change on every write, so a line stays valid while its
+# key exists. Plain dictionaries have no version and are never cached, since
+# their products can be changed in place
+_formatted_lines = {}
+
+# Inventories that can start iterating part-way through without reading the products before
+SEEKABLE_INVENTORIES = (IndexedInventory, ColumnarInventory, SnapshotInventory, SqliteInventory)
+
 def initialize_data():
     """
     Initialize the store inventory with predefined products and categories using dictionaries.
@@ -79,6 +124,7 @@ def initialize_data():
 def filter_by_category(inventory, category):
     """
     Filter products by category using dictionary comprehension.
+    Indexed and SQLite inventories answer from their category index instead of scanning.
     
     Args:
         inventory (dict): The product inventory
@@ -92,11 +138,17 @@ def filter_by_category(inventory, category):
     if category is None:
         raise ValueError("Category cannot be None")
     
+    if isinstance(inventory, (IndexedInventory, ColumnarInventory)):
+        return inventory.filter_by_category(category)
+    if isinstance(inventory, SqliteInventory):
+        return inventory.query(category=category)
+    
     return {pid: product for pid, product in inventory.items() if product["category"] == category}
 
 def filter_by_price_range(inventory, min_price, max_price):
     """
     Filter products by price range using dictionary comprehension.
+    Indexed and SQLite inventories answer with a search of their price index.
     
     Args:
         inventory (dict): The product inventory
@@ -113,6 +165,11 @@ def filter_by_price_range(inventory, min_price, max_price):
     if min_price > max_price:
         raise ValueError("Minimum price cannot be greater than maximum price")
     
+    if isinstance(inventory, (IndexedInventory, ColumnarInventory)):
+        return inventory.filter_by_price_range(min_price, max_price)
+    if isinstance(inventory, SqliteInventory):
+        return inventory.query(price=(min_price, max_price))
+    
     return {pid: product for pid, product in inventory.items() 
             if min_price <= product["price"] <= max_price}
 
@@ -132,11 +189,17 @@ def filter_by_availability(inventory, min_stock=1):
     if min_stock < 0:
         raise ValueError("Minimum stock cannot be negative")
     
+    if isinstance(inventory, ColumnarInventory):
+        return inventory.filter_by_availability(min_stock)
+    if isinstance(inventory, SqliteInventory):
+        return inventory.query(min_stock=min_stock)
+    
     return {pid: product for pid, product in inventory.items() if product["stock"] >= min_stock}
 
 def filter_by_feature(inventory, feature):
     """
     Filter products by a specific feature using dictionary comprehension.
+    Indexed and SQLite inventories answer from their feature index instead of scanning.
     
     Args:
         inventory (dict): The product inventory
@@ -150,11 +213,17 @@ def filter_by_feature(inventory, feature):
     if feature is None:
         raise ValueError("Feature cannot be None")
     
+    if isinstance(inventory, IndexedInventory):
+        return inventory.filter_by_feature(feature)
+    if isinstance(inventory, SqliteInventory):
+        return inventory.query(features=[feature])
+    
     return {pid: product for pid, product in inventory.items() if feature in product["features"]}
 
 def find_products_with_keyword(inventory, keyword):
     """
     Find products containing a keyword in their name or features.
+    Indexed inventories answer from their n-gram keyword index.
     
     Args:
         inventory (dict): The product inventory
@@ -168,11 +237,147 @@ def find_products_with_keyword(inventory, keyword):
     if keyword is None:
         raise ValueError("Keyword cannot be None")
     
+    if isinstance(inventory, IndexedInventory):
+        return inventory.find_products_with_keyword(keyword)
+    if isinstance(inventory, SqliteInventory):
+        return inventory.query(keyword=keyword)
+    
     keyword = keyword.lower()
     return {pid: product for pid, product in inventory.items() 
             if keyword in product["name"].lower() or 
             any(keyword in feature.lower() for feature in product["features"])}
 
+def query_predicates(category=None, price=None, min_stock=None, features=None, keyword=None):
+    """
+    Validate query criteria and turn them into product predicates.
+    
+    Args:
+        category (str): Category to filter by
+        price (tuple): (min_price, max_price) range, inclusive
+        min_stock (int): Minimum stock level required
+        features (list): Features that every product must have
+        keyword (str): Keyword to search for in names and features
+    
+    Returns:
+        list: Functions that take a product and return whether it matches,
+            cheapest first
+    """
+    if price is not None:
+        if len(price) != 2 or price[0] is None or price[1] is None:
+            raise ValueError("Price range must be a (min_price, max_price) pair")
+        if price[0] > price[1]:
+            raise ValueError("Minimum price cannot be greater than maximum price")
+    if min_stock is not None and min_stock < 0:
+        raise ValueError("Minimum stock cannot be negative")
+    features = list(features) if features is not None else []
+    
+    # Cheap field comparisons run before list scans and substring searches
+    predicates = []
+    if category is not None:
+        predicates.append(lambda product: product["category"] == category)
+    if price is not None:
+        predicates.append(lambda product: price[0] <= product["price"] <= price[1])
+    if min_stock is not None:
+        predicates.append(lambda product: product["stock"] >= min_stock)
+    if features:
+        predicates.append(lambda product: all(feature in product["features"] for feature in features))
+    if keyword is not None:
+        lowered = keyword.lower()
+        predicates.append(lambda product: lowered in product["name"].lower() or
+                          any(lowered in feature.lower() for feature in product["features"]))
+    
+    return predicates
+
+def query(inventory, category=None, price=None, min_stock=None, features=None, keyword=None):
+    """
+    Filter products by any combination of criteria in a single pass.
+    Indexed inventories start from the most selective index and check the
+    remaining criteria on those candidates only; SQLite inventories run a
+    single indexed query.
+    
+    Args:
+        inventory (dict): The product inventory
+        category (str): Category to filter by
+        price (tuple): (min_price, max_price) range, inclusive
+        min_stock (int): Minimum stock level required
+        features (list): Features that every product must have
+        keyword (str): Keyword to search for in names and features
+    
+    Returns:
+        dict: Products matching every given criterion
+    """
+    if inventory is None:
+        raise ValueError("Inventory cannot be None")
+    
+    predicates = query_predicates(category, price, min_stock, features, keyword)
+    
+    if isinstance(inventory, SqliteInventory):
+        return inventory.query(category, price, min_stock, features, keyword)
+    if isinstance(inventory, IndexedInventory):
+        candidate_ids = inventory.query_candidates(category, price, features or [], keyword)
+        if candidate_ids is not None:
+            return {pid: inventory[pid] for pid in candidate_ids
+                    if all(predicate(inventory[pid]) for predicate in predicates)}
+    
+    return {pid: product for pid, product in inventory.items()
+            if all(predicate(product) for predicate in predicates)}
+
+def _check_product_price(product_id, product):
+    """
+    Reject a product whose price is negative, a boolean or not a finite number.
+    
+    The number rules are those of catalog_loader.validate_product; a NaN price
+    in particular would break the sorted order of a price index.
+    
+    Args:
+        product_id (str): Product ID, for the error message
+        product (dict): Product data
+    """
+    if check_number(product["price"], f"Price of product {product_id}") < 0:
+        raise ValueError(f"Price of product {product_id} cannot be negative")
+
+def _check_product_prices(product_ids, products):
+    """
+    Reject a batch of products if any price is negative, a boolean or not a finite number.
+    
+    The common all-valid batch is confirmed with a few whole-list operations;
+    only a batch that fails them is checked product by product, to report
+    the product at fault.
+    
+    Args:
+        product_ids: Product IDs, in the same order as products
+        products: Product data
+    """
+    prices = [product["price"] for product in products]
+    try:
+        valid = (set(map(type, prices)) <= {int, float} and isfinite(sum(prices))
+                 and (not prices or min(prices) >= 0))
+    except (OverflowError, TypeError):
+        valid = False
+    if not valid:
+        for pid, product in zip(product_ids, products):
+            _check_product_price(pid, product)
+
+def _updatable(inventory):
+    """
+    Return the inventory an update function writes to.
+    
+    This is a copy, except for SQLite inventories, which are changed in
+    place: copying a catalog kept on disk because it does not fit in memory
+    would defeat the purpose. Every update function validates its change
+    before writing, so a rejected change leaves a SQLite inventory as it was,
+    but an accepted one is visible through every reference to it.
+    
+    Args:
+        inventory (dict): The product inventory
+    
+    Returns:
+        dict: Inventory to write the update to
+    """
+    if isinstance(inventory, SqliteInventory):
+        return inventory
+    return inventory.copy()
+
 def update_product_price(inventory, product_id, new_price):
     """
     Update a product's price.
@@ -189,18 +394,37 @@ def update_product_price(inventory, product_id, new_price):
         raise ValueError("Inventory cannot be None")
     if product_id is None:
         raise ValueError("Product ID cannot be None")
-    if new_price is None or new_price < 0:
+    if new_price is None or check_number(new_price, "New price") < 0:
         raise ValueError("New price cannot be None or negative")
     
     if product_id not in inventory:
         raise ValueError(f"Product ID {product_id} not found")
     
     # Create a new dictionary with the updated price
-    updated_inventory = inventory.copy()
+    updated_inventory = _updatable(inventory)
     updated_inventory[product_id] = {**updated_inventory[product_id], "price": new_price}
     
     return updated_inventory
 
+def _check_quantity_change(quantity_change):
+    """
+    Check a stock change is a whole number, returning it as an integer.
+    
+    Stock levels follow the catalog_loader.validate_product rules, so booleans,
+    non-finite numbers and fractions such as 1.5 are rejected.
+    
+    Args:
+        quantity_change: Amount to change stock by
+    
+    Returns:
+        int: The quantity change
+    """
+    if quantity_change is None:
+        raise ValueError("Quantity change cannot be None")
+    if check_number(quantity_change, "Quantity change") != int(quantity_change):
+        raise ValueError("Quantity change must be a whole number")
+    return int(quantity_change)
+
 def update_stock_level(inventory, product_id, quantity_change):
     """
     Update a product's stock level.
@@ -217,20 +441,21 @@ def update_stock_level(inventory, product_id, quantity_change):
         raise ValueError("Inventory cannot be None")
     if product_id is None:
         raise ValueError("Product ID cannot be None")
-    if quantity_change is None:
-        raise ValueError("Quantity change cannot be None")
+    quantity_change = _check_quantity_change(quantity_change)
     
     if product_id not in inventory:
         raise ValueError(f"Product ID {product_id} not found")
     
-    # Create a new dictionary with the updated stock
-    updated_inventory = inventory.copy()
-    new_stock = updated_inventory[product_id]["stock"] + quantity_change
+    # Validate before copying, so a rejected change leaves nothing to clean up
+    product = inventory[product_id]
+    new_stock = product["stock"] + quantity_change
     
     if new_stock < 0:
         raise ValueError("Stock cannot be negative")
     
-    updated_inventory[product_id] = {**updated_inventory[product_id], "stock": new_stock}
+    # Create a new dictionary with the updated stock
+    updated_inventory = _updatable(inventory)
+    updated_inventory[product_id] = {**product, "stock": new_stock}
     
     return updated_inventory
 
@@ -257,11 +482,12 @@ def add_product_feature(inventory, product_id, new_feature):
         raise ValueError(f"Product ID {product_id} not found")
     
     # Create a new dictionary with the updated features
-    updated_inventory = inventory.copy()
-    if new_feature not in updated_inventory[product_id]["features"]:
-        updated_features = updated_inventory[product_id]["features"].copy()
+    product = inventory[product_id]
+    updated_inventory = _updatable(inventory)
+    if new_feature not in product["features"]:
+        updated_features = product["features"].copy()
         updated_features.append(new_feature)
-        updated_inventory[product_id] = {**updated_inventory[product_id], "features": updated_features}
+        updated_inventory[product_id] = {**product, "features": updated_features}
     
     return updated_inventory
 
@@ -279,15 +505,205 @@ def merge_inventories(existing_inventory, new_products):
     if existing_inventory is None or new_products is None:
         raise ValueError("Inventories cannot be None")
     
+    _check_product_prices(new_products.keys(), new_products.values())
+    
     # Create a copy of the existing inventory
-    merged_inventory = existing_inventory.copy()
+    merged_inventory = _updatable(existing_inventory)
     
-    # Add new products with a "new_arrival" flag
-    for pid, product in new_products.items():
-        merged_inventory[pid] = {**product, "new_arrival": True}
+    # Add new products with a "new_arrival" flag in one bulk update
+    merged_inventory.update({pid: {**product, "new_arrival": True} for pid, product in new_products.items()})
     
     return merged_inventory
 
+def bulk_merge(existing_inventory, new_products, policy="overwrite"):
+    """
+    Merge many products into an inventory, resolving conflicting IDs by policy.
+    
+    Products taken from new_products get the "new_arrival" flag, as in
+    merge_inventories. The result is written with a single bulk update.
+    
+    Args:
+        existing_inventory (dict): The existing product inventory
+        new_products: Mapping or iterable of (product_id, product_data) pairs;
+            it is read once, so a generator is streamed
+        policy (str): For IDs in both, "overwrite" takes the new product,
+            "keep_existing" keeps the current one, "sum_stock" keeps the current
+            one with both stock levels added, and "newer" takes whichever has the
+            later "updated_at" value, keeping the current one on ties or when
+            either lacks the field
+    
+    Returns:
+        tuple: (merged_inventory, summary) where summary has "inserted",
+            "updated" and "skipped" lists of product IDs
+    """
+    if existing_inventory is None or new_products is None:
+        raise ValueError("Inventories cannot be None")
+    if policy not in MERGE_POLICIES:
+        raise ValueError(f"Unknown merge policy {policy}")
+    
+    if policy == "overwrite" and isinstance(new_products, Mapping):
+        return _overwrite_merge(existing_inventory, new_products)
+    
+    pairs = new_products.items() if isinstance(new_products, Mapping) else new_products
+    writes = {}
+    # An ID is inserted if it was not in the inventory, updated once a product
+    # is written for it, and skipped otherwise
+    outcomes = {}
+    for pid, product in pairs:
+        if product is None:
+            raise ValueError(f"Product {pid} cannot be None")
+        _check_product_price(pid, product)
+        current = writes.get(pid)
+        if current is None:
+            # One lookup both finds the current product and classifies a new ID
+            current = existing_inventory.get(pid)
+            if pid not in outcomes:
+                outcomes[pid] = "skipped" if current is not None else "inserted"
+        
+        if current is None or policy == "overwrite":
+            writes[pid] = {**product, "new_arrival": True}
+        elif policy == "sum_stock":
+            writes[pid] = {**current, "stock": current["stock"] + product["stock"]}
+        elif policy == "newer":
+            current_time = current.get(MERGE_TIMESTAMP_FIELD)
+            new_time = product.get(MERGE_TIMESTAMP_FIELD)
+            if current_time is not None and new_time is not None and new_time > current_time:
+                writes[pid] = {**product, "new_arrival": True}
+        if outcomes[pid] == "skipped" and pid in writes:
+            outcomes[pid] = "updated"
+    
+    merged_inventory = _updatable(existing_inventory)
+    merged_inventory.update(writes)
+    
+    summary = {"inserted": [], "updated": [], "skipped": []}
+    for pid, outcome in outcomes.items():
+        summary[outcome].append(pid)
+    return merged_inventory, summary
+
+def _overwrite_merge(existing_inventory, new_products):
+    """
+    Merge a mapping of products with the "overwrite" policy.
+    
+    Every product is written, so there is no per-row policy decision: the
+    products are copied and flagged in bulk and written with one update.
+    IDs are only looked up in the inventory, to classify them, when the
+    merge did not insert them all.
+    
+    Args:
+        existing_inventory (dict): The existing product inventory
+        new_products (Mapping): New products by product ID
+    
+    Returns:
+        tuple: (merged_inventory, summary), as for bulk_merge
+    """
+    try:
+        products = list(map(dict, new_products.values()))
+    except TypeError:
+        for pid, product in new_products.items():
+            if product is None:
+                raise ValueError(f"Product {pid} cannot be None")
+        raise
+    for product in products:
+        product["new_arrival"] = True
+    _check_product_prices(new_products, products)
+    
+    merged_inventory = _updatable(existing_inventory)
+    if merged_inventory is existing_inventory:
+        # A SQLite inventory is written in place, so its IDs are classified first
+        updated = list(filter(existing_inventory.__contains__, new_products))
+        merged_inventory.update(zip(new_products, products))
+    else:
+        merged_inventory.update(zip(new_products, products))
+        all_inserted = len(merged_inventory) == len(existing_inventory) + len(products)
+        updated = [] if all_inserted else list(filter(existing_inventory.__contains__, new_products))
+    inserted = list(filterfalse(set(updated).__contains__, new_products)) if updated else list(new_products)
+    return merged_inventory, {"inserted": inserted, "updated": updated, "skipped": []}
+
+def _apply_change(inventory, pending, change_type, product_id, value):
+    """
+    Work out a product's data after one batch change.
+    Uses the same validation rules as the single-item update functions.
+    
+    Args:
+        inventory (dict): The product inventory
+        pending (dict): Products already changed earlier in the batch
+        change_type (str): "price", "stock" or "feature"
+        product_id (str): Product ID to update
+        value: New price, quantity change or new feature
+    
+    Returns:
+        dict: Updated product data
+    """
+    if product_id is None:
+        raise ValueError("Product ID cannot be None")
+    if change_type == "price" and (value is None or check_number(value, "New price") < 0):
+        raise ValueError("New price cannot be None or negative")
+    if change_type == "stock":
+        value = _check_quantity_change(value)
+    if change_type == "feature" and (value is None or value == ""):
+        raise ValueError("New feature cannot be None or empty")
+    if change_type not in ("price", "stock", "feature"):
+        raise ValueError(f"Unknown change type {change_type}")
+    
+    if product_id in pending:
+        product = pending[product_id]
+    elif product_id in inventory:
+        product = inventory[product_id]
+    else:
+        raise ValueError(f"Product ID {product_id} not found")
+    
+    if change_type == "price":
+        return {**product, "price": value}
+    
+    if change_type == "stock":
+        new_stock = product["stock"] + value
+        if new_stock < 0:
+            raise ValueError("Stock cannot be negative")
+        return {**product, "stock": new_stock}
+    
+    if value in product["features"]:
+        return product
+    return {**product, "features": product["features"] + [value]}
+
+def apply_updates(inventory, changes, atomic=True):
+    """
+    Apply a batch of price, stock and feature changes with a single inventory copy.
+    
+    Args:
+        inventory (dict): The product inventory
+        changes (iterable): (change_type, product_id, value) tuples, where change_type
+            is "price", "stock" or "feature"
+        atomic (bool): Reject the whole batch if any change is invalid
+    
+    Returns:
+        tuple: (updated_inventory, failures) where failures lists
+            (position, change, error message) for each skipped change
+    """
+    if inventory is None:
+        raise ValueError("Inventory cannot be None")
+    if changes is None:
+        raise ValueError("Changes cannot be None")
+    
+    # Validate every change against the products as changed so far in the batch
+    pending = {}
+    failures = []
+    for position, change in enumerate(changes):
+        try:
+            change_type, product_id, value = change
+            pending[product_id] = _apply_change(inventory, pending, change_type, product_id, value)
+        except (TypeError, ValueError) as e:
+            failures.append((position, change, str(e)))
+    
+    if atomic and failures:
+        position, _, message = failures[0]
+        raise ValueError(f"Batch rejected: {len(failures)} invalid changes, first at position {position}: {message}")
+    
+    # Copy once and write each changed product once, in one bulk update
+    updated_inventory = _updatable(inventory)
+    updated_inventory.update(pending)
+    
+    return updated_inventory, failures
+
 def calculate_category_counts(inventory):
     """
     Calculate the number of products in each category.
@@ -301,6 +717,9 @@ def calculate_category_counts(inventory):
     if inventory is None:
         raise ValueError("Inventory cannot be None")
     
+    if isinstance(inventory, (IndexedInventory, ColumnarInventory, SnapshotInventory, SqliteInventory)):
+        return inventory.category_counts()
+    
     category_counts = {}
     for product in inventory.values():
         category = product["category"]
@@ -324,7 +743,11 @@ def calculate_total_inventory_value(inventory):
     if inventory is None:
         raise ValueError("Inventory cannot be None")
     
-    return sum(product["price"] * product["stock"] for product in inventory.values())
+    if isinstance(inventory, (IndexedInventory, ColumnarInventory, SqliteInventory)):
+        return inventory.total_value()
+    
+    # fsum is correctly rounded, so the result does not depend on product order
+    return fsum(product["price"] * product["stock"] for product in inventory.values())
 
 def find_highest_rated_product(inventory):
     """
@@ -339,8 +762,85 @@ def find_highest_rated_product(inventory):
     if inventory is None or not inventory:
         raise ValueError("Inventory cannot be None or empty")
     
+    if isinstance(inventory, (IndexedInventory, ColumnarInventory, SqliteInventory)):
+        return inventory.highest_rated()
+    
     return max(inventory.items(), key=lambda item: item[1]["rating"])
 
+def top_k(inventory, k, key="rating", category=None):
+    """
+    Find the k products with the highest rating, price or stock.
+    Ties are broken by ascending product ID.
+    
+    Args:
+        inventory (dict): The product inventory
+        k (int): Number of products to return
+        key (str): Field to rank by: "rating", "price" or "stock"
+        category (str): Only rank products in this category, or None for all
+    
+    Returns:
+        list: (product_id, product_data) tuples, highest value first
+    """
+    if inventory is None:
+        raise ValueError("Inventory cannot be None")
+    if k is None or k < 0:
+        raise ValueError("k cannot be None or negative")
+    if key not in RANKING_KEYS:
+        raise ValueError(f"Ranking key must be one of: {', '.join(RANKING_KEYS)}")
+    
+    if isinstance(inventory, IndexedInventory):
+        return [(pid, inventory[pid]) for pid in inventory.top_ids(k, key, category)]
+    if isinstance(inventory, SqliteInventory):
+        return inventory.top_k(k, key, category)
+    
+    candidates = ((pid, product) for pid, product in inventory.items()
+                  if category is None or product["category"] == category)
+    return heapq.nsmallest(k, candidates, key=lambda item: (-item[1][key], item[0]))
+
+def create_price_histogram(inventory, edges, summary="ids"):
+    """
+    Group products into price buckets between caller-supplied edges.
+    Bucket i holds prices from edges[i - 1] up to, but not including, edges[i];
+    the first bucket is open below and the last bucket is open above.
+    
+    Args:
+        inventory (dict): The product inventory
+        edges (list): Ascending bucket boundaries
+        summary (str): "ids" for lists of product IDs, "counts" for product counts,
+            or "values" for the total value (price * stock) of each bucket
+    
+    Returns:
+        list: One entry per bucket, len(edges) + 1 in total
+    """
+    if inventory is None:
+        raise ValueError("Inventory cannot be None")
+    if edges is None:
+        raise ValueError("Bucket edges cannot be None")
+    if any(lower >= upper for lower, upper in zip(edges, edges[1:])):
+        raise ValueError("Bucket edges must be in ascending order")
+    if summary not in HISTOGRAM_SUMMARIES:
+        raise ValueError(f"Summary must be one of: {', '.join(HISTOGRAM_SUMMARIES)}")
+    
+    if isinstance(inventory, (ColumnarInventory, SqliteInventory)):
+        return inventory.price_histogram(edges, summary)
+    # Listing IDs in inventory order from the price index would sort every
+    # product by rank, which costs more than a scan, so only counts use it
+    if isinstance(inventory, IndexedInventory) and summary == "counts":
+        bounds = [None, *edges, None]
+        return [inventory.count_in_price_band(lower, upper) for lower, upper in zip(bounds, bounds[1:])]
+    
+    if summary == "ids":
+        buckets = [[] for _ in range(len(edges) + 1)]
+        for pid, product in inventory.items():
+            buckets[bisect_right(edges, product["price"])].append(pid)
+        return buckets
+    
+    buckets = [0] * (len(edges) + 1)
+    for product in inventory.values():
+        bucket = bisect_right(edges, product["price"])
+        buckets[bucket] += 1 if summary == "counts" else product["price"] * product["stock"]
+    return buckets
+
 def create_price_brackets(inventory):
     """
     Group products into price brackets.
@@ -354,22 +854,10 @@ def create_price_brackets(inventory):
     if inventory is None:
         raise ValueError("Inventory cannot be None")
     
-    price_brackets = {
-        "budget": [],       # 0-3000
-        "mid_range": [],    # 3000-10000
-        "premium": []       # 10000+
-    }
-    
-    for pid, product in inventory.items():
-        price = product["price"]
-        if price < 3000:
-            price_brackets["budget"].append(pid)
-        elif price < 10000:
-            price_brackets["mid_range"].append(pid)
-        else:
-            price_brackets["premium"].append(pid)
+    # Budget is 0-3000, mid_range is 3000-10000 and premium is 10000+
+    budget, mid_range, premium = create_price_histogram(inventory, [3000, 10000])
     
-    return price_brackets
+    return {"budget": budget, "mid_range": mid_range, "premium": premium}
 
 def get_formatted_product(pid, product):
     """
@@ -400,28 +888,95 @@ def get_formatted_product(pid, product):
         f"₹{product['price']:.2f} | Stock: {product['stock']} | Rating: {stars} | {features}"
     )
 
-def display_data(data, data_type):
+def _cached_product_line(pid, product, version=None):
+    """Return the formatted line of a product, reusing it while the inventory version is unchanged."""
+    if version is None:
+        return get_formatted_product(pid, product)
+    key = (version, pid)
+    line = _formatted_lines.get(key)
+    if line is None:
+        line = get_formatted_product(pid, product)
+        if len(_formatted_lines) >= FORMATTED_LINE_CACHE_SIZE:
+            del _formatted_lines[next(iter(_formatted_lines))]
+        _formatted_lines[key] = line
+    return line
+
+def page_count(data, page_size=DISPLAY_PAGE_SIZE):
+    """
+    Count the pages needed to display some products.
+    
+    Args:
+        data (dict): Products to display
+        page_size (int): Products per page
+    
+    Returns:
+        int: Number of pages, at least 1
+    """
+    if page_size is None or page_size < 1:
+        raise ValueError("Page size must be at least 1")
+    return max(1, -(-len(data) // page_size))
+
+def render_page(data, page=1, page_size=DISPLAY_PAGE_SIZE):
+    """
+    Format one page of products.
+    
+    Args:
+        data (dict): Products to display
+        page (int): Page number, starting at 1
+        page_size (int): Products per page
+    
+    Returns:
+        str: Formatted product lines of the page, one per line
+    """
+    pages = page_count(data, page_size)
+    if page is None or not 1 <= page <= pages:
+        raise ValueError(f"Page must be between 1 and {pages}")
+    start = (page - 1) * page_size
+    if isinstance(data, SEEKABLE_INVENTORIES):
+        pairs = data.items_from(start)
+    else:
+        pairs = islice(data.items(), start, None)
+    version = getattr(data, "version", None)
+    return "\n".join(_cached_product_line(pid, product, version)
+                     for pid, product in islice(pairs, page_size))
+
+def display_data(data, data_type, page=None, page_size=DISPLAY_PAGE_SIZE):
     """
     Display formatted data based on data type.
     
+    Inventory and filter results are written one page at a time, with a
+    single write per page.
+    
     Args:
         data: Data to display (dict, tuple, etc.)
         data_type (str): Type of data being displayed
+        page (int): Page of products to display, or None to display every page
+        page_size (int): Products per page
+    
+    Returns:
+        int: Number of the next page of products, or None if there are no more
     """
     if data is None:
         print("No data to display.")
-        return
+        return None
     
     if data_type == "inventory" or data_type == "filtered":
         header = "\nCurrent Inventory:" if data_type == "inventory" else "\nFiltered Products:"
-        print(header)
         
         if not data:
+            print(header)
             print("No products to display.")
-            return
+            return None
         
-        for pid, product in data.items():
-            print(get_formatted_product(pid, product))
+        pages = page_count(data, page_size)
+        if page is None:
+            sys.stdout.write(header + "\n")
+            for number in range(1, pages + 1):
+                sys.stdout.write(render_page(data, number, page_size) + "\n")
+            return None
+        
+        sys.stdout.write(f"{header}\n{render_page(data, page, page_size)}\nPage {page} of {pages}\n")
+        return page + 1 if page < pages else None
     
     elif data_type == "categories":
         print("\nProduct Categories:")
@@ -446,14 +1001,263 @@ def display_data(data, data_type):
     else:
         print(f"\n{data_type}:")
         print(data)
+    return None
+
+def browse_pages(data, data_type, page_size=DISPLAY_PAGE_SIZE):
+    """
+    Display products a page at a time, asking the user which page to show next.
+    
+    Args:
+        data (dict): Products to display
+        data_type (str): "inventory" or "filtered"
+        page_size (int): Products per page
+    """
+    if not data or len(data) <= page_size:
+        display_data(data, data_type)
+        return
+    
+    pages = page_count(data, page_size)
+    page = 1
+    while True:
+        next_page = display_data(data, data_type, page, page_size)
+        command = input("Enter for next page, p for previous, a page number, or q to stop: ").strip().lower()
+        if command == "q":
+            return
+        elif command in ("", "n"):
+            if next_page is None:
+                return
+            page = next_page
+        elif command == "p":
+            page = max(1, page - 1)
+        elif command.isdigit() and 1 <= int(command) <= pages:
+            page = int(command)
+        else:
+            print(f"Invalid page. Choose 1 to {pages}.")
+
+def _command_field(command, name, types, description, default=None):
+    """
+    Return a field of a batch command, checking its JSON type.
+    
+    Args:
+        command (dict): Command object
+        name (str): Field name
+        types: Type or tuple of types the value may have; booleans only match bool
+        description (str): Expected type for the error message
+        default: Value used when the field is missing or null
+    
+    Returns:
+        The field value, or default
+    """
+    types = types if isinstance(types, tuple) else (types,)
+    value = command.get(name)
+    if value is None:
+        return default
+    if not isinstance(value, types) or (isinstance(value, bool) and bool not in types):
+        raise ValueError(f'"{name}" must be {description}')
+    return value
+
+def _command_products(command, new_products):
+    """Return the validated products of a merge command, keeping any extra fields such as "updated_at"."""
+    products = _command_field(command, "products", dict, "an object of products by ID")
+    if products is None:
+        return new_products if new_products is not None else {}
+    validated = {}
+    for pid, product in products.items():
+        if not isinstance(product, dict):
+            raise ValueError(f"Product {pid} must be an object")
+        try:
+            _, fields = validate_product({**product, "id": pid})
+        except ValueError as e:
+            raise ValueError(f"Product {pid}: {e}")
+        validated[pid] = {**product, **fields}
+    return validated
+
+def run_command(inventory, command, new_products=None):
+    """
+    Execute one batch command.
+    
+    Commands are JSON objects with an "op" of:
+        filter  query criteria "category", "price" ([min, max]), "min_stock",
+                "features" and "keyword"; "details": true adds the products
+        update  "changes" as [change_type, product_id, value] lists for
+                apply_updates, and optionally "atomic"
+        merge   "products" by ID, the new sample products if omitted, and
+                optionally a bulk_merge "policy"
+        stats   "name" from BATCH_STATISTICS; "top" also takes "k", "key"
+                and "category"
+    
+    Fields of the wrong JSON type, update values and merged products that
+    fail catalog validation raise ValueError before anything is changed.
+    
+    Args:
+        inventory (dict): The product inventory
+        command (dict): Command to execute
+        new_products (dict): Products a merge command without "products" adds
+    
+    Returns:
+        tuple: (inventory after the command, JSON-serializable result)
+    """
+    if not isinstance(command, dict):
+        raise ValueError("Command must be a JSON object")
+    operation = command.get("op")
+    
+    if operation == "filter":
+        price = _command_field(command, "price", list, "a [min, max] list")
+        if price is not None and (len(price) != 2 or not all(
+                isinstance(bound, (int, float)) and not isinstance(bound, bool) for bound in price)):
+            raise ValueError('"price" must be a [min, max] list of numbers')
+        features = _command_field(command, "features", list, "a list of strings")
+        if features is not None and not all(isinstance(feature, str) for feature in features):
+            raise ValueError('"features" must be a list of strings')
+        filtered = query(inventory, category=_command_field(command, "category", str, "a string"),
+                         price=price, min_stock=_command_field(command, "min_stock", int, "an integer"),
+                         features=features, keyword=_command_field(command, "keyword", str, "a string"))
+        result = {"count": len(filtered), "ids": list(filtered)}
+        if command.get("details"):
+            result["products"] = filtered
+        return inventory, result
+    
+    if operation == "update":
+        changes = _command_field(command, "changes", list, "a list of changes", [])
+        if not all(isinstance(change, list) for change in changes):
+            raise ValueError('"changes" must be a list of [change_type, product_id, value] lists')
+        changes = [tuple(change) for change in changes]
+        atomic = _command_field(command, "atomic", bool, "true or false", True)
+        updated_inventory, failures = apply_updates(inventory, changes, atomic)
+        return updated_inventory, {"applied": len(changes) - len(failures),
+                                   "failures": [{"position": position, "error": message}
+                                                for position, _, message in failures]}
+    
+    if operation == "merge":
+        products = _command_products(command, new_products)
+        return bulk_merge(inventory, products, _command_field(command, "policy", str, "a string", "overwrite"))
+    
+    if operation == "stats":
+        name = command.get("name")
+        if name == "categories":
+            return inventory, calculate_category_counts(inventory)
+        if name == "value":
+            return inventory, calculate_total_inventory_value(inventory)
+        if name == "highest_rated":
+            pid, product = find_highest_rated_product(inventory)
+            return inventory, {"id": pid, "product": product}
+        if name == "brackets":
+            return inventory, create_price_brackets(inventory)
+        if name == "top":
+            ranked = top_k(inventory, _command_field(command, "k", int, "an integer", 10),
+                           _command_field(command, "key", str, "a string", "rating"),
+                           _command_field(command, "category", str, "a string"))
+            return inventory, [{"id": pid, "product": product} for pid, product in ranked]
+        raise ValueError(f"Statistic must be one of: {', '.join(BATCH_STATISTICS)}")
+    
+    raise ValueError(f"Operation must be one of: {', '.join(BATCH_OPERATIONS)}")
 
-def main():
-    """Main program function."""
+def run_batch(inventory, lines, new_products=None, output=None, timings=False):
+    """
+    Execute batch commands without the menu, writing one JSON result line per command.
+    
+    Each non-blank input line is a command object for run_command; lines
+    starting with "#" are comments. Each output line holds the input "line"
+    number, the "op" and either its "result" or an "error", plus "ms" when
+    timings are on. A failed command changes nothing and the batch goes on.
+    
+    Args:
+        inventory (dict): The product inventory
+        lines: Iterable of command lines, such as an open file
+        new_products (dict): Products a merge command without "products" adds
+        output: Text stream for the results; standard output by default
+        timings (bool): Add each command's run time in milliseconds
+    
+    Returns:
+        tuple: (final inventory, summary) where summary has "commands",
+            "failed" and "seconds"
+    """
+    if inventory is None:
+        raise ValueError("Inventory cannot be None")
+    if lines is None:
+        raise ValueError("Commands cannot be None")
+    if output is None:
+        output = sys.stdout
+    
+    commands = 0
+    failed = 0
+    batch_start = time.perf_counter()
+    for line_number, line in enumerate(lines, start=1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        commands += 1
+        start = time.perf_counter()
+        entry = {"line": line_number, "op": None}
+        try:
+            command = json.loads(line)
+            if isinstance(command, dict):
+                entry["op"] = command.get("op")
+            inventory, entry["result"] = run_command(inventory, command, new_products)
+        except (KeyError, TypeError, ValueError) as e:
+            failed += 1
+            entry["error"] = str(e)
+        if timings:
+            entry["ms"] = round((time.perf_counter() - start) * 1000, 3)
+        output.write(json.dumps(entry) + "\n")
+    
+    return inventory, {"commands": commands, "failed": failed, "seconds": time.perf_counter() - batch_start}
+
+def main(catalog_path=None, batch_path=None, timings=False):
+    """
+    Main program function.
+    
+    Args:
+        catalog_path (str): Optional CSV, JSONL, snapshot or SQLite file to use instead of the sample inventory
+        batch_path (str): Optional file of batch commands, or "-" for standard input,
+            to run with run_batch instead of showing the menu
+        timings (bool): Report the run time of each batch command
+    """
     inventory, new_products = initialize_data()
+    if catalog_path is not None and catalog_path.endswith(SNAPSHOT_EXTENSION):
+        # Snapshots are read lazily and become an indexed inventory on the first update
+        inventory = open_snapshot(catalog_path)
+    elif catalog_path is not None and catalog_path.endswith(SQLITE_EXTENSIONS):
+        # SQLite catalogs stay on disk and are updated in place
+        inventory = SqliteInventory(catalog_path)
+    elif catalog_path is not None:
+        inventory, stats = load_catalog(catalog_path)
+        # Batch results go to standard output, so messages go to standard error
+        print(f"Loaded {stats['rows']} products from {catalog_path} "
+              f"({stats['rows_per_second']:.0f} rows/sec).", file=sys.stderr if batch_path is not None else sys.stdout)
+    if isinstance(inventory, (SnapshotInventory, SqliteInventory)):
+        # Close the file opened here; updates may replace the session's inventory with an indexed copy
+        try:
+            _run_session(inventory, new_products, batch_path, timings)
+        finally:
+            inventory.close()
+    else:
+        _run_session(IndexedInventory(inventory), new_products, batch_path, timings)
+
+def _run_session(inventory, new_products, batch_path=None, timings=False):
+    """
+    Run batch commands or the interactive menu on an opened inventory.
+    
+    Args:
+        inventory (dict): The product inventory
+        new_products (dict): Products the "Add New Products" option and merge commands add
+        batch_path (str): Optional file of batch commands, or "-" for standard input
+        timings (bool): Report the run time of each batch command
+    """
+    if batch_path is not None:
+        commands = sys.stdin if batch_path == "-" else open(batch_path, encoding="utf-8")
+        try:
+            _, summary = run_batch(inventory, commands, new_products, timings=timings)
+        finally:
+            if commands is not sys.stdin:
+                commands.close()
+        print(f"{summary['commands']} commands, {summary['failed']} failed, in {summary['seconds']:.3f}s.",
+              file=sys.stderr)
+        return
     
     while True:
         # Show basic info about the inventory
-        categories = set(product["category"] for product in inventory.values())
+        categories = calculate_category_counts(inventory).keys()
         
         print(f"\n===== ONLINE STORE MANAGEMENT SYSTEM =====")
         print(f"Total Products: {len(inventory)}")
@@ -474,7 +1278,7 @@ def main():
             break
         
         elif choice == "1":
-            display_data(inventory, "inventory")
+            browse_pages(inventory, "inventory")
         
         elif choice == "2":
             print("\nFilter Options:")
@@ -483,19 +1287,20 @@ def main():
             print("3. Filter by Availability")
             print("4. Filter by Feature")
             print("5. Search by Keyword")
-            filter_choice = input("Select filter option (1-5): ")
+            print("6. Combined Filter")
+            filter_choice = input("Select filter option (1-6): ")
             
             if filter_choice == "1":
                 category = input("Enter category to filter by: ")
                 filtered = filter_by_category(inventory, category)
-                display_data(filtered, "filtered")
+                browse_pages(filtered, "filtered")
             
             elif filter_choice == "2":
                 try:
                     min_price = float(input("Enter minimum price: ₹"))
                     max_price = float(input("Enter maximum price: ₹"))
                     filtered = filter_by_price_range(inventory, min_price, max_price)
-                    display_data(filtered, "filtered")
+                    browse_pages(filtered, "filtered")
                 except ValueError as e:
                     print(f"Error: {e}")
             
@@ -503,19 +1308,40 @@ def main():
                 try:
                     min_stock = int(input("Enter minimum stock level: "))
                     filtered = filter_by_availability(inventory, min_stock)
-                    display_data(filtered, "filtered")
+                    browse_pages(filtered, "filtered")
                 except ValueError as e:
                     print(f"Error: {e}")
             
             elif filter_choice == "4":
                 feature = input("Enter feature to filter by: ")
                 filtered = filter_by_feature(inventory, feature)
-                display_data(filtered, "filtered")
+                browse_pages(filtered, "filtered")
             
             elif filter_choice == "5":
                 keyword = input("Enter keyword to search for: ")
                 filtered = find_products_with_keyword(inventory, keyword)
-                display_data(filtered, "filtered")
+                browse_pages(filtered, "filtered")
+            
+            elif filter_choice == "6":
+                try:
+                    print("Leave a criterion blank to skip it.")
+                    category = input("Category: ") or None
+                    min_price = input("Minimum price: ₹")
+                    max_price = input("Maximum price: ₹")
+                    min_stock = input("Minimum stock level: ")
+                    features = input("Features (comma-separated): ")
+                    keyword = input("Keyword: ") or None
+                    filtered = query(
+                        inventory,
+                        category=category,
+                        price=(float(min_price or 0), float(max_price or "inf")) if min_price or max_price else None,
+                        min_stock=int(min_stock) if min_stock else None,
+                        features=[feature.strip() for feature in features.split(",") if feature.strip()],
+                        keyword=keyword
+                    )
+                    browse_pages(filtered, "filtered")
+                except ValueError as e:
+                    print(f"Error: {e}")
             
             else:
                 print("Invalid choice.")
@@ -594,8 +1420,22 @@ def main():
             else:
                 print("Invalid choice.")
         
+        elif choice == "9":
+            # Hidden option: the first use turns profiling on, later uses print what it recorded
+            if profiler.enabled:
+                print("\n" + profiler.report())
+            else:
+                profiler.enable(sys.modules[__name__])
+                print("Profiling enabled. Choose 9 again to see the report.")
+        
         else:
             print("Invalid choice. Please try again.")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Online Store Management System")
+    parser.add_argument("catalog", nargs="?", help="CSV, JSONL, snapshot or SQLite file; the sample inventory by default")
+    parser.add_argument("--batch", metavar="FILE", help="run JSON-lines commands from FILE, or - for standard input, "
+                                                        "and print JSON-lines results instead of showing the menu")
+    parser.add_argument("--timings", action="store_true", help="add each batch command's run time to its result")
+    options = parser.parse_args()
+    main(options.catalog, options.batch, options.timings)
\ No newline at end of file
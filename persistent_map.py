@@ -0,0 +1,756 @@
+"""
+Persistent Map
+Immutable mappings that share structure between versions, so replacing one
+product in a large inventory copies only a handful of small nodes.
+"""
+
+from bisect import bisect_left, bisect_right
+from collections.abc import ItemsView, Mapping, ValuesView
+
+# Maximum number of entries in a node before it is split in two
+NODE_CAPACITY = 32
+
+# Marks a missing key, since None can be a stored value
+_MISSING = object()
+
+# A batch of changes rebuilds a map when it touches at least one entry in this many
+REBUILD_RATIO = 8
+
+# Fewest shards a HashMap splits its entries over
+MIN_SHARDS = 16
+
+
+class _Leaf:
+    """Leaf node holding sorted keys and their values."""
+
+    __slots__ = ("keys", "values", "size")
+
+    def __init__(self, keys, values):
+        self.keys = keys
+        self.values = values
+        self.size = len(keys)
+
+
+class _Branch:
+    """Inner node holding its children, the smallest key and the entry count of each child."""
+
+    __slots__ = ("keys", "children", "sizes", "size")
+
+    def __init__(self, keys, children, sizes):
+        self.keys = keys
+        self.children = children
+        self.sizes = sizes
+        self.size = sum(sizes)
+
+
+def _child_position(keys, key):
+    """Return the position of the child of a branch that covers a key."""
+    return max(bisect_right(keys, key) - 1, 0)
+
+
+def _split_leaf(keys, values):
+    """Return a leaf built from keys and values, split in two if it is over capacity."""
+    if len(keys) <= NODE_CAPACITY:
+        return [_Leaf(keys, values)]
+    middle = len(keys) // 2
+    return [_Leaf(keys[:middle], values[:middle]), _Leaf(keys[middle:], values[middle:])]
+
+
+def _split_branch(keys, children, sizes):
+    """Return a branch built from its child lists, split in two if it is over capacity."""
+    if len(keys) <= NODE_CAPACITY:
+        return [_Branch(keys, children, sizes)]
+    middle = len(keys) // 2
+    return [_Branch(keys[:middle], children[:middle], sizes[:middle]),
+            _Branch(keys[middle:], children[middle:], sizes[middle:])]
+
+
+def _assoc(node, key, value):
+    """
+    Path-copy a node with a key set to a value.
+
+    Args:
+        node (_Leaf or _Branch): Node to update
+        key: Key to set
+        value: Value to store
+
+    Returns:
+        tuple: (replacement nodes, whether the key was newly added)
+    """
+    if isinstance(node, _Leaf):
+        position = bisect_left(node.keys, key)
+        if position < len(node.keys) and node.keys[position] == key:
+            values = node.values.copy()
+            values[position] = value
+            return [_Leaf(node.keys, values)], False
+        keys = node.keys.copy()
+        values = node.values.copy()
+        keys.insert(position, key)
+        values.insert(position, value)
+        return _split_leaf(keys, values), True
+
+    position = _child_position(node.keys, key)
+    replacements, added = _assoc(node.children[position], key, value)
+    keys = node.keys.copy()
+    children = node.children.copy()
+    sizes = node.sizes.copy()
+    keys[position:position + 1] = [child.keys[0] for child in replacements]
+    children[position:position + 1] = replacements
+    sizes[position:position + 1] = [child.size for child in replacements]
+    return _split_branch(keys, children, sizes), added
+
+
+def _dissoc(node, key):
+    """
+    Path-copy a node without a key.
+
+    Args:
+        node (_Leaf or _Branch): Node to update
+        key: Key to remove
+
+    Returns:
+        _Leaf or _Branch: Replacement node, or None if the node became empty
+    """
+    if isinstance(node, _Leaf):
+        position = bisect_left(node.keys, key)
+        if position == len(node.keys) or node.keys[position] != key:
+            raise KeyError(key)
+        if len(node.keys) == 1:
+            return None
+        keys = node.keys[:position] + node.keys[position + 1:]
+        values = node.values[:position] + node.values[position + 1:]
+        return _Leaf(keys, values)
+
+    position = _child_position(node.keys, key)
+    replacement = _dissoc(node.children[position], key)
+    keys = node.keys.copy()
+    children = node.children.copy()
+    sizes = node.sizes.copy()
+    if replacement is None:
+        del keys[position]
+        del children[position]
+        del sizes[position]
+        if not children:
+            return None
+    else:
+        keys[position] = replacement.keys[0]
+        children[position] = replacement
+        sizes[position] = replacement.size
+    return _Branch(keys, children, sizes)
+
+
+def _bulk_load(keys, values):
+    """Build a tree bottom-up from keys in ascending order and their values."""
+    fill = NODE_CAPACITY * 3 // 4
+    level = [_Leaf(keys[i:i + fill], values[i:i + fill]) for i in range(0, len(keys), fill)]
+    while len(level) > 1:
+        level = [_Branch([child.keys[0] for child in level[i:i + fill]], level[i:i + fill],
+                         [child.size for child in level[i:i + fill]])
+                 for i in range(0, len(level), fill)]
+    return level[0] if level else None
+
+
+def _height(node):
+    """Return the number of branch levels above the leaves of a tree."""
+    height = 0
+    while isinstance(node, _Branch):
+        node = node.children[0]
+        height += 1
+    return height
+
+
+def _last_key(node):
+    """Return the largest key in a non-empty tree."""
+    while isinstance(node, _Branch):
+        node = node.children[-1]
+    return node.keys[-1]
+
+
+def _concat(left, right, left_height, right_height):
+    """
+    Join two trees whose keys are all ordered left before right.
+
+    The shorter tree is hung off the nearest edge of the taller one, so only
+    the nodes along that edge are copied.
+
+    Returns:
+        list: One node holding every entry, or two sibling nodes
+    """
+    if left_height == right_height:
+        return [left, right]
+    if left_height > right_height:
+        replacements = _concat(left.children[-1], right, left_height - 1, right_height)
+        return _split_branch(left.keys[:-1] + [node.keys[0] for node in replacements],
+                             left.children[:-1] + replacements,
+                             left.sizes[:-1] + [node.size for node in replacements])
+    replacements = _concat(left, right.children[0], left_height, right_height - 1)
+    return _split_branch([node.keys[0] for node in replacements] + right.keys[1:],
+                         replacements + right.children[1:],
+                         [node.size for node in replacements] + right.sizes[1:])
+
+
+def _root_of(nodes):
+    """Return the root of a tree made of one node or of two sibling nodes."""
+    if len(nodes) == 1:
+        return nodes[0]
+    return _Branch([node.keys[0] for node in nodes], nodes, [node.size for node in nodes])
+
+
+def _leaves(root, key=None, position=0):
+    """
+    Yield (leaf, start) pairs from a starting entry to the end of a tree.
+
+    The walk starts at the first key not less than key or, without a key, at
+    the entry with the given position in key order. Branch entry counts make
+    either seek O(log n).
+    """
+    if root is None:
+        return
+    path = []
+    node = root
+    while isinstance(node, _Branch):
+        if key is None:
+            index = 0
+            while index < len(node.sizes) - 1 and position >= node.sizes[index]:
+                position -= node.sizes[index]
+                index += 1
+        else:
+            index = _child_position(node.keys, key)
+        path.append((node, index))
+        node = node.children[index]
+    yield node, position if key is None else bisect_left(node.keys, key)
+    while path:
+        branch, index = path.pop()
+        if index + 1 < len(branch.children):
+            path.append((branch, index + 1))
+            node = branch.children[index + 1]
+            while isinstance(node, _Branch):
+                path.append((node, 0))
+                node = node.children[0]
+            yield node, 0
+
+
+class _SortedItemsView(ItemsView):
+    """Items view that walks the leaves directly instead of looking up each key."""
+
+    def __iter__(self):
+        for leaf, _ in _leaves(self._mapping._root):
+            yield from zip(leaf.keys, leaf.values)
+
+
+class _SortedValuesView(ValuesView):
+    """Values view that walks the leaves directly instead of looking up each key."""
+
+    def __iter__(self):
+        for leaf, _ in _leaves(self._mapping._root):
+            yield from leaf.values
+
+
+class SortedMap(Mapping):
+    """
+    Immutable sorted mapping backed by a path-copying B-tree.
+
+    ``set`` and ``delete`` return a new map in O(log n) and share every node
+    off the changed path with the original. Keys iterate in sorted order, so
+    they must be mutually comparable. Each branch records the entry count of
+    its children, so ``position`` and seeking by position are O(log n) too.
+    """
+
+    __slots__ = ("_root",)
+
+    def __init__(self, items=()):
+        """
+        Args:
+            items: Mapping or iterable of (key, value) pairs
+        """
+        if isinstance(items, Mapping):
+            items = items.items()
+        pairs = sorted(dict(items).items(), key=lambda item: item[0])
+        self._root = _bulk_load([key for key, _ in pairs], [value for _, value in pairs])
+
+    @classmethod
+    def _from_root(cls, root):
+        """Wrap an existing tree without copying it."""
+        new_map = cls.__new__(cls)
+        new_map._root = root
+        return new_map
+
+    @classmethod
+    def from_sorted(cls, keys, values):
+        """
+        Build a map from keys that are already unique and in ascending order.
+
+        Args:
+            keys (list): Keys in ascending order
+            values (list): Value of each key
+
+        Returns:
+            SortedMap: Map built bottom-up in O(n)
+        """
+        return cls._from_root(_bulk_load(keys, values))
+
+    def set(self, key, value):
+        """
+        Return a new map with a key set to a value.
+
+        Args:
+            key: Key to set
+            value: Value to store
+
+        Returns:
+            SortedMap: Updated map sharing unchanged nodes with this one
+        """
+        if self._root is None:
+            return self._from_root(_Leaf([key], [value]))
+        replacements, _ = _assoc(self._root, key, value)
+        return self._from_root(_root_of(replacements))
+
+    def delete(self, key):
+        """
+        Return a new map without a key.
+
+        Args:
+            key: Key to remove
+
+        Returns:
+            SortedMap: Updated map sharing unchanged nodes with this one
+
+        Raises:
+            KeyError: If the key is not present
+        """
+        if self._root is None:
+            raise KeyError(key)
+        root = _dissoc(self._root, key)
+        while isinstance(root, _Branch) and len(root.children) == 1:
+            root = root.children[0]
+        return self._from_root(root)
+
+    def apply(self, removed=(), added=()):
+        """
+        Return a new map with a batch of keys removed and then a batch set.
+
+        Small batches are path-copied one key at a time, and a batch of keys
+        that all sort after the existing ones is built separately and joined
+        on. Any other batch that touches a large share of the map rebuilds it
+        in one pass instead.
+
+        Args:
+            removed: Keys to remove; keys that are not present are ignored
+            added: (key, value) pairs to set
+
+        Returns:
+            SortedMap: Updated map
+        """
+        added = dict(added)
+        added_keys = sorted(added)
+        if self._root is None:
+            return self.from_sorted(added_keys, [added[key] for key in added_keys])
+        removed = set(removed)
+        if not removed and len(added) >= NODE_CAPACITY:
+            if added_keys[0] > _last_key(self._root):
+                tail = _bulk_load(added_keys, [added[key] for key in added_keys])
+                return self._from_root(_root_of(_concat(self._root, tail, _height(self._root), _height(tail))))
+        if (len(removed) + len(added)) * REBUILD_RATIO < len(self):
+            new_map = self
+            for key in removed:
+                if key in new_map:
+                    new_map = new_map.delete(key)
+            for key, value in added.items():
+                new_map = new_map.set(key, value)
+            return new_map
+        entries = [(key, value) for leaf, _ in _leaves(self._root) for key, value in zip(leaf.keys, leaf.values)
+                   if key not in removed and key not in added]
+        new_entries = [(key, added[key]) for key in added_keys]
+        # Keys added past the end, such as new insertion ranks, need no merge
+        interleaved = entries and new_entries and new_entries[0][0] < entries[-1][0]
+        entries += new_entries
+        if interleaved:
+            entries.sort(key=lambda item: item[0])
+        return self.from_sorted([key for key, _ in entries], [value for _, value in entries])
+
+    def get(self, key, default=None):
+        node = self._root
+        if node is None:
+            return default
+        while isinstance(node, _Branch):
+            node = node.children[_child_position(node.keys, key)]
+        position = bisect_left(node.keys, key)
+        if position < len(node.keys) and node.keys[position] == key:
+            return node.values[position]
+        return default
+
+    def __getitem__(self, key):
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key):
+        try:
+            self[key]
+        except (KeyError, TypeError):
+            return False
+        return True
+
+    def __len__(self):
+        return self._root.size if self._root is not None else 0
+
+    def __iter__(self):
+        for leaf, _ in _leaves(self._root):
+            yield from leaf.keys
+
+    def __repr__(self):
+        return f"SortedMap({dict(self.items())!r})"
+
+    def items(self):
+        return _SortedItemsView(self)
+
+    def values(self):
+        return _SortedValuesView(self)
+
+    def position(self, key):
+        """
+        Return the number of keys less than a key.
+
+        Args:
+            key: Key to locate; it does not need to be present
+
+        Returns:
+            int: Position the key has, or would have, in key order
+        """
+        node = self._root
+        if node is None:
+            return 0
+        position = 0
+        while isinstance(node, _Branch):
+            index = _child_position(node.keys, key)
+            position += sum(node.sizes[:index])
+            node = node.children[index]
+        return position + bisect_left(node.keys, key)
+
+    def items_from(self, key=None, position=0):
+        """
+        Yield (key, value) pairs in key order, starting part-way through the map.
+
+        Args:
+            key: Start at the first key not less than this one, or None to seek by position
+            position (int): Number of entries to skip when no key is given
+
+        Returns:
+            generator: (key, value) pairs from the starting entry to the end
+        """
+        for leaf, start in _leaves(self._root, key, position):
+            yield from zip(leaf.keys[start:], leaf.values[start:])
+
+
+def _shard_count(size):
+    """Return the number of shards for a HashMap of a size: a power of two near its square root."""
+    shards = MIN_SHARDS
+    while shards * shards < size:
+        shards *= 2
+    return shards
+
+
+class HashMap(Mapping):
+    """
+    Immutable hash mapping split over about sqrt(n) plain dictionary shards.
+
+    A key lives in the shard picked by its hash, so lookups are two dictionary
+    reads. ``set``, ``delete`` and ``apply`` copy the shard list and only the
+    shards they change, O(sqrt n) per key, and share every other shard with
+    the original. Iteration order is arbitrary.
+    """
+
+    __slots__ = ("_shards", "_mask", "_size")
+
+    def __init__(self, items=()):
+        """
+        Args:
+            items: Mapping or iterable of (key, value) pairs
+        """
+        if isinstance(items, Mapping):
+            items = items.items()
+        self._build(dict(items).items())
+
+    def _build(self, pairs, size=None):
+        """Fill the shards from (key, value) pairs with unique keys."""
+        if size is None:
+            pairs = list(pairs)
+            size = len(pairs)
+        shards = [{} for _ in range(_shard_count(size))]
+        mask = len(shards) - 1
+        for key, value in pairs:
+            shards[hash(key) & mask][key] = value
+        self._shards = shards
+        self._mask = mask
+        self._size = size
+
+    def __reduce__(self):
+        # Hashes of strings differ between processes, so a pickled map is rebuilt from its items
+        return HashMap, (list(self.items()),)
+
+    def apply(self, removed=(), added=()):
+        """
+        Return a new map with a batch of keys removed and then a batch set.
+
+        Args:
+            removed: Keys to remove; keys that are not present are ignored
+            added: (key, value) pairs to set
+
+        Returns:
+            HashMap: Updated map sharing unchanged shards with this one
+        """
+        mask = self._mask
+        shards = self._shards.copy()
+        copied = set()
+        size = self._size
+        for key in removed:
+            number = hash(key) & mask
+            if key in shards[number]:
+                if number not in copied:
+                    shards[number] = shards[number].copy()
+                    copied.add(number)
+                del shards[number][key]
+                size -= 1
+        for key, value in added:
+            number = hash(key) & mask
+            if number not in copied:
+                shards[number] = shards[number].copy()
+                copied.add(number)
+            shard = shards[number]
+            if key not in shard:
+                size += 1
+            shard[key] = value
+        new_map = HashMap.__new__(HashMap)
+        if _shard_count(size) > len(shards):
+            new_map._build(((key, value) for shard in shards for key, value in shard.items()), size)
+        else:
+            new_map._shards = shards
+            new_map._mask = mask
+            new_map._size = size
+        return new_map
+
+    def set(self, key, value):
+        """Return a new map with a key set to a value."""
+        return self.apply(added=((key, value),))
+
+    def delete(self, key):
+        """
+        Return a new map without a key.
+
+        Raises:
+            KeyError: If the key is not present
+        """
+        if key not in self:
+            raise KeyError(key)
+        return self.apply(removed=(key,))
+
+    def get(self, key, default=None):
+        return self._shards[hash(key) & self._mask].get(key, default)
+
+    def __getitem__(self, key):
+        return self._shards[hash(key) & self._mask][key]
+
+    def __contains__(self, key):
+        try:
+            return key in self._shards[hash(key) & self._mask]
+        except TypeError:
+            return False
+
+    def __len__(self):
+        return self._size
+
+    def __iter__(self):
+        for shard in self._shards:
+            yield from shard
+
+    def __repr__(self):
+        return f"HashMap({dict(self.items())!r})"
+
+    def items(self):
+        return _HashItemsView(self)
+
+    def values(self):
+        return _HashValuesView(self)
+
+
+class _HashItemsView(ItemsView):
+    """Items view that walks the shards directly instead of looking up each key."""
+
+    def __iter__(self):
+        for shard in self._mapping._shards:
+            yield from shard.items()
+
+
+class _HashValuesView(ValuesView):
+    """Values view that walks the shards directly instead of looking up each key."""
+
+    def __iter__(self):
+        for shard in self._mapping._shards:
+            yield from shard.values()
+
+
+class _ItemsView(ItemsView):
+    """Items view that walks the insertion-order tree instead of looking up each key."""
+
+    def __iter__(self):
+        return iter(self._mapping._by_rank.values())
+
+
+class _ValuesView(ValuesView):
+    """Values view that walks the insertion-order tree instead of looking up each key."""
+
+    def __iter__(self):
+        return (value for _, value in self._mapping._by_rank.values())
+
+
+class PersistentMap(Mapping):
+    """
+    Immutable mapping that iterates in insertion order, like a dictionary.
+
+    Entries are kept twice: in a ``HashMap`` by key, so lookups are O(1), and
+    in a ``SortedMap`` by insertion rank for iteration. ``set`` and ``delete``
+    return a new map in O(sqrt n + log n); replacing the value of an existing
+    key keeps its place.
+    """
+
+    __slots__ = ("_by_key", "_by_rank", "_next_rank")
+
+    def __init__(self, items=()):
+        """
+        Args:
+            items: Mapping or iterable of (key, value) pairs
+        """
+        if isinstance(items, Mapping):
+            items = items.items()
+        pairs = dict(items)
+        self._by_key = HashMap.__new__(HashMap)
+        self._by_key._build(((key, (rank, value)) for rank, (key, value) in enumerate(pairs.items())), len(pairs))
+        self._by_rank = SortedMap.from_sorted(list(range(len(pairs))), list(pairs.items()))
+        self._next_rank = len(pairs)
+
+    @classmethod
+    def _from_trees(cls, by_key, by_rank, next_rank):
+        """Wrap existing trees without copying them."""
+        new_map = cls.__new__(cls)
+        new_map._by_key = by_key
+        new_map._by_rank = by_rank
+        new_map._next_rank = next_rank
+        return new_map
+
+    def set(self, key, value):
+        """
+        Return a new map with a key set to a value.
+
+        Args:
+            key: Key to set; a new key goes after every existing one
+            value: Value to store
+
+        Returns:
+            PersistentMap: Updated map sharing unchanged nodes with this one
+        """
+        entry = self._by_key.get(key)
+        rank = entry[0] if entry is not None else self._next_rank
+        return self._from_trees(self._by_key.apply(added=((key, (rank, value)),)),
+                                self._by_rank.set(rank, (key, value)),
+                                self._next_rank if entry is not None else rank + 1)
+
+    def set_many(self, items):
+        """
+        Return a new map with many keys set, as repeated ``set`` calls would.
+
+        Args:
+            items: Mapping or iterable of (key, value) pairs
+
+        Returns:
+            PersistentMap: Updated map
+        """
+        if isinstance(items, Mapping):
+            items = items.items()
+        by_key = []
+        by_rank = []
+        next_rank = self._next_rank
+        for key, value in dict(items).items():
+            entry = self._by_key.get(key)
+            rank = entry[0] if entry is not None else next_rank
+            if entry is None:
+                next_rank += 1
+            by_key.append((key, (rank, value)))
+            by_rank.append((rank, (key, value)))
+        return self._from_trees(self._by_key.apply(added=by_key), self._by_rank.apply(added=by_rank), next_rank)
+
+    def delete(self, key):
+        """
+        Return a new map without a key.
+
+        Args:
+            key: Key to remove
+
+        Returns:
+            PersistentMap: Updated map sharing unchanged nodes with this one
+
+        Raises:
+            KeyError: If the key is not present
+        """
+        rank, _ = self._by_key[key]
+        return self._from_trees(self._by_key.apply(removed=(key,)), self._by_rank.delete(rank), self._next_rank)
+
+    def rank(self, key):
+        """
+        Return the insertion rank of a key.
+
+        Ranks increase in insertion order and are never reused, so sorting keys
+        by rank puts them in the order the map iterates them.
+
+        Args:
+            key: Key to look up
+
+        Returns:
+            int: Insertion rank
+
+        Raises:
+            KeyError: If the key is not present
+        """
+        return self._by_key[key][0]
+
+    def ranked_items(self):
+        """Yield (rank, key, value) triples in insertion order."""
+        for rank, (key, value) in self._by_rank.items():
+            yield rank, key, value
+
+    def items_from(self, position):
+        """
+        Yield (key, value) pairs in insertion order, skipping the first entries.
+
+        Args:
+            position (int): Number of entries to skip, found in O(log n)
+
+        Returns:
+            generator: (key, value) pairs from that position to the end
+        """
+        return (entry for _, entry in self._by_rank.items_from(position=position))
+
+    def get(self, key, default=None):
+        entry = self._by_key.get(key)
+        return entry[1] if entry is not None else default
+
+    def __getitem__(self, key):
+        return self._by_key[key][1]
+
+    def __contains__(self, key):
+        return key in self._by_key
+
+    def __len__(self):
+        return len(self._by_key)
+
+    def __iter__(self):
+        return (key for key, _ in self._by_rank.values())
+
+    def __repr__(self):
+        return f"PersistentMap({dict(self.items())!r})"
+
+    def items(self):
+        return _ItemsView(self)
+
+    def values(self):
+        return _ValuesView(self)
@@ -0,0 +1,148 @@
+"""
+Product Record
+Compact product records that use __slots__ instead of a per-product dictionary
+and share one copy of every category and feature string.
+"""
+
+import random
+import sys
+import tracemalloc
+from collections.abc import Mapping
+
+# Fields every product has, in display order
+PRODUCT_FIELDS = ("name", "category", "price", "stock", "rating", "features")
+
+
+class Product(Mapping):
+    """
+    Read-only product record with the same keys as a product dictionary.
+
+    It supports ``product["price"]``, ``product.get("new_arrival")`` and
+    ``{**product, "price": new_price}``, so the filter, update and display
+    functions accept it unchanged. Updates return plain dictionaries, as they
+    do for dictionary products.
+    """
+
+    __slots__ = ("name", "category", "price", "stock", "rating", "features", "new_arrival")
+
+    def __init__(self, name, category, price, stock, rating, features, new_arrival=None):
+        self.name = name
+        self.category = sys.intern(category)
+        self.price = price
+        self.stock = stock
+        self.rating = rating
+        self.features = [sys.intern(feature) for feature in features]
+        self.new_arrival = new_arrival
+
+    @classmethod
+    def from_dict(cls, product):
+        """
+        Build a record from a product dictionary.
+
+        Args:
+            product (dict): Product data
+
+        Returns:
+            Product: Compact record with the same data
+        """
+        unknown = set(product) - set(cls.__slots__)
+        if unknown:
+            raise ValueError(f"Unsupported product fields: {', '.join(sorted(unknown))}")
+        return cls(**product)
+
+    def __getitem__(self, key):
+        if key in PRODUCT_FIELDS or (key == "new_arrival" and self.new_arrival is not None):
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def __iter__(self):
+        yield from PRODUCT_FIELDS
+        if self.new_arrival is not None:
+            yield "new_arrival"
+
+    def __len__(self):
+        return len(PRODUCT_FIELDS) + (self.new_arrival is not None)
+
+    def __repr__(self):
+        return f"Product({dict(self)!r})"
+
+
+def to_products(inventory):
+    """
+    Convert an inventory of product dictionaries to compact records.
+
+    Args:
+        inventory (dict): The product inventory
+
+    Returns:
+        dict: Products by product ID as Product records
+    """
+    if inventory is None:
+        raise ValueError("Inventory cannot be None")
+    return {pid: Product.from_dict(product) for pid, product in inventory.items()}
+
+
+def _parsed(text):
+    """Return a separate copy of a string, as a file parser would produce."""
+    return text.encode("utf-8").decode("utf-8")
+
+
+def _traced_size(build):
+    """Return the number of bytes still allocated by build() once it returns."""
+    tracemalloc.start()
+    try:
+        result = build()
+        size, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del result
+    return size
+
+
+def compare_memory(product_count=100000, seed=42):
+    """
+    Measure a synthetic catalog stored as dictionaries and as Product records.
+
+    Category and feature strings are built separately for every product, as
+    they are when a catalog is parsed from a file.
+
+    Args:
+        product_count (int): Number of synthetic products
+        seed (int): Random seed for the synthetic catalog
+
+    Returns:
+        dict: "dict_bytes", "product_bytes" and "saving" (fraction of dict_bytes saved)
+    """
+    categories = ("electronics", "clothing", "groceries", "footwear", "health")
+    features = ("5G", "Water Resistant", "Slim Fit", "Organic", "Lightweight", "Fair Trade", "GPS")
+
+    def catalog():
+        generator = random.Random(seed)
+        return {
+            f"P{i:07d}": {
+                "name": f"Product {i}",
+                "category": _parsed(generator.choice(categories)),
+                "price": round(generator.uniform(100, 100000), 2),
+                "stock": generator.randint(0, 500),
+                "rating": round(generator.uniform(1, 5), 1),
+                "features": [_parsed(feature) for feature in generator.sample(features, 3)]
+            }
+            for i in range(product_count)
+        }
+
+    dict_bytes = _traced_size(catalog)
+    product_bytes = _traced_size(lambda: to_products(catalog()))
+    return {
+        "dict_bytes": dict_bytes,
+        "product_bytes": product_bytes,
+        "saving": 1 - product_bytes / dict_bytes if dict_bytes else 0.0
+    }
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    report = compare_memory(count)
+    print(f"Products:        {count}")
+    print(f"Dict of dicts:   {report['dict_bytes'] / 1e6:.1f} MB")
+    print(f"Product records: {report['product_bytes'] / 1e6:.1f} MB")
+    print(f"Saving:          {report['saving']:.0%}")
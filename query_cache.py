@@ -0,0 +1,151 @@
+"""
+Query Cache
+LRU memoization for the filter and statistics functions, keyed on the version
+stamp of the inventory so that any update makes older results unreachable.
+"""
+
+import functools
+from collections import OrderedDict
+from threading import Lock
+
+import online_store_management_system as store
+
+# Read-only functions whose results depend only on the inventory and their arguments
+CACHEABLE_FUNCTIONS = (
+    "filter_by_category",
+    "filter_by_price_range",
+    "filter_by_availability",
+    "filter_by_feature",
+    "find_products_with_keyword",
+    "query",
+    "calculate_category_counts",
+    "calculate_total_inventory_value",
+    "find_highest_rated_product",
+    "top_k",
+    "create_price_histogram",
+    "create_price_brackets"
+)
+
+
+def _freeze(value):
+    """Convert lists, tuples, sets and dicts in an argument into hashable equivalents."""
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    if isinstance(value, (set, frozenset)):
+        return frozenset(_freeze(item) for item in value)
+    if isinstance(value, dict):
+        return tuple(sorted((key, _freeze(item)) for key, item in value.items()))
+    return value
+
+
+class QueryCache:
+    """
+    Bounded LRU cache of query results.
+
+    Results are keyed on (function, inventory version, arguments). Inventories
+    without a ``version`` stamp, such as plain dictionaries, are passed straight
+    through because their contents can change without notice. Cached results
+    are shared between callers and must be treated as read-only.
+    """
+
+    def __init__(self, max_entries=256):
+        """
+        Args:
+            max_entries (int): Maximum number of results kept before the least recently used is evicted
+        """
+        if max_entries is None or max_entries < 1:
+            raise ValueError("Cache size must be at least 1")
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.bypassed = 0
+
+    def call(self, function, inventory, *args, **kwargs):
+        """
+        Call a function through the cache.
+
+        Args:
+            function (callable): Read-only query function taking the inventory first
+            inventory (dict): The product inventory
+            *args: Positional arguments after the inventory
+            **kwargs: Keyword arguments
+
+        Returns:
+            The function's result, from the cache when possible
+        """
+        version = getattr(inventory, "version", None)
+        try:
+            key = (function, version, _freeze(args), _freeze(kwargs))
+            hash(key)
+        except TypeError:
+            version = None
+        if version is None:
+            with self._lock:
+                self.bypassed += 1
+            return function(inventory, *args, **kwargs)
+
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+
+        result = function(inventory, *args, **kwargs)
+
+        with self._lock:
+            self._entries[key] = result
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return result
+
+    def wrap(self, function):
+        """
+        Return a cached version of a query function.
+
+        Args:
+            function (callable): Read-only query function taking the inventory first
+
+        Returns:
+            callable: Function with the same signature that goes through the cache
+        """
+        @functools.wraps(function)
+        def cached(inventory, *args, **kwargs):
+            return self.call(function, inventory, *args, **kwargs)
+        return cached
+
+    def __getattr__(self, name):
+        # cache.filter_by_category(inventory, ...) is a cached call to the store function
+        if name in CACHEABLE_FUNCTIONS:
+            return self.wrap(getattr(store, name))
+        raise AttributeError(name)
+
+    def clear(self):
+        """Drop every cached result and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = self.bypassed = 0
+
+    def stats(self):
+        """
+        Report cache effectiveness.
+
+        Returns:
+            dict: hits, misses, evictions, bypassed, size, max_entries and hit_rate
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "bypassed": self.bypassed,
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "hit_rate": self.hits / lookups if lookups else 0.0
+            }
@@ -0,0 +1,252 @@
+"""
+Sharded Analytics
+Runs the inventory statistics and keyword search as map/reduce jobs over a
+process pool. Products are partitioned into shards by a hash of their product
+ID, and each shard is sent to the workers once as compact pickled columns.
+"""
+
+import os
+import pickle
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from math import fsum
+from operator import itemgetter, mul
+from zlib import crc32
+
+# Shards per worker process, so that uneven shards still keep every worker busy
+SHARDS_PER_PROCESS = 4
+
+# Price edges used by create_price_brackets
+BRACKET_EDGES = (3000, 10000)
+
+# Separators in a shard's searchable text; product names and features do not contain control characters
+FIELD_SEPARATOR = "\x00"
+RECORD_SEPARATOR = "\x1e"
+
+# Encoded shards, their decoded columns and their price orderings, held by each worker process
+_shards = ()
+_decoded = {}
+_price_orders = {}
+
+
+def _partition(inventory, shard_count):
+    """
+    Split an inventory into encoded shards by a hash of the product ID.
+
+    Args:
+        inventory (dict): The product inventory
+        shard_count (int): Number of shards
+
+    Returns:
+        tuple: (product IDs in inventory order, category names by code, list of encoded shards)
+    """
+    columns = [(array("q"), array("H"), array("d"), array("q"), []) for _ in range(shard_count)]
+    categories = {}
+    ids = []
+    for row, (pid, product) in enumerate(inventory.items()):
+        ids.append(pid)
+        rows, codes, prices, stocks, texts = columns[crc32(str(pid).encode("utf-8")) % shard_count]
+        rows.append(row)
+        codes.append(categories.setdefault(product["category"], len(categories)))
+        prices.append(product["price"])
+        stocks.append(product["stock"])
+        texts.append(FIELD_SEPARATOR.join([product["name"].lower()] +
+                                          [feature.lower() for feature in product["features"]]))
+    shards = [pickle.dumps((rows, codes, prices, stocks, RECORD_SEPARATOR.join(texts)), pickle.HIGHEST_PROTOCOL)
+              for rows, codes, prices, stocks, texts in columns]
+    return ids, list(categories), shards
+
+
+def _load_shards(shards):
+    """Worker initializer: keep the encoded shards for later jobs."""
+    global _shards
+    _shards = shards
+    _decoded.clear()
+    _price_orders.clear()
+
+
+def _shard(number):
+    """Return the decoded (rows, codes, prices, stocks, texts) columns of a shard."""
+    shard = _decoded.get(number)
+    if shard is None:
+        rows, codes, prices, stocks, texts = pickle.loads(_shards[number])
+        shard = _decoded[number] = (rows, codes, prices, stocks, texts.split(RECORD_SEPARATOR) if rows else [])
+    return shard
+
+
+def _price_order(number):
+    """Return a shard's (ascending prices, rows in the same order), sorting on first use."""
+    order = _price_orders.get(number)
+    if order is None:
+        rows, _, prices, _, _ = _shard(number)
+        ordered = sorted(zip(prices, rows))
+        order = _price_orders[number] = ([price for price, _ in ordered], array("q", (row for _, row in ordered)))
+    return order
+
+
+def _count_categories(number):
+    """Map job: {category code: (product count, first row)} for one shard."""
+    rows, codes, _, _, _ = _shard(number)
+    return {code: (count, rows[codes.index(code)]) for code, count in Counter(codes).items()}
+
+
+def _value_partials(number):
+    """
+    Map job: exact total value of one shard as a list of floats.
+
+    Each pass adds the correctly rounded remainder of the exact total, so the
+    floats sum exactly to the shard total and fsum() over every shard's
+    partials rounds the same way as fsum() over every product.
+    """
+    _, _, prices, stocks, _ = _shard(number)
+    values = list(map(mul, prices, stocks))
+    partials = []
+    while True:
+        remainder = fsum(values + [-partial for partial in partials])
+        if remainder == 0:
+            return partials
+        partials.append(remainder)
+
+
+def _bucket_rows(number, edges):
+    """Map job: rows of one shard in each price bucket."""
+    prices, rows = _price_order(number)
+    # A bucket holds prices from one edge up to, but not including, the next. Rows
+    # are returned sorted, so the parent only merges one sorted run per shard
+    bounds = [0] + [bisect_left(prices, edge) for edge in edges] + [len(prices)]
+    return [array("q", sorted(rows[start:stop])) for start, stop in zip(bounds, bounds[1:])]
+
+
+def _keyword_rows(number, keyword):
+    """Map job: rows of one shard whose name or a feature contains a lowercased keyword."""
+    rows, _, _, _, texts = _shard(number)
+    return array("q", (row for row, text in zip(rows, texts)
+                       if keyword in text and any(keyword in field for field in text.split(FIELD_SEPARATOR))))
+
+
+class ShardedAnalytics:
+    """
+    Process-pool statistics over a snapshot of an inventory.
+
+    Results are identical to the serial functions on the same inventory,
+    including key and product ID order. The inventory is partitioned when the
+    object is created; later changes to it are not seen. Close the object, or
+    use it as a context manager, to stop the worker processes.
+    """
+
+    def __init__(self, inventory, shard_count=None, processes=None):
+        """
+        Args:
+            inventory (dict): The product inventory
+            shard_count (int): Number of shards; SHARDS_PER_PROCESS per process by default
+            processes (int): Worker processes; one per CPU by default
+        """
+        if inventory is None:
+            raise ValueError("Inventory cannot be None")
+        processes = processes or os.cpu_count() or 1
+        shard_count = shard_count or processes * SHARDS_PER_PROCESS
+        if processes < 1 or shard_count < 1:
+            raise ValueError("Shard and process counts must be at least 1")
+        self._inventory = inventory
+        self._ids, self._categories, shards = _partition(inventory, shard_count)
+        self.shard_count = shard_count
+        # Shards are pickled once per worker rather than once per job
+        self._pool = ProcessPoolExecutor(max_workers=processes, initializer=_load_shards, initargs=(shards,))
+
+    def close(self):
+        """Shut down the worker processes."""
+        self._pool.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _map(self, job):
+        """Run a job on every shard and return the per-shard results."""
+        return list(self._pool.map(job, range(self.shard_count)))
+
+    def _ids_at(self, row_arrays):
+        """Return the product IDs of the rows in several arrays, in row order."""
+        merged = array("q")
+        for rows in row_arrays:
+            merged.extend(rows)
+        rows = sorted(merged)
+        if not rows:
+            return []
+        if len(rows) == 1:
+            return [self._ids[rows[0]]]
+        return list(itemgetter(*rows)(self._ids))
+
+    def category_counts(self):
+        """
+        Count the products in each category, as calculate_category_counts does.
+
+        Returns:
+            dict: Dictionary with categories as keys and counts as values
+        """
+        totals = {}
+        for shard_counts in self._map(_count_categories):
+            for code, (count, first_row) in shard_counts.items():
+                total, row = totals.get(code, (0, first_row))
+                totals[code] = (total + count, min(row, first_row))
+        # Categories appear in the order the serial scan first meets them
+        ordered = sorted(totals.items(), key=lambda item: item[1][1])
+        return {self._categories[code]: count for code, (count, _) in ordered}
+
+    def total_value(self):
+        """
+        Calculate the total value (price * stock), as calculate_total_inventory_value does.
+
+        Returns:
+            float: Total inventory value
+        """
+        return fsum(partial for partials in self._map(_value_partials) for partial in partials)
+
+    def price_histogram(self, edges):
+        """
+        Group product IDs into price buckets, as create_price_histogram does with summary "ids".
+
+        Args:
+            edges (list): Ascending bucket boundaries
+
+        Returns:
+            list: Product ID lists, len(edges) + 1 in total
+        """
+        if edges is None:
+            raise ValueError("Bucket edges cannot be None")
+        if any(lower >= upper for lower, upper in zip(edges, edges[1:])):
+            raise ValueError("Bucket edges must be in ascending order")
+        shard_buckets = self._map(partial(_bucket_rows, edges=list(edges)))
+        return [self._ids_at(buckets[position] for buckets in shard_buckets)
+                for position in range(len(edges) + 1)]
+
+    def price_brackets(self):
+        """
+        Group products into price brackets, as create_price_brackets does.
+
+        Returns:
+            dict: Dictionary with price brackets as keys and lists of product IDs as values
+        """
+        budget, mid_range, premium = self.price_histogram(BRACKET_EDGES)
+        return {"budget": budget, "mid_range": mid_range, "premium": premium}
+
+    def find_products_with_keyword(self, keyword):
+        """
+        Find products containing a keyword in their name or features, as find_products_with_keyword does.
+
+        Args:
+            keyword (str): Keyword to search for
+
+        Returns:
+            dict: Filtered products dictionary
+        """
+        if keyword is None:
+            raise ValueError("Keyword cannot be None")
+        shard_rows = self._map(partial(_keyword_rows, keyword=keyword.lower()))
+        pids = self._ids_at(shard_rows)
+        return {pid: self._inventory[pid] for pid in pids}
@@ -0,0 +1,362 @@
+"""
+SQLite Inventory
+Inventory kept in a local SQLite file, for catalogs too large to hold in
+memory. Filters and statistics run as indexed SQL queries and only the
+matching products are loaded.
+
+Schema:
+    categories  id, name
+    products    row (insertion order), product_id, name, category_id, price,
+                stock, rating, extras (JSON of any other fields)
+    features    product_row, position, feature
+Indexes cover category, price, stock, rating and feature lookups.
+"""
+
+import json
+import sqlite3
+import sys
+from collections.abc import ItemsView, Mapping, MutableMapping, ValuesView
+from itertools import chain, groupby, islice
+from math import fsum
+
+from inventory_index import next_version
+
+SQLITE_EXTENSIONS = (".sqlite", ".db")
+
+# Product fields stored as product columns; any others go to the extras JSON
+COLUMN_FIELDS = ("name", "category", "price", "stock", "rating", "features")
+
+# Products written per executemany() call by bulk writes
+WRITE_BATCH_SIZE = 10000
+
+# Fields top_k can rank by, mapped to their columns
+RANKING_COLUMNS = {"rating": "p.rating", "price": "p.price", "stock": "p.stock"}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS categories (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS products (
+    row INTEGER PRIMARY KEY,
+    product_id TEXT NOT NULL UNIQUE,
+    name TEXT NOT NULL,
+    category_id INTEGER NOT NULL REFERENCES categories (id),
+    price REAL NOT NULL,
+    stock INTEGER NOT NULL,
+    rating REAL NOT NULL,
+    extras TEXT
+);
+CREATE TABLE IF NOT EXISTS features (
+    product_row INTEGER NOT NULL REFERENCES products (row) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    feature TEXT NOT NULL,
+    PRIMARY KEY (product_row, position)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS products_by_category ON products (category_id);
+CREATE INDEX IF NOT EXISTS products_by_price ON products (price DESC, product_id);
+CREATE INDEX IF NOT EXISTS products_by_stock ON products (stock DESC, product_id);
+CREATE INDEX IF NOT EXISTS products_by_rating ON products (rating DESC, product_id);
+CREATE INDEX IF NOT EXISTS features_by_name ON features (feature);
+"""
+
+# Products with their category name and features, one result row per feature
+_SELECT_PRODUCTS = """
+SELECT p.row, p.product_id, p.name, c.name, p.price, p.stock, p.rating, p.extras, f.feature
+FROM products p
+JOIN categories c ON c.id = p.category_id
+LEFT JOIN features f ON f.product_row = p.row
+"""
+
+_INSERT_CATEGORY = "INSERT OR IGNORE INTO categories (name) VALUES (?)"
+_UPSERT_PRODUCT = """
+INSERT INTO products (product_id, name, category_id, price, stock, rating, extras)
+VALUES (?, ?, (SELECT id FROM categories WHERE name = ?), ?, ?, ?, ?)
+ON CONFLICT (product_id) DO UPDATE SET
+    name = excluded.name, category_id = excluded.category_id, price = excluded.price,
+    stock = excluded.stock, rating = excluded.rating, extras = excluded.extras
+"""
+_DELETE_FEATURES = "DELETE FROM features WHERE product_row = (SELECT row FROM products WHERE product_id = ?)"
+_INSERT_FEATURE = """
+INSERT INTO features (product_row, position, feature)
+VALUES ((SELECT row FROM products WHERE product_id = ?), ?, ?)
+"""
+
+
+def _python_lower(text):
+    """SQL function: lowercase text as str.lower() does; SQLite's lower() only handles ASCII."""
+    return text.lower() if text is not None else None
+
+
+def _extras_json(product):
+    """Return the fields of a product that have no column as JSON, or None if there are none."""
+    extras = {key: value for key, value in product.items() if key not in COLUMN_FIELDS}
+    return json.dumps(extras) if extras else None
+
+
+class _SqliteItemsView(ItemsView):
+    """Items view that loads products with one query instead of one lookup per key."""
+
+    def __iter__(self):
+        return self._mapping._products()
+
+
+class _SqliteValuesView(ValuesView):
+    """Values view that loads products with one query instead of one lookup per key."""
+
+    def __iter__(self):
+        return (product for _, product in self._mapping._products())
+
+
+class SqliteInventory(MutableMapping):
+    """
+    Product inventory stored in a SQLite database file.
+
+    Products keep their insertion order, as in a dictionary, and read back
+    with the same fields they were written with. Unlike the other inventory
+    types, the update functions change a SQLite inventory in place and return
+    it, since copying a catalog that does not fit in memory would defeat the
+    purpose, so callers that keep the previous inventory must not expect it
+    to stay unchanged. Each bulk write is one transaction, so a write that
+    fails changes nothing. ``version`` is stamped on every write through this
+    object, as for IndexedInventory; writes by other connections to the same
+    file are not seen by it. The connection may be used from any thread, as
+    InventoryService's worker threads do; callers serialize writes against
+    reads.
+    """
+
+    def __init__(self, path):
+        """
+        Args:
+            path (str): Database file path, created if missing, or ":memory:"
+        """
+        if path is None:
+            raise ValueError("Database path cannot be None")
+        self.path = path
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode = WAL")
+        self._connection.execute("PRAGMA synchronous = NORMAL")
+        self._connection.execute("PRAGMA foreign_keys = ON")
+        self._connection.create_function("python_lower", 1, _python_lower, deterministic=True)
+        self._connection.executescript(_SCHEMA)
+        self.version = next_version()
+
+    def close(self):
+        """Close the database connection."""
+        self._connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _products(self, where="", params=(), order="p.row"):
+        """
+        Load products matching a WHERE clause over the products table ``p``.
+
+        Yields:
+            tuple: (product_id, product_data) in the given order
+        """
+        cursor = self._connection.execute(f"{_SELECT_PRODUCTS} {where} ORDER BY {order}, f.position", params)
+        for (_, pid, name, category, price, stock, rating, extras), rows in groupby(cursor, key=lambda row: row[:8]):
+            product = {
+                "name": name,
+                "category": category,
+                "price": price,
+                "stock": stock,
+                "rating": rating,
+                "features": [row[8] for row in rows if row[8] is not None]
+            }
+            if extras is not None:
+                product.update(json.loads(extras))
+            yield pid, product
+
+    def _write(self, pairs):
+        """
+        Insert or replace products in one transaction, WRITE_BATCH_SIZE at a time.
+
+        A product the schema rejects, such as one with a None name or price,
+        rolls back the whole write and raises ValueError, as invalid products
+        do for the other inventory types.
+        """
+        pairs = iter(pairs)
+        try:
+            with self._connection:
+                while True:
+                    # Later duplicates of an ID replace earlier ones, as in dict.update()
+                    batch = dict(islice(pairs, WRITE_BATCH_SIZE))
+                    if not batch:
+                        break
+                    self._connection.executemany(_INSERT_CATEGORY,
+                                                 {(product["category"],) for product in batch.values()})
+                    self._connection.executemany(_UPSERT_PRODUCT, [
+                        (pid, product["name"], product["category"], product["price"], product["stock"],
+                         product["rating"], _extras_json(product))
+                        for pid, product in batch.items()])
+                    self._connection.executemany(_DELETE_FEATURES, [(pid,) for pid in batch])
+                    self._connection.executemany(_INSERT_FEATURE, [
+                        (pid, position, feature)
+                        for pid, product in batch.items() for position, feature in enumerate(product["features"])])
+        except sqlite3.IntegrityError as e:
+            raise ValueError(f"Product rejected by the database: {e}")
+        self.version = next_version()
+
+    def __getitem__(self, pid):
+        for _, product in self._products("WHERE p.product_id = ?", (pid,)):
+            return product
+        raise KeyError(pid)
+
+    def __setitem__(self, pid, product):
+        self._write([(pid, product)])
+
+    def __delitem__(self, pid):
+        with self._connection:
+            deleted = self._connection.execute("DELETE FROM products WHERE product_id = ?", (pid,)).rowcount
+        if not deleted:
+            raise KeyError(pid)
+        self.version = next_version()
+
+    def __iter__(self):
+        return (pid for (pid,) in self._connection.execute("SELECT product_id FROM products ORDER BY row"))
+
+    def __len__(self):
+        return self._connection.execute("SELECT COUNT(*) FROM products").fetchone()[0]
+
+    def __contains__(self, pid):
+        return self._connection.execute("SELECT 1 FROM products WHERE product_id = ?", (pid,)).fetchone() is not None
+
+    def __repr__(self):
+        return f"SqliteInventory({self.path!r})"
+
+    def items(self):
+        return _SqliteItemsView(self)
+
+    def values(self):
+        return _SqliteValuesView(self)
+
+    def items_from(self, position):
+        """
+        Yield (product_id, product_data) pairs in inventory order, skipping the first products.
+
+        The skipped rows are counted on the primary key index without being
+        loaded, so a page deep into the store costs one page of products.
+
+        Args:
+            position (int): Number of products to skip
+        """
+        return self._products("WHERE p.row >= (SELECT row FROM products ORDER BY row LIMIT 1 OFFSET ?)",
+                              (position,))
+
+    def update(self, other=(), **kwargs):
+        """
+        Insert or replace many products in a single transaction.
+
+        Args:
+            other: Mapping or iterable of (product_id, product_data) pairs
+        """
+        pairs = other.items() if isinstance(other, Mapping) else other
+        self._write(chain(pairs, kwargs.items()))
+
+    def query(self, category=None, price=None, min_stock=None, features=None, keyword=None):
+        """
+        Return the products matching every given criterion, as query does.
+
+        Criteria are not validated here; query_predicates does that.
+
+        Returns:
+            dict: Matching products in insertion order
+        """
+        conditions = []
+        params = []
+        if category is not None:
+            conditions.append("p.category_id = (SELECT id FROM categories WHERE name = ?)")
+            params.append(category)
+        if price is not None:
+            conditions.append("p.price BETWEEN ? AND ?")
+            params.extend(price)
+        if min_stock is not None:
+            conditions.append("p.stock >= ?")
+            params.append(min_stock)
+        for feature in features or ():
+            conditions.append("p.row IN (SELECT product_row FROM features WHERE feature = ?)")
+            params.append(feature)
+        if keyword is not None:
+            # Substring searches cannot use an index, so they run on the rows the other criteria leave
+            conditions.append("(instr(python_lower(p.name), ?) OR EXISTS (SELECT 1 FROM features k "
+                              "WHERE k.product_row = p.row AND instr(python_lower(k.feature), ?)))")
+            params.extend([keyword.lower()] * 2)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        return dict(self._products(where, params))
+
+    def category_counts(self):
+        """Return the number of products in each category, in order of first appearance."""
+        return dict(self._connection.execute(
+            "SELECT c.name, COUNT(*) FROM products p JOIN categories c ON c.id = p.category_id "
+            "GROUP BY p.category_id ORDER BY MIN(p.row)"))
+
+    def total_value(self):
+        """Return the total value of the inventory (price * stock)."""
+        return fsum(value for (value,) in self._connection.execute("SELECT price * stock FROM products"))
+
+    def highest_rated(self):
+        """Return (product_id, product_data) of the first product with the highest rating."""
+        (best,) = self._connection.execute("SELECT MAX(rating) FROM products").fetchone()
+        return next(self._products("WHERE p.row = (SELECT row FROM products WHERE rating = ? ORDER BY row LIMIT 1)",
+                                   (best,)))
+
+    def top_k(self, k, key="rating", category=None):
+        """
+        Return the k products with the highest rating, price or stock, ties by ascending product ID.
+
+        Returns:
+            list: (product_id, product_data) tuples, highest value first
+        """
+        column = RANKING_COLUMNS[key]
+        condition = "WHERE p.category_id = (SELECT id FROM categories WHERE name = ?)" if category is not None else ""
+        params = ([category] if category is not None else []) + [k]
+        order = f"{column} DESC, p.product_id"
+        return list(self._products(f"WHERE p.row IN (SELECT p.row FROM products p {condition} "
+                                   f"ORDER BY {order} LIMIT ?)", params, order))
+
+    def price_histogram(self, edges, summary):
+        """
+        Group products into price buckets between ascending edges.
+
+        Args:
+            edges (list): Ascending bucket boundaries
+            summary (str): "ids", "counts" or "values"
+
+        Returns:
+            list: One entry per bucket, len(edges) + 1 in total
+        """
+        bounds = [None, *edges, None]
+        buckets = []
+        for lower, upper in zip(bounds, bounds[1:]):
+            conditions = [condition for condition, bound in (("price >= ?", lower), ("price < ?", upper))
+                          if bound is not None]
+            params = [bound for bound in (lower, upper) if bound is not None]
+            where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+            if summary == "counts":
+                buckets.append(self._connection.execute(f"SELECT COUNT(*) FROM products {where}", params).fetchone()[0])
+            elif summary == "values":
+                # Added in insertion order, matching the dictionary version exactly
+                buckets.append(sum(value for (value,) in self._connection.execute(
+                    f"SELECT price * stock FROM products {where} ORDER BY row", params)))
+            else:
+                buckets.append([pid for (pid,) in self._connection.execute(
+                    f"SELECT product_id FROM products {where} ORDER BY row", params)])
+        return buckets
+
+
+if __name__ == "__main__":
+    # Load a CSV or JSONL catalog into a database: sqlite_inventory.py CATALOG DATABASE
+    from catalog_loader import stream_catalog
+
+    if len(sys.argv) != 3:
+        print("Usage: python sqlite_inventory.py CATALOG DATABASE")
+        sys.exit(1)
+    stats = {}
+    with SqliteInventory(sys.argv[2]) as database:
+        database.update(pair for batch in stream_catalog(sys.argv[1], stats=stats) for pair in batch.items())
+    print(f"Wrote {stats['rows']} products to {sys.argv[2]}.")
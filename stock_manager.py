@@ -0,0 +1,279 @@
+"""
+Stock Manager
+Thread-safe stock levels for order workers that share one inventory.
+
+Each product has a version counter that increases on every stock change, so
+callers can read, decide and then compare-and-set. Products are spread over a
+fixed set of striped locks, so workers on different products rarely wait for
+each other and a hot product only blocks the products that share its stripe.
+"""
+
+import sys
+import threading
+import time
+from random import Random
+
+# Number of locks products are spread over by default
+DEFAULT_STRIPES = 64
+
+
+class StockManager:
+    """
+    Concurrent stock levels over an inventory.
+
+    The inventory itself is not changed; stock levels are tracked here from
+    the first change to each product, and ``to_inventory()`` returns an
+    updated copy, or for a SQLite inventory writes them back in place, as the
+    update functions do. Stock never goes below zero.
+    """
+
+    def __init__(self, inventory, stripes=DEFAULT_STRIPES):
+        """
+        Args:
+            inventory (dict): The product inventory
+            stripes (int): Number of locks to spread products over
+        """
+        if inventory is None:
+            raise ValueError("Inventory cannot be None")
+        if stripes is None or stripes < 1:
+            raise ValueError("Stripe count must be at least 1")
+        self._inventory = inventory
+        self._locks = [threading.Lock() for _ in range(stripes)]
+        self._stock = {}
+        self._versions = {}
+
+    def _lock_for(self, product_id):
+        """Return the stripe lock that guards a product."""
+        return self._locks[hash(product_id) % len(self._locks)]
+
+    def _current(self, product_id):
+        """Return (stock, version) of a product; the caller holds its stripe lock."""
+        if product_id in self._stock:
+            return self._stock[product_id], self._versions[product_id]
+        if product_id not in self._inventory:
+            raise ValueError(f"Product ID {product_id} not found")
+        return self._inventory[product_id]["stock"], 0
+
+    def _set(self, product_id, stock, version):
+        """Record a new stock level; the caller holds the product's stripe lock."""
+        self._stock[product_id] = stock
+        self._versions[product_id] = version + 1
+
+    def get(self, product_id):
+        """
+        Read a product's stock level and version.
+
+        Args:
+            product_id (str): Product ID
+
+        Returns:
+            tuple: (stock, version)
+        """
+        with self._lock_for(product_id):
+            return self._current(product_id)
+
+    def adjust(self, product_id, quantity_change):
+        """
+        Change a product's stock level, as update_stock_level does.
+
+        Args:
+            product_id (str): Product ID
+            quantity_change (int): Amount to add (positive) or remove (negative)
+
+        Returns:
+            tuple: (new stock, new version)
+        """
+        if quantity_change is None:
+            raise ValueError("Quantity change cannot be None")
+        with self._lock_for(product_id):
+            stock, version = self._current(product_id)
+            if stock + quantity_change < 0:
+                raise ValueError("Stock cannot be negative")
+            self._set(product_id, stock + quantity_change, version)
+            return stock + quantity_change, version + 1
+
+    def reserve(self, product_id, quantity):
+        """
+        Take stock for an order.
+
+        Args:
+            product_id (str): Product ID
+            quantity (int): Units to take, at least 1
+
+        Returns:
+            tuple: (remaining stock, new version)
+        """
+        if quantity is None or quantity < 1:
+            raise ValueError("Quantity must be at least 1")
+        return self.adjust(product_id, -quantity)
+
+    def release(self, product_id, quantity):
+        """
+        Return reserved stock, for example when an order is cancelled.
+
+        Args:
+            product_id (str): Product ID
+            quantity (int): Units to return, at least 1
+
+        Returns:
+            tuple: (new stock, new version)
+        """
+        if quantity is None or quantity < 1:
+            raise ValueError("Quantity must be at least 1")
+        return self.adjust(product_id, quantity)
+
+    def compare_and_set(self, product_id, expected_version, new_stock):
+        """
+        Set a stock level only if the product has not changed since it was read.
+
+        Args:
+            product_id (str): Product ID
+            expected_version (int): Version returned by get()
+            new_stock (int): Stock level to set
+
+        Returns:
+            bool: True if the stock was set, False if another change came first
+        """
+        if new_stock is None or new_stock < 0:
+            raise ValueError("Stock cannot be None or negative")
+        with self._lock_for(product_id):
+            _, version = self._current(product_id)
+            if version != expected_version:
+                return False
+            self._set(product_id, new_stock, version)
+            return True
+
+    def reserve_many(self, quantities):
+        """
+        Take stock for several products at once, or none if any is short.
+
+        Stripe locks are taken in a fixed order, so concurrent multi-product
+        orders cannot deadlock.
+
+        Args:
+            quantities (dict): Units to take by product ID
+
+        Returns:
+            dict: Remaining stock by product ID
+        """
+        if quantities is None:
+            raise ValueError("Quantities cannot be None")
+        if any(quantity is None or quantity < 1 for quantity in quantities.values()):
+            raise ValueError("Quantity must be at least 1")
+        positions = sorted({hash(pid) % len(self._locks) for pid in quantities})
+        for position in positions:
+            self._locks[position].acquire()
+        try:
+            current = {pid: self._current(pid) for pid in quantities}
+            for pid, quantity in quantities.items():
+                if current[pid][0] < quantity:
+                    raise ValueError(f"Insufficient stock for {pid}: {current[pid][0]} available")
+            for pid, quantity in quantities.items():
+                self._set(pid, current[pid][0] - quantity, current[pid][1])
+            return {pid: current[pid][0] - quantity for pid, quantity in quantities.items()}
+        finally:
+            for position in reversed(positions):
+                self._locks[position].release()
+
+    def to_inventory(self):
+        """
+        Return a consistent copy of the inventory with the current stock levels.
+
+        Inventories without ``copy()``, such as SqliteInventory, are written
+        in place and returned, as the update functions treat them.
+
+        Returns:
+            dict: Updated inventory, of the same type as the original
+        """
+        for lock in self._locks:
+            lock.acquire()
+        try:
+            stock = dict(self._stock)
+        finally:
+            for lock in reversed(self._locks):
+                lock.release()
+        copy = getattr(self._inventory, "copy", None)
+        updated_inventory = copy() if copy is not None else self._inventory
+        updated_inventory.update({pid: {**self._inventory[pid], "stock": level} for pid, level in stock.items()})
+        return updated_inventory
+
+
+def stress_test(threads=32, orders_per_thread=2000, products=8, stock=5000, seed=42):
+    """
+    Hammer a StockManager with concurrent orders and check that no stock is lost or oversold.
+
+    Workers mix single reservations, optimistic read/compare-and-set orders,
+    multi-product orders and cancellations, mostly on one hot product.
+
+    Args:
+        threads (int): Number of worker threads
+        orders_per_thread (int): Orders each worker attempts
+        products (int): Number of products
+        stock (int): Starting stock of each product
+        seed (int): Random seed for the order mix
+
+    Returns:
+        dict: "orders", "rejected", "seconds" and "consistent", which is True when
+            every product's stock equals its starting stock minus its net reservations
+    """
+    inventory = {f"H{number:03d}": {"name": f"Item {number}", "category": "electronics", "price": 100.0,
+                                    "stock": stock, "rating": 4.0, "features": []}
+                 for number in range(products)}
+    manager = StockManager(inventory)
+    product_ids = list(inventory)
+    hot_product = product_ids[0]
+    net_taken = [{pid: 0 for pid in product_ids} for _ in range(threads)]
+    rejected = [0] * threads
+
+    def worker(number):
+        generator = Random(seed + number)
+        taken = net_taken[number]
+        for _ in range(orders_per_thread):
+            pid = hot_product if generator.random() < 0.7 else generator.choice(product_ids)
+            quantity = generator.randint(1, 3)
+            kind = generator.random()
+            try:
+                if kind < 0.5:
+                    manager.reserve(pid, quantity)
+                    taken[pid] += quantity
+                elif kind < 0.75:
+                    while True:
+                        level, version = manager.get(pid)
+                        if level < quantity:
+                            raise ValueError("Stock cannot be negative")
+                        if manager.compare_and_set(pid, version, level - quantity):
+                            break
+                    taken[pid] += quantity
+                elif kind < 0.9:
+                    other = generator.choice(product_ids)
+                    order = {pid: quantity} if other == pid else {pid: quantity, other: 1}
+                    manager.reserve_many(order)
+                    for ordered_pid, ordered_quantity in order.items():
+                        taken[ordered_pid] += ordered_quantity
+                elif taken[pid] >= quantity:
+                    manager.release(pid, quantity)
+                    taken[pid] -= quantity
+            except ValueError:
+                rejected[number] += 1
+
+    start = time.perf_counter()
+    workers = [threading.Thread(target=worker, args=(number,)) for number in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    seconds = time.perf_counter() - start
+
+    final = manager.to_inventory()
+    consistent = all(final[pid]["stock"] == stock - sum(taken[pid] for taken in net_taken) and
+                     final[pid]["stock"] >= 0 for pid in product_ids)
+    return {"orders": threads * orders_per_thread, "rejected": sum(rejected),
+            "seconds": seconds, "consistent": consistent}
+
+
+if __name__ == "__main__":
+    thread_count = int(sys.argv[1]) if len(sys.argv) > 1 else 32
+    result = stress_test(threads=thread_count)
+    print(f"Threads:     {thread_count}")
+    print(f"Orders:      {result['orders']} ({result['rejected']} rejected) in {result['seconds']:.2f}s")
+    print(f"Consistent:  {result['consistent']}")
@@ -118,5 +118,38 @@ def test_edge_case_filtering(test_obj):
         test_obj.yakshaAssert("TestEdgeCaseFiltering", False, "boundary")
         pytest.fail(f"Edge case filtering test failed: {str(e)}")
 
+def test_price_histogram_edges(test_obj):
+    """Test custom price buckets at their exact edges"""
+    try:
+        test_inventory = {
+            "T001": {"price": 0, "stock": 1, "name": "Free Product"},
+            "T002": {"price": 100, "stock": 2, "name": "Edge Product"},
+            "T003": {"price": 199.99, "stock": 3, "name": "Below Edge"},
+            "T004": {"price": 200, "stock": 4, "name": "Top Edge"}
+        }
+        
+        buckets = create_price_histogram(test_inventory, [100, 200])
+        assert buckets == [["T001"], ["T002", "T003"], ["T004"]], "Edge prices belong to the upper bucket"
+        
+        counts = create_price_histogram(test_inventory, [100, 200], "counts")
+        assert counts == [1, 2, 1], "Counts should match bucket sizes"
+        
+        values = create_price_histogram(test_inventory, [100, 200], "values")
+        assert abs(values[1] - (200 + 599.97)) < 0.01, "Values should sum price * stock per bucket"
+        
+        # No edges gives a single bucket and empty inventories give empty buckets
+        assert create_price_histogram(test_inventory, [], "counts") == [4]
+        assert create_price_histogram({}, [100, 200], "counts") == [0, 0, 0]
+        
+        with pytest.raises(ValueError):
+            create_price_histogram(test_inventory, [200, 100])
+        with pytest.raises(ValueError):
+            create_price_histogram(test_inventory, [100, 100])
+        
+        test_obj.yakshaAssert("TestPriceHistogramEdges", True, "boundary")
+    except Exception as e:
+        test_obj.yakshaAssert("TestPriceHistogramEdges", False, "boundary")
+        pytest.fail(f"Price histogram edges test failed: {str(e)}")
+
 if __name__ == '__main__':
     pytest.main(['-v'])
\ No newline at end of file
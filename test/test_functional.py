@@ -2,6 +2,12 @@ import pytest
 import inspect
 import importlib
 import re
+import asyncio
+import io
+import json
+import os
+import random
+import stat
 from test.TestUtils import TestUtils
 from online_store_management_system import (
     initialize_data,
@@ -10,6 +16,7 @@ from online_store_management_system import (
     filter_by_availability,
     filter_by_feature,
     find_products_with_keyword,
+    query,
     update_product_price,
     update_stock_level,
     add_product_feature,
@@ -17,8 +24,32 @@ from online_store_management_system import (
     calculate_category_counts,
     calculate_total_inventory_value,
     find_highest_rated_product,
-    create_price_brackets
+    create_price_brackets,
+    apply_updates,
+    top_k,
+    display_data,
+    render_page,
+    page_count,
+    bulk_merge,
+    run_batch
 )
+from inventory_index import IndexedInventory
+from columnar_inventory import ColumnarInventory
+from persistent_map import PersistentMap
+from product_record import Product, to_products
+from inventory_snapshot import open_snapshot, write_snapshot
+from catalog_loader import load_catalog, stream_catalog, validate_product
+from inventory_views import filter_view
+from query_cache import QueryCache
+from instrumentation import Profiler
+from sharded_analytics import ShardedAnalytics
+from inventory_server import InventoryService, start_server
+from inventory_load_test import run_load_test
+from stock_manager import StockManager, stress_test
+from inventory_journal import JournaledInventory
+from sqlite_inventory import SqliteInventory
+from benchmark_suite import generate_catalog, indexed_speedups, run_benchmarks, verify_backends
+import online_store_management_system as store
 
 @pytest.fixture
 def test_obj():
@@ -143,5 +174,1126 @@ def test_implementation_techniques(test_obj):
         test_obj.yakshaAssert("test_implementation_techniques", False, "functional")
         pytest.fail(f"Implementation techniques test failed: {str(e)}")
 
+def test_batch_updates(test_obj):
+    """Test applying a batch of changes with a single copy"""
+    try:
+        inventory, _ = initialize_data()
+        changes = [
+            ("stock", "P002", -10),
+            ("stock", "P002", -5),
+            ("price", "P001", 54999.99),
+            ("feature", "P003", "Foldable")
+        ]
+        
+        updated, failures = apply_updates(inventory, changes)
+        assert failures == []
+        assert updated["P002"]["stock"] == 25 and inventory["P002"]["stock"] == 40
+        assert updated["P001"]["price"] == 54999.99
+        assert "Foldable" in updated["P003"]["features"]
+        assert "Foldable" not in inventory["P003"]["features"]
+        
+        # An invalid change rejects the whole batch by default
+        invalid_changes = changes + [("stock", "P002", -30), ("price", "INVALID", 100)]
+        try:
+            apply_updates(inventory, invalid_changes)
+            assert False, "Atomic batch with invalid changes should be rejected"
+        except ValueError as e:
+            assert "2 invalid changes" in str(e)
+        
+        # Non-atomic batches skip and report invalid changes
+        updated, failures = apply_updates(inventory, invalid_changes, atomic=False)
+        assert [position for position, _, _ in failures] == [4, 5]
+        assert failures[0][2] == "Stock cannot be negative"
+        assert updated["P002"]["stock"] == 25
+        
+        test_obj.yakshaAssert("test_batch_updates", True, "functional")
+    except Exception as e:
+        test_obj.yakshaAssert("test_batch_updates", False, "functional")
+        pytest.fail(f"Batch updates test failed: {str(e)}")
+
+def test_top_k_rankings(test_obj):
+    """Test top-k rankings on plain and indexed inventories"""
+    try:
+        inventory, new_products = initialize_data()
+        inventory = merge_inventories(inventory, new_products)
+        indexed = IndexedInventory(inventory)
+        
+        for data in (inventory, indexed):
+            assert [pid for pid, _ in top_k(data, 3)] == ["P004", "P003", "P005"]
+            assert [pid for pid, _ in top_k(data, 2, key="price", category="electronics")] == ["P001", "N001"]
+            assert [pid for pid, _ in top_k(data, 10, key="stock", category="health")] == ["N002"]
+            assert top_k(data, 0) == []
+        
+        # Rankings follow updates, with ties broken by product ID
+        indexed = update_product_price(indexed, "P003", 59999.99)
+        assert [pid for pid, _ in top_k(indexed, 2, key="price")] == ["P001", "P003"]
+        
+        try:
+            top_k(inventory, 3, key="name")
+            assert False, "Ranking by a non-numeric key should be rejected"
+        except ValueError:
+            pass
+        
+        test_obj.yakshaAssert("test_top_k_rankings", True, "functional")
+    except Exception as e:
+        test_obj.yakshaAssert("test_top_k_rankings", False, "functional")
+        pytest.fail(f"Top-k rankings test failed: {str(e)}")
+
+def test_catalog_loading(test_obj, tmp_path):
+    """Test streaming and validating CSV and JSONL catalogs"""
+    try:
+        csv_path = tmp_path / "catalog.csv"
+        csv_path.write_text(
+            "id,name,category,price,stock,rating,features\n"
+            "C001,Gaming Laptop,electronics,89999.99,5,4.6,16GB RAM|RTX Graphics\n"
+            "C002,Wool Scarf,clothing,1299.50,12,4.1,Handmade\n"
+            "C003,Toy Robot,toys,499.00,3,4.0,Battery Powered\n"
+            "C004,Green Tea,groceries,349.00,80,5.5,Organic\n",
+            encoding="utf-8"
+        )
+        
+        errors = []
+        inventory, stats = load_catalog(str(csv_path), errors=errors)
+        assert list(inventory) == ["C001", "C002"]
+        assert inventory["C001"]["features"] == ["16GB RAM", "RTX Graphics"]
+        assert inventory["C002"]["price"] == 1299.50 and inventory["C002"]["stock"] == 12
+        assert [line for line, _ in errors] == [4, 5]
+        assert stats["rows"] == 2 and stats["rejected"] == 2
+        
+        # Invalid records raise unless errors are being collected
+        try:
+            load_catalog(str(csv_path))
+            assert False, "Invalid category should be rejected"
+        except ValueError as e:
+            assert "Line 4" in str(e)
+        
+        jsonl_path = tmp_path / "catalog.jsonl"
+        existing, _ = initialize_data()
+        jsonl_path.write_text(
+            "\n".join(
+                '{"id": "J%03d", "name": "Item %d", "category": "health", '
+                '"price": 10, "stock": 1, "rating": 4.0, "features": ["Vegan"]}' % (i, i)
+                for i in range(5)
+            ),
+            encoding="utf-8"
+        )
+        batches = list(stream_catalog(str(jsonl_path), batch_size=2))
+        assert [len(batch) for batch in batches] == [2, 2, 1]
+        merged = merge_inventories(existing, batches[0])
+        assert "J000" in merged and merged["J000"]["new_arrival"] == True
+        
+        test_obj.yakshaAssert("test_catalog_loading", True, "functional")
+    except Exception as e:
+        test_obj.yakshaAssert("test_catalog_loading", False, "functional")
+        pytest.fail(f"Catalog loading test failed: {str(e)}")
+
+def test_lazy_filter_views(test_obj):
+    """Test chaining, counting and paging lazy filter views"""
+    try:
+        inventory, new_products = initialize_data()
+        inventory = merge_inventories(inventory, new_products)
+        
+        for data in (inventory, IndexedInventory(inventory)):
+            electronics = filter_view(data, category="electronics")
+            assert len(electronics) == 3 and "P001" in electronics and "P002" not in electronics
+            
+            # Refining a view leaves the original view unchanged
+            affordable = electronics.where(price=(0, 20000))
+            assert set(affordable) == {"P003", "N001"} and len(electronics) == 3
+            assert dict(affordable.items()) == filter_by_price_range(filter_by_category(data, "electronics"), 0, 20000)
+            
+            assert affordable.count(limit=1) == 1 and bool(affordable)
+            assert not filter_view(data, keyword="nonexistent")
+            
+            pages = [affordable.page(1, 1), affordable.page(2, 1), affordable.page(3, 1)]
+            assert [len(page) for page in pages] == [1, 1, 0]
+        
+        test_obj.yakshaAssert("test_lazy_filter_views", True, "functional")
+    except Exception as e:
+        test_obj.yakshaAssert("test_lazy_filter_views", False, "functional")
+        pytest.fail(f"Lazy filter views test failed: {str(e)}")
+
+def test_query_cache(test_obj):
+    """Test cached queries are invalidated by updates and bounded by LRU eviction"""
+    try:
+        inventory, _ = initialize_data()
+        indexed = IndexedInventory(inventory)
+        cache = QueryCache(max_entries=2)
+        
+        first = cache.filter_by_category(indexed, "electronics")
+        second = cache.filter_by_category(indexed, "electronics")
+        assert first is second and set(first) == {"P001", "P003"}
+        assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+        
+        # An update stamps a new version, so the old result is not reused
+        updated = update_product_price(indexed, "P002", 9999.99)
+        assert updated.version != indexed.version
+        assert "P002" in cache.filter_by_price_range(updated, 9000, 10000)
+        assert "P002" not in cache.filter_by_price_range(indexed, 9000, 10000)
+        assert cache.stats()["misses"] == 3 and cache.stats()["evictions"] == 1
+        
+        # Plain dictionaries are not versioned and bypass the cache
+        assert cache.calculate_category_counts(inventory)["electronics"] == 2
+        assert cache.stats()["bypassed"] == 1
+        
+        test_obj.yakshaAssert("test_query_cache", True, "functional")
+    except Exception as e:
+        test_obj.yakshaAssert("test_query_cache", False, "functional")
+        pytest.fail(f"Query cache test failed: {str(e)}")
+
+def test_profiling_hooks(test_obj):
+    """Test profiling records calls and latency percentiles and restores the original functions"""
+    try:
+        inventory, _ = initialize_data()
+        profiler = Profiler()
+        original = store.filter_by_category
+        
+        profiler.enable(store)
+        assert store.filter_by_category is not original
+        for _ in range(20):
+            store.filter_by_category(inventory, "electronics")
+        with pytest.raises(ValueError):
+            store.update_product_price(inventory, "P999", 10)
+        profiler.disable()
+        assert store.filter_by_category is original
+        
+        # Calls after disabling are not recorded
+        store.filter_by_category(inventory, "electronics")
+        stats = profiler.stats()
+        assert stats["filter_by_category"]["calls"] == 20
+        assert stats["filter_by_category"]["max_input_size"] == 5
+        assert 0 < stats["filter_by_category"]["p50_seconds"] <= stats["filter_by_category"]["p99_seconds"]
+        assert stats["filter_by_category"]["p99_seconds"] <= stats["filter_by_category"]["max_seconds"]
+        assert stats["update_product_price"]["errors"] == 1
+        assert "filter_by_category" in profiler.report()
+        
+        test_obj.yakshaAssert("test_profiling_hooks", True, "functional")
+    except Exception as e:
+        test_obj.yakshaAssert("test_profiling_hooks", False, "functional")
+        pytest.fail(f"Profiling hooks test failed: {str(e)}")
+
+def test_paginated_display(test_obj, capsys):
+    """Test display_data shows one page at a time and returns the next page cursor"""
+    try:
+        inventory, _ = initialize_data()
+        
+        assert display_data(inventory, "inventory", page=2, page_size=2) == 3
+        output = capsys.readouterr().out
+        assert "P003" in output and "P004" in output and "P001" not in output
+        assert "Page 2 of 3" in output
+        
+        # The last page has no next page
+        assert display_data(inventory, "inventory", page=3, page_size=2) is None
+        assert "P005" in capsys.readouterr().out
+        with pytest.raises(ValueError):
+            render_page(inventory, 4, 2)
+        
+        # Without a page every product is shown; repeated pages reuse formatted lines
+        display_data(inventory, "inventory")
+        output = capsys.readouterr().out
+        assert all(pid in output for pid in inventory)
+        assert render_page(inventory, 1, 5) == render_page(inventory, 1, 5)
+        updated = update_stock_level(inventory, "P001", 5)
+        assert "Stock: 30" in render_page(updated, 1, 1)
+        
+        # Plain dictionaries are never cached, so an in-place edit shows up at once
+        updated["P001"]["stock"] = 7
+        assert "Stock: 7" in render_page(updated, 1, 1)
+        
+        # Versioned inventories cache lines by version, without holding products
+        indexed = IndexedInventory(updated)
+        render_page(indexed, 1, 5)
+        assert (indexed.version, "P001") in store._formatted_lines
+        assert all(isinstance(line, str) for line in store._formatted_lines.values())
+        assert "Stock: 9" in render_page(update_stock_level(indexed, "P001", 2), 1, 1)
+        
+        test_obj.yakshaAssert("test_paginated_display", True, "functional")
+    except Exception as e:
+        test_obj.yakshaAssert("test_paginated_display", False, "functional")
+        pytest.fail(f"Paginated display test failed: {str(e)}")
+
+def test_bulk_merge_policies(test_obj):
+    """Test bulk_merge resolves conflicts by policy and summarizes the changes"""
+    try:
+        inventory, new_products = initialize_data()
+        incoming = {"P001": {**inventory["P001"], "stock": 5}, **new_products}
+        
+        merged, summary = bulk_merge(inventory, incoming, "overwrite")
+        assert merged["P001"]["stock"] == 5 and merged["P001"]["new_arrival"]
+        assert summary == {"inserted": list(new_products), "updated": ["P001"], "skipped": []}
+        
+        merged, summary = bulk_merge(inventory, incoming, "keep_existing")
+        assert merged["P001"] is inventory["P001"] and summary["skipped"] == ["P001"]
+        
+        merged, _ = bulk_merge(inventory, incoming, "sum_stock")
+        assert merged["P001"]["stock"] == 30
+        
+        # "newer" compares timestamps and streams pairs from a generator
+        stamped = {**inventory, "P002": {**inventory["P002"], "updated_at": "2024-01-01"}}
+        pairs = ((pid, {**product, "price": 1.0, "updated_at": "2024-06-01"}) for pid, product in
+                 [("P001", inventory["P001"]), ("P002", inventory["P002"])])
+        merged, summary = bulk_merge(stamped, pairs, "newer")
+        assert merged["P002"]["price"] == 1.0 and merged["P001"]["price"] == 59999.99
+        assert summary == {"inserted": [], "updated": ["P002"], "skipped": ["P001"]}
+        
+        # Indexed inventories apply the merge as one bulk update
+        indexed_merge, _ = bulk_merge(IndexedInventory(inventory), incoming, "overwrite")
+        assert dict(indexed_merge.items()) == bulk_merge(inventory, incoming, "overwrite")[0]
+        assert set(filter_by_category(indexed_merge, "health")) == {"N002"}
+        
+        # A mapping takes the bulk overwrite path, which must match streaming the same pairs
+        merged, summary = bulk_merge(inventory, iter(incoming.items()), "overwrite")
+        assert (merged, summary) == bulk_merge(inventory, incoming, "overwrite")
+        with SqliteInventory(":memory:") as database:
+            database.update(inventory)
+            assert bulk_merge(database, incoming, "overwrite")[1] == summary
+        with pytest.raises(ValueError):
+            bulk_merge(inventory, {"N009": None}, "overwrite")
+        
+        test_obj.yakshaAssert("test_bulk_merge_policies", True, "functional")
+    except Exception as e:
+        test_obj.yakshaAssert("test_bulk_merge_policies", False, "functional")
+        pytest.fail(f"Bulk merge test failed: {str(e)}")
+
+def test_sharded_analytics(test_obj):
+    """Test process-pool analytics return exactly what the serial functions return"""
+    try:
+        inventory, new_products = initialize_data()
+        inventory = merge_inventories(inventory, new_products)
+        
+        with ShardedAnalytics(inventory, shard_count=3, processes=2) as sharded:
+            counts = sharded.category_counts()
+            assert counts == calculate_category_counts(inventory)
+            assert list(counts) == list(calculate_category_counts(inventory))
+            assert sharded.total_value() == calculate_total_inventory_value(inventory)
+            assert sharded.price_brackets() == create_price_brackets(inventory)
+            for keyword in ("smart", "PROTEIN", "", "missing"):
+                expected = find_products_with_keyword(inventory, keyword)
+                assert list(sharded.find_products_with_keyword(keyword).items()) == list(expected.items())
+        
+        test_obj.yakshaAssert("test_sharded_analytics", True, "functional")
+    except Exception as e:
+        test_obj.yakshaAssert("test_sharded_analytics", False, "functional")
+        pytest.fail(f"Sharded analytics test failed: {str(e)}")
+
+def test_inventory_server(test_obj):
+    """Test the HTTP service answers queries and updates and survives a short load test"""
+    try:
+        inventory, _ = initialize_data()
+        
+        async def request(port, method, path, body=None):
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            data = json.dumps(body).encode() if body is not None else b""
+            writer.write(f"{method} {path} HTTP/1.1\r\nContent-Length: {len(data)}\r\n"
+                         f"Connection: close\r\n\r\n".encode() + data)
+            response = await reader.read()
+            writer.close()
+            head, _, payload = response.partition(b"\r\n\r\n")
+            return int(head.split()[1]), json.loads(payload)
+        
+        async def scenario():
+            service = InventoryService(IndexedInventory(inventory))
+            server = await start_server(service, port=0)
+            port = server.sockets[0].getsockname()[1]
+            try:
+                status, body = await request(port, "GET", "/products?category=electronics")
+                assert status == 200 and set(body["products"]) == {"P001", "P003"}
+                status, body = await request(port, "POST", "/products/P001/stock", {"change": -5})
+                assert status == 200 and body["P001"]["stock"] == 20
+                status, body = await request(port, "POST", "/products/P001/stock", {"change": -50})
+                assert status == 400 and "negative" in body["error"]
+                status, body = await request(port, "GET", "/products/P001")
+                assert body["P001"]["stock"] == 20
+                # Request bodies are validated with the catalog rules before any write
+                for path, payload in (("/products/P001/price", {"price": True}),
+                                      ("/products/P001/price", {"price": "10"}),
+                                      ("/products", {"products": {"X001": {"name": "Partial"}}}),
+                                      ("/products", {"products": {"X002": {**inventory["P002"], "price": True}}}),
+                                      ("/products", {"products": ["X003"]})):
+                    status, body = await request(port, "POST", path, payload)
+                    assert status == 400 and "error" in body
+                status, body = await request(port, "POST", "/products",
+                                             {"products": {"X004": {**inventory["P002"], "stock": "7"}}})
+                assert status == 200 and body["inserted"] == ["X004"]
+                assert service.inventory["X004"]["stock"] == 7 and "X001" not in service.inventory
+                status, _ = await request(port, "GET", "/missing")
+                assert status == 404
+                report = await run_load_test(port=port, concurrency=4, duration=0.3)
+                assert report["requests"] > 0 and not report["failures"]
+                assert report["p50_ms"] <= report["p99_ms"]
+            finally:
+                server.close()
+                await server.wait_closed()
+                service.close()
+        
+        asyncio.run(scenario())
+        
+        test_obj.yakshaAssert("test_inventory_server", True, "functional")
+    except Exception as e:
+        test_obj.yakshaAssert("test_inventory_server", False, "functional")
+        pytest.fail(f"Inventory server test failed: {str(e)}")
+
+def test_concurrent_stock_manager(test_obj):
+    """Test versioned compare-and-set stock changes and that parallel orders never oversell"""
+    try:
+        inventory, _ = initialize_data()
+        manager = StockManager(inventory, stripes=4)
+        
+        assert manager.get("P001") == (25, 0)
+        assert manager.reserve("P001", 5) == (20, 1)
+        with pytest.raises(ValueError):
+            manager.reserve("P001", 21)
+        
+        # A compare-and-set with a stale version is refused
+        stock, version = manager.get("P001")
+        assert manager.compare_and_set("P001", version, stock - 1)
+        assert not manager.compare_and_set("P001", version, 0)
+        
+        # Multi-product orders are all or nothing
+        with pytest.raises(ValueError):
+            manager.reserve_many({"P002": 1, "P003": 100})
+        assert manager.get("P002") == (40, 0)
+        
+        updated = manager.to_inventory()
+        assert updated["P001"]["stock"] == 19 and inventory["P001"]["stock"] == 25
+        
+        result = stress_test(threads=16, orders_per_thread=300, products=4, stock=500)
+        assert result["consistent"] and result["rejected"] > 0
+        
+        test_obj.yakshaAssert("test_concurrent_stock_manager", True, "functional")
+    except Exception as e:
+        test_obj.yakshaAssert("test_concurrent_stock_manager", False, "functional")
+        pytest.fail(f"Concurrent stock manager test failed: {str(e)}")
+
+def test_inventory_journal(test_obj, tmp_path, monkeypatch):
+    """Test that journaled updates survive a restart, a torn final record, compaction and a failed fsync"""
+    try:
+        inventory, new_products = initialize_data()
+        journaled = JournaledInventory(str(tmp_path), inventory, compact_every=None)
+        journaled.update_product_price("P001", 999.5)
+        journaled.update_stock_level("P002", -3)
+        journaled.add_product_feature("P003", "Gift Wrap")
+        journaled.merge_inventories(new_products)
+        _, failures = journaled.apply_updates([("stock", "P001", 1), ("stock", "P999", 1)], atomic=False)
+        assert len(failures) == 1
+        with pytest.raises(ValueError):
+            journaled.update_stock_level("P001", -1000)
+        expected = dict(journaled.inventory.items())
+        journaled.close()
+        
+        # A record cut short by a crash is ignored and overwritten
+        with open(tmp_path / "journal.jsonl", "ab") as journal_file:
+            journal_file.write(b'{"seq":99,"op":"sto')
+        with JournaledInventory(str(tmp_path)) as reopened:
+            assert reopened.recovery["records_replayed"] == 5
+            assert dict(reopened.inventory.items()) == expected
+            reopened.compact()
+            reopened.update_stock_level("P001", 2)
+        assert (tmp_path / "snapshot.000000000005.snap").exists()
+        
+        with JournaledInventory(str(tmp_path)) as recovered:
+            assert recovered.recovery == {**recovered.recovery, "snapshot_sequence": 5, "records_replayed": 1}
+            assert recovered.inventory["P001"]["stock"] == expected["P001"]["stock"] + 2
+            assert recovered.inventory["N001"]["new_arrival"] is True
+        
+        # A failed fsync publishes nothing, cuts the journal back and refuses later writes
+        failing = JournaledInventory(str(tmp_path / "failing"), inventory, compact_every=None)
+        failing.update_stock_level("P001", 1)
+        before = dict(failing.inventory.items())
+        journal_path = tmp_path / "failing" / "journal.jsonl"
+        size = os.path.getsize(journal_path)
+        
+        def failed_fsync(fd):
+            raise OSError("I/O error")
+        monkeypatch.setattr(os, "fsync", failed_fsync)
+        with pytest.raises(OSError):
+            failing.update_stock_level("P001", 5)
+        monkeypatch.undo()
+        assert dict(failing.inventory.items()) == before
+        assert os.path.getsize(journal_path) == size
+        with pytest.raises(OSError):
+            failing.update_product_price("P001", 10.0)
+        assert failing.journal.error is not None
+        failing.close()
+        with JournaledInventory(str(tmp_path / "failing")) as recovered:
+            assert dict(recovered.inventory.items()) == before
+        
+        test_obj.yakshaAssert("test_inventory_journal", True, "functional")
+    except Exception as e:
+        test_obj.yakshaAssert("test_inventory_journal", False, "functional")
+        pytest.fail(f"Inventory journal test failed: {str(e)}")
+
+def test_sqlite_inventory(test_obj, tmp_path):
+    """Test that a SQLite inventory gives the same results as a dictionary and is updated in place"""
+    try:
+        inventory, new_products = initialize_data()
+        with SqliteInventory(str(tmp_path / "catalog.sqlite")) as database:
+            database.update(inventory)
+            assert dict(database.items()) == inventory and list(database) == list(inventory)
+            
+            assert filter_by_category(database, "electronics") == filter_by_category(inventory, "electronics")
+            assert filter_by_price_range(database, 3000, 8000) == filter_by_price_range(inventory, 3000, 8000)
+            assert filter_by_availability(database, 30) == filter_by_availability(inventory, 30)
+            assert filter_by_feature(database, "5G") == filter_by_feature(inventory, "5G")
+            assert find_products_with_keyword(database, "BEAN") == find_products_with_keyword(inventory, "BEAN")
+            assert calculate_category_counts(database) == calculate_category_counts(inventory)
+            assert calculate_total_inventory_value(database) == calculate_total_inventory_value(inventory)
+            assert find_highest_rated_product(database) == find_highest_rated_product(inventory)
+            assert top_k(database, 3, "price") == top_k(inventory, 3, "price")
+            assert create_price_brackets(database) == create_price_brackets(inventory)
+            
+            assert update_stock_level(database, "P001", -5) is database
+            merge_inventories(database, new_products)
+            _, failures = apply_updates(database, [("price", "P002", 10.0), ("price", "P999", 1.0)], atomic=False)
+            assert len(failures) == 1
+            with pytest.raises(ValueError):
+                update_stock_level(database, "P003", -100)
+            
+            # Products the schema rejects raise ValueError and roll back the whole write
+            with pytest.raises(ValueError):
+                database.update({"X001": inventory["P001"], "X002": {**inventory["P001"], "name": None}})
+            with pytest.raises(ValueError):
+                database["X003"] = {**inventory["P001"], "features": [None]}
+            assert "X001" not in database and len(database) == 7
+        
+        # Changes are on disk and survive reopening
+        with SqliteInventory(str(tmp_path / "catalog.sqlite")) as reopened:
+            assert len(reopened) == 7
+            assert reopened["P001"]["stock"] == 20 and reopened["P002"]["price"] == 10.0
+            assert reopened["P003"]["stock"] == 15
+            assert reopened["N001"] == {**new_products["N001"], "new_arrival": True}
+        
+        test_obj.yakshaAssert("test_sqlite_inventory", True, "functional")
+    except Exception as e:
+        test_obj.yakshaAssert("test_sqlite_inventory", False, "functional")
+        pytest.fail(f"SQLite inventory test failed: {str(e)}")
+
+def test_batch_mode(test_obj):
+    """Test that batch commands run without the menu and report JSON-lines results"""
+    try:
+        inventory, new_products = initialize_data()
+        commands = [
+            "# restock, then report",
+            '{"op": "update", "changes": [["stock", "P001", 5], ["price", "P002", 100.0]]}',
+            '{"op": "update", "changes": [["stock", "P003", -100]]}',
+            '{"op": "merge"}',
+            '{"op": "filter", "category": "electronics", "min_stock": 25}',
+            '{"op": "stats", "name": "categories"}',
+            "",
+            '{"op": "stats", "name": "top", "k": 1, "key": "stock"}',
+            '{"op": "unknown"}'
+        ]
+        output = io.StringIO()
+        final, summary = run_batch(inventory, commands, new_products, output=output, timings=True)
+        results = [json.loads(line) for line in output.getvalue().splitlines()]
+        
+        assert summary["commands"] == 7 and summary["failed"] == 2
+        assert [entry["line"] for entry in results] == [2, 3, 4, 5, 6, 8, 9]
+        assert all("ms" in entry for entry in results)
+        assert results[0]["result"] == {"applied": 2, "failures": []}
+        assert "Stock cannot be negative" in results[1]["error"]
+        assert results[2]["result"]["inserted"] == ["N001", "N002"]
+        assert results[3]["result"] == {"count": 1, "ids": ["P001"]}
+        assert results[4]["result"]["health"] == 1
+        assert results[5]["result"][0]["id"] == "P004"
+        assert "error" in results[6]
+        
+        assert final["P001"]["stock"] == 30 and final["P003"]["stock"] == 15
+        assert inventory["P001"]["stock"] == 25
+        
+        test_obj.yakshaAssert("test_batch_mode", True, "functional")
+    except Exception as e:
+        test_obj.yakshaAssert("test_batch_mode", False, "functional")
+        pytest.fail(f"Batch mode test failed: {str(e)}")
+
+def test_persistent_map_order(test_obj):
+    """Test persistent maps and indexed inventories keep dictionary insertion order"""
+    try:
+        original = PersistentMap({"B": 1, "A": 2})
+        updated = original.set("C", 3).set("A", 4)
+        assert list(original.items()) == [("B", 1), ("A", 2)]
+        assert list(updated.items()) == [("B", 1), ("A", 4), ("C", 3)]
+        assert list(updated.delete("B")) == ["A", "C"] and list(updated.items_from(2)) == [("C", 3)]
+        
+        inventory, new_products = initialize_data()
+        indexed = merge_inventories(IndexedInventory(inventory), new_products)
+        merged = merge_inventories(inventory, new_products)
+        assert list(indexed.items()) == list(merged.items())
+        assert list(indexed)[-2:] == ["N001", "N002"]
+        assert render_page(indexed, 2, 3) == render_page(merged, 2, 3)
+        
+        test_obj.yakshaAssert("test_persistent_map_order", True, "functional")
+    except Exception as e:
+        test_obj.yakshaAssert("test_persistent_map_order", False, "functional")
+        pytest.fail(f"Persistent map order test failed: {str(e)}")
+
+def test_indexed_inventory_versions(test_obj):
+    """Test every indexed inventory version answers filters like the matching plain dictionary"""
+    try:
+        inventory, new_products = initialize_data()
+        versions = [(inventory, IndexedInventory(inventory))]
+        for change in (lambda data: update_stock_level(data, "P003", -5),
+                       lambda data: add_product_feature(data, "P002", "Stretch"),
+                       lambda data: merge_inventories(data, new_products),
+                       lambda data: update_product_price(data, "P001", 999.0)):
+            plain, indexed = versions[-1]
+            versions.append((change(plain), change(indexed)))
+        
+        # A rejected update leaves the caller's inventory unchanged and indexed
+        plain, indexed = versions[-1]
+        try:
+            update_stock_level(indexed, "P001", -1000)
+            assert False, "Overselling should be rejected"
+        except ValueError:
+            pass
+        
+        for plain, indexed in versions:
+            assert list(indexed.items()) == list(plain.items())
+            for category in ("electronics", "clothing", "health", "toys"):
+                assert list(filter_by_category(indexed, category).items()) == list(filter_by_category(plain, category).items())
+            for feature in ("5G", "Stretch", "Organic"):
+                assert list(filter_by_feature(indexed, feature).items()) == list(filter_by_feature(plain, feature).items())
+            assert list(calculate_category_counts(indexed).items()) == list(calculate_category_counts(plain).items())
+        
+        test_obj.yakshaAssert("test_indexed_inventory_versions", True, "functional")
+    except Exception as e:
+        test_obj.yakshaAssert("test_indexed_inventory_versions", False, "functional")
+        pytest.fail(f"Indexed inventory versions test failed: {str(e)}")
+
+def test_price_index_order(test_obj):
+    """Test indexed price filters and brackets list products in inventory order"""
+    try:
+        inventory, new_products = initialize_data()
+        inventory = merge_inventories(inventory, new_products)
+        assert create_price_brackets(IndexedInventory(inventory))["mid_range"] == ["P002", "P003", "P005"]
+        
+        indexed = update_product_price(IndexedInventory(inventory), "P005", 2999.99)
+        inventory = update_product_price(inventory, "P005", 2999.99)
+        
+        for min_price, max_price in ((0, 100000), (1000, 5000), (2999.99, 2999.99)):
+            expected = filter_by_price_range(inventory, min_price, max_price)
+            assert list(filter_by_price_range(indexed, min_price, max_price).items()) == list(expected.items())
+        
+        brackets = create_price_brackets(indexed)
+        assert brackets == create_price_brackets(inventory)
+        assert brackets["budget"] == ["P004", "P005", "N002"]
+        with ShardedAnalytics(indexed, shard_count=2, processes=2) as sharded:
+            assert sharded.price_brackets() == brackets
+        
+        test_obj.yakshaAssert("test_price_index_order", True, "functional")
+    except Exception as e:
+        test_obj.yakshaAssert("test_price_index_order", False, "functional")
+        pytest.fail(f"Price index order test failed: {str(e)}")
+
+def test_keyword_index_matches_scan(test_obj):
+    """Test indexed keyword search returns the same products, in the same order, as a scan"""
+    try:
+        inventory, new_products = initialize_data()
+        inventory = merge_inventories(inventory, new_products)
+        indexed = IndexedInventory(inventory)
+        renamed = {**inventory["P003"], "name": "Phone Case", "features": ["Slim"]}
+        versions = [(inventory, indexed),
+                    (add_product_feature(inventory, "P005", "Phone Stand"), add_product_feature(indexed, "P005", "Phone Stand")),
+                    (merge_inventories(inventory, {"P003": renamed}), merge_inventories(indexed, {"P003": renamed}))]
+        
+        for plain, data in versions:
+            for keyword in ("phone", "PHONE", "e", "ph", "fi", "noise cancel", "case", "xyz", "", "s\x00", "es\x00noi"):
+                expected = find_products_with_keyword(plain, keyword)
+                assert list(find_products_with_keyword(data, keyword).items()) == list(expected.items()), keyword
+        assert list(find_products_with_keyword(versions[1][1], "phone")) == ["P001", "P003", "P005"]
+        assert "P003" in find_products_with_keyword(versions[2][1], "case")
+        assert "P003" not in find_products_with_keyword(indexed, "case")
+        
+        test_obj.yakshaAssert("test_keyword_index_matches_scan", True, "functional")
+    except Exception as e:
+        test_obj.yakshaAssert("test_keyword_index_matches_scan", False, "functional")
+        pytest.fail(f"Keyword index test failed: {str(e)}")
+
+def test_columnar_inventory_matches_dict(test_obj):
+    """Test a columnar inventory answers like the plain dictionary after batched writes"""
+    pytest.importorskip("numpy")
+    try:
+        inventory, new_products = initialize_data()
+        columnar = ColumnarInventory(inventory)
+        moved = {"P001": {**inventory["P001"], "category": "health"}}
+        for change in (lambda data: merge_inventories(data, new_products),
+                       lambda data: merge_inventories(data, moved),
+                       lambda data: bulk_merge(data, {"P002": {**inventory["P002"], "stock": 5}}, "sum_stock")[0],
+                       lambda data: apply_updates(data, [("price", "P004", 1500.0), ("stock", "N001", -2)])[0]):
+            inventory, columnar = change(inventory), change(columnar)
+            assert list(columnar.items()) == list(inventory.items())
+            assert list(filter_by_category(columnar, "electronics").items()) == list(filter_by_category(inventory, "electronics").items())
+            assert list(filter_by_price_range(columnar, 1000, 20000).items()) == list(filter_by_price_range(inventory, 1000, 20000).items())
+            assert list(filter_by_availability(columnar, 20).items()) == list(filter_by_availability(inventory, 20).items())
+            assert list(calculate_category_counts(columnar).items()) == list(calculate_category_counts(inventory).items())
+            assert create_price_brackets(columnar) == create_price_brackets(inventory)
+            assert find_highest_rated_product(columnar) == find_highest_rated_product(inventory)
+            assert calculate_total_inventory_value(columnar) == calculate_total_inventory_value(inventory)
+        assert list(columnar)[-2:] == ["N001", "N002"] and columnar["P002"]["stock"] == 45
+        catalog = generate_catalog(5000, seed=9)
+        assert calculate_total_inventory_value(ColumnarInventory(catalog)) == calculate_total_inventory_value(catalog)
+        
+        test_obj.yakshaAssert("test_columnar_inventory_matches_dict", True, "functional")
+    except Exception as e:
+        test_obj.yakshaAssert("test_columnar_inventory_matches_dict", False, "functional")
+        pytest.fail(f"Columnar inventory test failed: {str(e)}")
+
+def test_aggregates_match_dict(test_obj):
+    """Test maintained category counts and total value match the dictionary scans"""
+    try:
+        inventory, new_products = initialize_data()
+        indexed = IndexedInventory(inventory)
+        versions = [(inventory, indexed)]
+        for position in range(200):
+            pid = ("P001", "P002", "P003", "P004", "P005")[position % 5]
+            price = round(0.1 + position * 37.3, 2)
+            inventory = update_product_price(update_stock_level(inventory, pid, 3), pid, price)
+            indexed = update_product_price(update_stock_level(indexed, pid, 3), pid, price)
+        versions.append((inventory, indexed))
+        
+        # Moving the first product of a category reorders the counts
+        moved = {"P001": {**inventory["P001"], "category": "footwear"}}
+        versions.append((merge_inventories(inventory, moved), merge_inventories(indexed, moved)))
+        plain, data = versions[-1]
+        plain, data = dict(plain), data.copy()
+        del plain["P002"]
+        del data["P002"]
+        versions.append((plain, data))
+        
+        for plain, data in versions:
+            assert list(calculate_category_counts(data).items()) == list(calculate_category_counts(plain).items())
+            assert calculate_total_inventory_value(data) == pytest.approx(calculate_total_inventory_value(plain), rel=1e-12)
+        assert list(calculate_category_counts(versions[2][1])) == ["footwear", "clothing", "electronics", "groceries"]
+        
+        test_obj.yakshaAssert("test_aggregates_match_dict", True, "functional")
+    except Exception as e:
+        test_obj.yakshaAssert("test_aggregates_match_dict", False, "functional")
+        pytest.fail(f"Aggregates test failed: {str(e)}")
+
+def test_highest_rated_ties_match_dict(test_obj):
+    """Test the indexed highest rated product breaks ties by inventory order"""
+    try:
+        inventory, _ = initialize_data()
+        top_rating = max(product["rating"] for product in inventory.values())
+        # Later products with smaller IDs tie with the current best
+        tied = {"A001": {**inventory["P002"], "rating": top_rating},
+                "A000": {**inventory["P003"], "rating": top_rating}}
+        inventory = merge_inventories(inventory, tied)
+        indexed = IndexedInventory(inventory)
+        assert find_highest_rated_product(indexed) == find_highest_rated_product(inventory)
+        
+        first = find_highest_rated_product(inventory)[0]
+        lowered = {first: {**inventory[first], "rating": 1.0}}
+        assert find_highest_rated_product(merge_inventories(indexed, lowered)) == \
+            find_highest_rated_product(merge_inventories(inventory, lowered))
+        assert find_highest_rated_product(indexed)[0] == first
+        
+        test_obj.yakshaAssert("test_highest_rated_ties_match_dict", True, "functional")
+    except Exception as e:
+        test_obj.yakshaAssert("test_highest_rated_ties_match_dict", False, "functional")
+        pytest.fail(f"Highest rated ties test failed: {str(e)}")
+
+def test_validate_product_numbers(test_obj):
+    """Test catalog validation rejects booleans, non-finite numbers and fractional stock"""
+    try:
+        record = {"id": "V001", "name": "Desk Lamp", "category": "electronics",
+                  "price": "1499.00", "stock": "5", "rating": "4.2", "features": "LED"}
+        pid, product = validate_product(record)
+        assert pid == "V001" and product["price"] == 1499.0 and product["stock"] == 5
+        assert validate_product({**record, "stock": 7.0})[1]["stock"] == 7
+        
+        invalid = [
+            ("price", float("nan")), ("price", float("inf")), ("price", "-inf"), ("price", True),
+            ("stock", 2.7), ("stock", "2.7"), ("stock", False), ("stock", float("inf")),
+            ("rating", float("nan")), ("rating", True), ("price", None), ("stock", [5])
+        ]
+        for field, value in invalid:
+            try:
+                validate_product({**record, field: value})
+                assert False, f"{field}={value!r} should be rejected"
+            except ValueError:
+                pass
+        
+        test_obj.yakshaAssert("test_validate_product_numbers", True, "functional")
+    except Exception as e:
+        test_obj.yakshaAssert("test_validate_product_numbers", False, "functional")
+        pytest.fail(f"Product validation test failed: {str(e)}")
+
+def test_snapshot_matches_dict(test_obj, tmp_path, monkeypatch, capsys):
+    """Test a snapshot reads back in inventory order, answers like the dictionary and is closed by main()"""
+    try:
+        inventory, new_products = initialize_data()
+        inventory = merge_inventories(inventory, {"A100": {**inventory["P004"], "category": "health"},
+                                                  **new_products})
+        inventory = add_product_feature(inventory, "P003", "Dust Resistant")
+        path = tmp_path / "inventory.snap"
+        write_snapshot(inventory, str(path))
+        
+        with open_snapshot(str(path)) as snapshot:
+            assert list(snapshot) == list(inventory)
+            assert list(snapshot.items()) == list(inventory.items())
+            assert all(snapshot[pid] == product for pid, product in inventory.items())
+            assert "A101" not in snapshot and "Z999" not in snapshot
+            assert list(calculate_category_counts(snapshot).items()) == \
+                list(calculate_category_counts(inventory).items())
+            assert calculate_total_inventory_value(snapshot) == \
+                pytest.approx(calculate_total_inventory_value(inventory))
+            for category in calculate_category_counts(inventory):
+                assert list(filter_by_category(snapshot, category)) == list(filter_by_category(inventory, category))
+            assert list(filter_by_price_range(snapshot, 1000, 20000)) == \
+                list(filter_by_price_range(inventory, 1000, 20000))
+            assert find_highest_rated_product(snapshot) == find_highest_rated_product(inventory)
+            
+            updated = update_stock_level(snapshot, "A100", 3)
+            assert list(updated.items()) == list(update_stock_level(inventory, "A100", 3).items())
+        
+        # Stock is stored as an integer, so fractions and booleans are rejected, not truncated
+        for stock in (2.5, True, float("nan")):
+            with pytest.raises(ValueError):
+                write_snapshot({"P001": {**inventory["P001"], "stock": stock}}, str(tmp_path / "bad.snap"))
+        assert not (tmp_path / "bad.snap").exists()
+        
+        # main() closes the snapshot it opened, even after an update replaced it with an indexed copy
+        closed = []
+        close = store.SnapshotInventory.close
+        monkeypatch.setattr(store.SnapshotInventory, "close", lambda snapshot: closed.append(snapshot) or close(snapshot))
+        answers = iter(["4", "0"])
+        monkeypatch.setattr("builtins.input", lambda prompt="": next(answers))
+        store.main(str(path))
+        assert "2 new products added" in capsys.readouterr().out
+        assert len(closed) == 1 and closed[0]._map.closed
+        
+        test_obj.yakshaAssert("test_snapshot_matches_dict", True, "functional")
+    except Exception as e:
+        test_obj.yakshaAssert("test_snapshot_matches_dict", False, "functional")
+        pytest.fail(f"Snapshot test failed: {str(e)}")
+
+def test_product_records_match_dict(test_obj):
+    """Test Product records give the same results, in the same order, as product dictionaries"""
+    try:
+        inventory, new_products = initialize_data()
+        records = to_products(inventory)
+        new_records = to_products(new_products)
+        
+        def same(left, right):
+            assert list(left.items()) == list(right.items())
+        
+        assert list(records) == list(inventory)
+        assert all(isinstance(product, Product) for product in records.values())
+        for category in ("electronics", "clothing", "groceries", "toys"):
+            same(filter_by_category(records, category), filter_by_category(inventory, category))
+        same(filter_by_price_range(records, 500, 8000), filter_by_price_range(inventory, 500, 8000))
+        same(filter_by_availability(records, 40), filter_by_availability(inventory, 40))
+        same(filter_by_feature(records, "5G"), filter_by_feature(inventory, "5G"))
+        same(find_products_with_keyword(records, "phone"), find_products_with_keyword(inventory, "phone"))
+        same(calculate_category_counts(records), calculate_category_counts(inventory))
+        assert calculate_total_inventory_value(records) == calculate_total_inventory_value(inventory)
+        assert find_highest_rated_product(records) == find_highest_rated_product(inventory)
+        assert top_k(records, 3, "price") == top_k(inventory, 3, "price")
+        same(create_price_brackets(records), create_price_brackets(inventory))
+        assert render_page(records, 1, 3) == render_page(inventory, 1, 3)
+        
+        changes = [("price", "P002", 5499.99), ("stock", "P003", -5), ("feature", "P004", "Travel Size")]
+        same(apply_updates(records, changes)[0], apply_updates(inventory, changes)[0])
+        same(merge_inventories(records, new_records), merge_inventories(inventory, new_products))
+        for policy in ("overwrite", "keep_existing", "sum_stock"):
+            merged, summary = bulk_merge(records, new_records, policy)
+            expected, expected_summary = bulk_merge(inventory, new_products, policy)
+            same(merged, expected)
+            assert summary == expected_summary
+        # The original records are left untouched by updates
+        assert records == to_products(inventory)
+        
+        indexed = IndexedInventory(records)
+        same(filter_by_feature(indexed, "5G"), filter_by_feature(inventory, "5G"))
+        same(find_products_with_keyword(indexed, "phone"), find_products_with_keyword(inventory, "phone"))
+        assert render_page(indexed, 1, 3) == render_page(inventory, 1, 3)
+        
+        test_obj.yakshaAssert("test_product_records_match_dict", True, "functional")
+    except Exception as e:
+        test_obj.yakshaAssert("test_product_records_match_dict", False, "functional")
+        pytest.fail(f"Product record test failed: {str(e)}")
+
+def test_query_planner_matches_dict(test_obj, tmp_path):
+    """Test indexed and SQLite queries return the dictionary scan's products in its order"""
+    try:
+        generator = random.Random(7)
+        categories = ["electronics", "clothing", "groceries", "footwear"]
+        features = ["5G", "Water Resistant", "Organic", "GPS"]
+        inventory = {
+            f"{generator.choice('PQZ')}{position:03d}": {
+                "name": generator.choice(["Smart Phone", "Pro Laptop", "Phone Case", "GPS Watch"]),
+                "category": generator.choice(categories),
+                "price": float(generator.randrange(1, 50) * 10),
+                "stock": generator.randrange(0, 20),
+                "rating": 4.0,
+                "features": generator.sample(features, generator.randrange(0, 3))
+            }
+            for position in generator.sample(range(1000), 200)
+        }
+        indexed = IndexedInventory(inventory)
+        for pid in generator.sample(list(inventory), 40):
+            price = float(generator.randrange(1, 50) * 10)
+            inventory = update_product_price(inventory, pid, price)
+            indexed = update_product_price(indexed, pid, price)
+        
+        with SqliteInventory(str(tmp_path / "query.sqlite")) as database:
+            database.update(inventory)
+            for _ in range(200):
+                criteria = {}
+                if generator.random() < 0.5:
+                    criteria["category"] = generator.choice(categories)
+                if generator.random() < 0.5:
+                    low = generator.randrange(0, 500)
+                    criteria["price"] = (low, low + generator.randrange(0, 200))
+                if generator.random() < 0.3:
+                    criteria["min_stock"] = generator.randrange(0, 20)
+                if generator.random() < 0.3:
+                    criteria["features"] = generator.sample(features, generator.randrange(1, 3))
+                if generator.random() < 0.5:
+                    criteria["keyword"] = generator.choice(["phone", "PRO", "case", "o"])
+                expected = list(query(inventory, **criteria).items())
+                assert list(query(indexed, **criteria).items()) == expected, criteria
+                assert list(query(database, **criteria).items()) == expected, criteria
+        
+        test_obj.yakshaAssert("test_query_planner_matches_dict", True, "functional")
+    except Exception as e:
+        test_obj.yakshaAssert("test_query_planner_matches_dict", False, "functional")
+        pytest.fail(f"Query planner test failed: {str(e)}")
+
+def test_benchmark_backends_agree(test_obj):
+    """Test every benchmarked operation gives the same results on the dict and indexed backends"""
+    try:
+        assert verify_backends(size=500, seed=11) == []
+        
+        catalog = generate_catalog(50, seed=3)
+        assert list(catalog) == list(generate_catalog(50, seed=3))
+        report = run_benchmarks(sizes=[50], min_seconds=0)
+        assert {result["backend"] for result in report["results"]} == {"dict", "indexed"}
+        assert all(result["ops_per_sec"] > 0 for result in report["results"])
+        
+        test_obj.yakshaAssert("test_benchmark_backends_agree", True, "functional")
+    except Exception as e:
+        test_obj.yakshaAssert("test_benchmark_backends_agree", False, "functional")
+        pytest.fail(f"Benchmark suite test failed: {str(e)}")
+
+def test_render_page_backends(test_obj, tmp_path, monkeypatch):
+    """Test deep pages seek into every backend and reuse formatted lines while the store is unchanged"""
+    pytest.importorskip("numpy")
+    try:
+        catalog = generate_catalog(95, seed=5)
+        write_snapshot(catalog, str(tmp_path / "pages.snap"))
+        with open_snapshot(str(tmp_path / "pages.snap")) as snapshot, \
+                SqliteInventory(str(tmp_path / "pages.sqlite")) as database:
+            database.update(catalog)
+            backends = [IndexedInventory(catalog), ColumnarInventory(catalog), snapshot, database]
+            for page in range(1, page_count(catalog, 10) + 1):
+                expected = render_page(catalog, page, 10)
+                assert all(render_page(backend, page, 10) == expected for backend in backends)
+            
+            # Records decoded afresh on every read still hit the cache while the version is unchanged
+            formatted = []
+            original = store.get_formatted_product
+            monkeypatch.setattr(store, "get_formatted_product",
+                                lambda pid, product: formatted.append(pid) or original(pid, product))
+            for backend in (snapshot, database):
+                render_page(backend, 3, 10)
+                formatted.clear()
+                render_page(backend, 3, 10)
+                assert formatted == []
+            
+            update_stock_level(database, "S0000025", 7)
+            assert f"Stock: {catalog['S0000025']['stock'] + 7}" in render_page(database, 3, 10)
+            assert formatted == list(catalog)[20:30]
+        
+        test_obj.yakshaAssert("test_render_page_backends", True, "functional")
+    except Exception as e:
+        test_obj.yakshaAssert("test_render_page_backends", False, "functional")
+        pytest.fail(f"Render page backends test failed: {str(e)}")
+
+def test_journal_publishes_durable_changes(test_obj, tmp_path, monkeypatch):
+    """Test journaled changes are published only after their fsync and renames sync the directory"""
+    try:
+        inventory, _ = initialize_data()
+        journaled = JournaledInventory(str(tmp_path), inventory, compact_every=None)
+        
+        published_during_fsync = []
+        synced_directories = []
+        original_fsync = os.fsync
+        
+        def tracking_fsync(descriptor):
+            if stat.S_ISDIR(os.fstat(descriptor).st_mode):
+                synced_directories.append(descriptor)
+            else:
+                published_during_fsync.append(journaled.inventory["P001"]["stock"])
+            original_fsync(descriptor)
+        monkeypatch.setattr(os, "fsync", tracking_fsync)
+        
+        updated = journaled.update_stock_level("P001", 4)
+        assert published_during_fsync == [inventory["P001"]["stock"]]
+        assert journaled.inventory is updated and updated["P001"]["stock"] == inventory["P001"]["stock"] + 4
+        
+        journaled.compact()
+        # The snapshot rename, the journal reset and the old snapshot removal each sync the directory
+        assert len(synced_directories) == 3
+        assert sorted(path.name for path in tmp_path.iterdir()) == ["journal.jsonl", "snapshot.000000000001.snap"]
+        journaled.close()
+        
+        test_obj.yakshaAssert("test_journal_publishes_durable_changes", True, "functional")
+    except Exception as e:
+        test_obj.yakshaAssert("test_journal_publishes_durable_changes", False, "functional")
+        pytest.fail(f"Journal publish test failed: {str(e)}")
+
+def test_sqlite_in_place_callers(test_obj, tmp_path):
+    """Test callers that keep or share an inventory handle SQLite's in-place updates"""
+    try:
+        inventory, new_products = initialize_data()
+        with SqliteInventory(str(tmp_path / "shared.sqlite")) as database:
+            database.update(inventory)
+            
+            # Stock levels are written back into the same store
+            manager = StockManager(database)
+            manager.adjust("P002", -10)
+            assert manager.to_inventory() is database
+            assert database["P002"]["stock"] == inventory["P002"]["stock"] - 10
+            
+            # A failed batch command leaves the store unchanged
+            output = io.StringIO()
+            lines = ['{"op": "merge", "products": {"N001": {"name": "Broken"}}}',
+                     '{"op": "update", "changes": [["stock", "P001", -5], ["stock", "P003", -1000]]}']
+            result, summary = run_batch(database, lines, output=output)
+            assert result is database and summary["failed"] == 2
+            assert "N001" not in database and database["P001"] == inventory["P001"]
+            
+            # Queries and updates run on the service's worker threads
+            async def scenario():
+                service = InventoryService(database)
+                try:
+                    products = await service.read(filter_by_category, "electronics")
+                    assert list(products) == ["P001", "P003"]
+                    response = await service.write(lambda current: (update_stock_level(current, "P001", 5), "ok"))
+                    assert response == "ok" and service.inventory is database
+                    assert (await service.read(filter_by_availability, 30)).keys() >= {"P001"}
+                finally:
+                    service.close()
+            asyncio.run(scenario())
+            assert database["P001"]["stock"] == inventory["P001"]["stock"] + 5
+        
+        test_obj.yakshaAssert("test_sqlite_in_place_callers", True, "functional")
+    except Exception as e:
+        test_obj.yakshaAssert("test_sqlite_in_place_callers", False, "functional")
+        pytest.fail(f"SQLite in-place callers test failed: {str(e)}")
+
+def test_batch_command_validation(test_obj):
+    """Test batch commands with mistyped fields fail with an error entry instead of crashing"""
+    try:
+        inventory, new_products = initialize_data()
+        valid = {**new_products["N001"], "updated_at": 5}
+        commands = [
+            {"op": "filter", "keyword": 5},
+            {"op": "filter", "category": ["electronics"]},
+            {"op": "filter", "price": [100, "max"]},
+            {"op": "filter", "price": 100},
+            {"op": "filter", "min_stock": True},
+            {"op": "filter", "features": "5G"},
+            {"op": "update", "changes": "stock"},
+            {"op": "update", "changes": [["stock", "P001", 1]], "atomic": "no"},
+            {"op": "merge", "products": {"P001": "Laptop"}, "policy": "newer"},
+            {"op": "merge", "products": {"X001": {"name": "Partial"}}},
+            {"op": "merge", "products": {"X002": {**valid, "price": float("nan")}}},
+            {"op": "merge", "products": [valid]},
+            {"op": "merge", "products": {"X003": valid}, "policy": 1},
+            {"op": "stats", "name": "top", "k": "3"},
+            {"op": "stats", "name": "top", "k": True},
+            {"op": "stats", "name": "top", "key": ["price"]},
+            {"op": "update", "changes": [["price", "P001", True]]},
+            {"op": "update", "changes": [["price", "P001", float("nan")]]},
+            {"op": "update", "changes": [["stock", "P001", 1.5]]},
+            {"op": "update", "changes": [["stock", "P001", True]]},
+            {"op": "merge", "products": {"X004": {**valid, "stock": "7"}}, "policy": "newer"}
+        ]
+        output = io.StringIO()
+        final, summary = run_batch(inventory, [json.dumps(command) for command in commands], output=output)
+        results = [json.loads(line) for line in output.getvalue().splitlines()]
+        
+        assert summary["failed"] == len(commands) - 1
+        assert all("error" in entry for entry in results[:-1])
+        assert '"keyword" must be a string' in results[0]["error"]
+        assert "P001" in results[8]["error"] and "X001" in results[9]["error"]
+        assert "New price must be a number" in results[16]["error"]
+        assert "New price must be a finite number" in results[17]["error"]
+        assert "whole number" in results[18]["error"] and "must be a number" in results[19]["error"]
+        # Whole float quantities are stored as integers, like catalog stock
+        updated, _ = apply_updates(inventory, [("stock", "P001", 2.0)])
+        assert updated["P001"]["stock"] == 27 and type(updated["P001"]["stock"]) is int
+        # Valid products keep extra fields and get the validated values
+        assert results[-1]["result"]["inserted"] == ["X004"]
+        assert final["X004"]["stock"] == 7 and final["X004"]["updated_at"] == 5
+        assert list(final) == list(inventory) + ["X004"]
+        
+        test_obj.yakshaAssert("test_batch_command_validation", True, "functional")
+    except Exception as e:
+        test_obj.yakshaAssert("test_batch_command_validation", False, "functional")
+        pytest.fail(f"Batch command validation test failed: {str(e)}")
+
+def test_indexes_built_lazily(test_obj):
+    """Test an indexed inventory builds each index the first time a query needs it"""
+    try:
+        inventory, _ = initialize_data()
+        indexed = IndexedInventory(inventory)
+        assert indexed._indexes == {}
+        filter_by_category(indexed, "electronics")
+        assert set(indexed._indexes) == {"category"}
+        
+        # A copy shares the indexes built so far
+        assert set(indexed.copy()._indexes) == {"category"}
+        
+        test_obj.yakshaAssert("test_indexes_built_lazily", True, "functional")
+    except Exception as e:
+        test_obj.yakshaAssert("test_indexes_built_lazily", False, "functional")
+        pytest.fail(f"Lazy index test failed: {str(e)}")
+
+def test_indexed_filters_beat_dict_scan(test_obj):
+    """Test the indexed filters answer faster than a scan of a plain dictionary"""
+    try:
+        speedups = indexed_speedups(size=20000, min_seconds=0.05)
+        assert set(speedups) == {"filter_by_category", "filter_by_feature", "find_products_with_keyword"}
+        for function, speedup in speedups.items():
+            assert speedup > 1, f"{function} is {speedup:.2f}x the dict scan"
+        
+        test_obj.yakshaAssert("test_indexed_filters_beat_dict_scan", True, "functional")
+    except Exception as e:
+        test_obj.yakshaAssert("test_indexed_filters_beat_dict_scan", False, "functional")
+        pytest.fail(f"Indexed speedup test failed: {str(e)}")
+
+def test_prices_must_be_finite_numbers(test_obj):
+    """Test NaN, infinite and boolean prices are rejected wherever a price is written"""
+    try:
+        inventory, new_products = initialize_data()
+        indexed = IndexedInventory(inventory)
+        for price in (float("nan"), float("inf"), True, "10"):
+            for data in (inventory, indexed):
+                with pytest.raises(ValueError):
+                    update_product_price(data, "P001", price)
+                with pytest.raises(ValueError):
+                    apply_updates(data, [("price", "P001", price)])
+                with pytest.raises(ValueError):
+                    merge_inventories(data, {"N009": {**new_products["N001"], "price": price}})
+                with pytest.raises(ValueError):
+                    bulk_merge(data, {"P002": {**inventory["P002"], "price": price}})
+            with pytest.raises(ValueError):
+                indexed["P001"] = {**inventory["P001"], "price": price}
+            with pytest.raises(ValueError):
+                IndexedInventory({"P001": {**inventory["P001"], "price": price}})
+        
+        assert dict(indexed.items()) == inventory
+        expected = filter_by_price_range(inventory, 0, 100000)
+        assert list(filter_by_price_range(indexed, 0, 100000).items()) == list(expected.items())
+        
+        test_obj.yakshaAssert("test_prices_must_be_finite_numbers", True, "functional")
+    except Exception as e:
+        test_obj.yakshaAssert("test_prices_must_be_finite_numbers", False, "functional")
+        pytest.fail(f"Price validation test failed: {str(e)}")
+
 if __name__ == '__main__':
     pytest.main(['-v'])
\ No newline at end of file